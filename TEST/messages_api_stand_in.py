@@ -0,0 +1,115 @@
+"""
+Local stand-in for the Anthropic Messages API that honours prompt caching markers.
+
+Used by the tests in place of the shared AsyncAnthropic client (patch `llm_clients.get_anthropic_client`
+to return a MessagesApiStandIn). It follows the provider's caching rules closely enough to test
+cache_control placement offline:
+- The prompt is read in the order tools, system, messages; a block marked with cache_control
+  ends a cacheable prefix (at most 4 markers per request, as the API enforces).
+- A prefix shorter than MIN_CACHEABLE_TOKENS is not cached.
+- A request reads the longest cached prefix, writes the prefixes of the later markers, and
+  reports the tokens after the last marker as uncached input.
+- Entries live TTL_S seconds on the injected clock, refreshed on every hit.
+Token counts are estimates: 4 characters per text token and width * height / 750 per image
+(after the API's downscaling to a 1568px long edge).
+"""
+
+from types import SimpleNamespace
+import base64
+import hashlib
+import io
+import json
+import math
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions.clock import get_clock
+
+MAX_CACHE_MARKERS = 4
+MIN_CACHEABLE_TOKENS = 1024
+TTL_S = 300.0
+MAX_IMAGE_EDGE_PX = 1568
+
+class CacheMarkerError(ValueError):
+    """ The request would be rejected by the API (HTTP 400). """
+
+def _block_tokens(block: dict) -> int:
+    if block.get("type") == "image":
+        with Image.open(io.BytesIO(base64.b64decode(block["source"]["data"]))) as image:
+            # The API downscales images to a long edge of MAX_IMAGE_EDGE_PX before counting
+            scale = min(1.0, MAX_IMAGE_EDGE_PX / max(image.size))
+            return math.ceil(image.width * scale * image.height * scale / 750)
+    return math.ceil(len(json.dumps({k: v for k, v in block.items() if k != "cache_control"})) / 4)
+
+def _prompt_blocks(request: dict) -> list:
+    """ Content blocks of a request in prompt order, each tagged with its role. """
+    blocks = [("tools", tool) for tool in request.get("tools", [])]
+    system = request.get("system")
+    if isinstance(system, str):
+        blocks.append(("system", {"type": "text", "text": system}))
+    elif system:
+        blocks.extend(("system", block) for block in system)
+    for message in request["messages"]:
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        blocks.extend((message["role"], block) for block in content)
+    return blocks
+
+class MessagesApiStandIn:
+    """
+    Offline Messages API with prompt caching.
+
+    Args:
+        reply: Text of every answer, or a callable receiving the request and returning it
+    """
+
+    def __init__(self, reply="", model_tokens_out: int = 50):
+        self.messages = self
+        self.reply = reply
+        self.model_tokens_out = model_tokens_out
+        self.cache = {}
+        self.requests = []
+        self.usages = []
+
+    async def create(self, **request):
+        self.requests.append(request)
+        blocks = _prompt_blocks(request)
+        markers = [i for i, (_, block) in enumerate(blocks) if block.get("cache_control")]
+        if len(markers) > MAX_CACHE_MARKERS:
+            raise CacheMarkerError(f"A maximum of {MAX_CACHE_MARKERS} blocks with cache_control may be provided. Found {len(markers)}.")
+
+        now = get_clock().now()
+        self.cache = {key: expires for key, expires in self.cache.items() if expires > now}
+        tokens = [_block_tokens(block) for _, block in blocks]
+        digest, prefix_keys = hashlib.sha256(request["model"].encode()), []
+        for role, block in blocks:
+            digest.update(json.dumps([role, {k: v for k, v in block.items() if k != "cache_control"}], sort_keys=True).encode())
+            prefix_keys.append(digest.hexdigest())
+
+        # Longest cached prefix ending at a marker, then cache every longer marked prefix
+        read_end = 0
+        for end in (i + 1 for i in reversed(markers)):
+            if prefix_keys[end - 1] in self.cache:
+                read_end = end
+                self.cache[prefix_keys[end - 1]] = now + TTL_S
+                break
+        write_end = read_end
+        for end in (i + 1 for i in markers if i + 1 > read_end):
+            if sum(tokens[:end]) >= MIN_CACHEABLE_TOKENS:
+                self.cache[prefix_keys[end - 1]] = now + TTL_S
+                write_end = end
+
+        usage = SimpleNamespace(
+            cache_read_input_tokens=sum(tokens[:read_end]),
+            cache_creation_input_tokens=sum(tokens[read_end:write_end]),
+            input_tokens=sum(tokens[write_end:]),
+            output_tokens=self.model_tokens_out,
+        )
+        self.usages.append(usage)
+        text = self.reply(request) if callable(self.reply) else self.reply
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)], usage=usage,
+                               stop_reason="end_turn", model=request["model"])
@@ -32,13 +32,13 @@ class MockBrowserContext:
         """Return the predefined screenshot data"""
         return self.screenshot_data
 
-# Create a mock class for the anthropic.Anthropic client
+# Create a mock class for the shared anthropic.AsyncAnthropic client
 class MockAnthropicClient:
     def __init__(self, mock_response):
         self.mock_response = mock_response
         self.messages = self
     
-    def create(self, **kwargs):
+    async def create(self, **kwargs):
         return MagicMock(content=[MagicMock(text=self.mock_response)])
 
 # Test directory
@@ -186,8 +186,8 @@ async def mock_extract_audience_data(params, browser, mock_response, expected_ou
     # Create a patched anthropic client that returns the mock response
     mock_client = MockAnthropicClient(mock_response)
     
-    # Patch the anthropic.Anthropic class to return our mock client
-    with patch('anthropic.Anthropic', return_value=mock_client):
+    # Patch the shared async client getter to return our mock client
+    with patch('remote_tools_folders.controller_actions.llm_clients.get_anthropic_client', return_value=mock_client):
         # Set the file path in the parameters if not the first run
         if not params.is_first_run and not params.file_path:
             params = ExtractAudienceDataAction(
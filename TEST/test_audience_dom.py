@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the DOM extraction of the audience table in audience_dom.py.
+Verifies that:
+1. Grid rows map to the same records the vision extraction produces
+2. Audience IDs are found in row links when there is no ID column
+3. Unrecognised tables and incomplete rows are reported for the vision fallback
+4. The extraction action only accepts the auto, dom and vision modes
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions.action_extract_audience_data import ExtractAudienceDataAction
+from remote_tools_folders.controller_actions.audience_dom import read_audience_rows_from_dom, row_to_record
+
+HEADERS = ["", "Name", "Type", "Availability", "Date created", "Audience ID"]
+
+class MockPage:
+    """Mock page returning a predefined result for the DOM script"""
+    def __init__(self, result):
+        self.result = result
+
+    async def evaluate(self, expression, arg=None):
+        return self.result
+
+def test_row_maps_to_audience_record():
+    record = row_to_record(HEADERS, ["", "Lookalike (IL, 2%) - Similar Last 90 Days", "Lookalike audience Similar Last 90 Days",
+                                     "Audience not created", "09/19/2023 10:09 AM", "ID: 23859203708050523"])
+    assert record == {
+        "Name": "Lookalike (IL, 2%) - Similar Last 90 Days",
+        "Type": "Lookalike audience Similar Last 90 Days",
+        "Availability": "Audience not created",
+        "Date created": "09/19/2023 10:09 AM",
+        "Audience ID": "23859203708050523",
+    }
+
+def test_audience_id_from_row_link():
+    record = row_to_record(["Name", "Type", "Availability", "Date created"],
+                           ["Buyers", "Custom audience", "Ready", "01/02/2024"],
+                           links=["/adsmanager/audiences?act=1&ids=23851234567890123"])
+    assert record["Audience ID"] == "23851234567890123"
+
+def test_complete_table_is_extracted():
+    page = MockPage({"recognized": True, "headers": HEADERS, "rows": [
+        {"cells": ["", "Buyers", "Custom audience", "Ready", "01/02/2024", "23851234567890123"], "links": []},
+    ]})
+    result = asyncio.run(read_audience_rows_from_dom(page))
+    assert result.complete and len(result.rows) == 1
+
+def test_incomplete_or_unknown_tables_fall_back():
+    incomplete = MockPage({"recognized": True, "headers": HEADERS, "rows": [
+        {"cells": ["", "Buyers", "", "Ready", "01/02/2024", "23851234567890123"], "links": []},
+    ]})
+    result = asyncio.run(read_audience_rows_from_dom(incomplete))
+    assert not result.complete and result.incomplete_rows == 1
+    assert not asyncio.run(read_audience_rows_from_dom(MockPage({"recognized": False}))).complete
+    assert not asyncio.run(read_audience_rows_from_dom(None)).complete
+
+def test_unknown_modes_are_rejected():
+    for mode in ("auto", "dom", "vision"):
+        assert ExtractAudienceDataAction(mode=mode).mode == mode
+    # A typo must not silently take the (paid) vision path
+    for mode in ("DOM", "doms", ""):
+        with pytest.raises(ValidationError):
+            ExtractAudienceDataAction(mode=mode)
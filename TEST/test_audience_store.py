@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the indexed audience store in audience_store.py.
+Verifies that:
+1. Upserts insert new Audience IDs and update known ones without duplicates
+2. An existing JSON file is imported once and exported back in the same format
+3. Concurrent writers to the same file do not lose each other's rows
+"""
+
+import json
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions.audience_store import (
+    AudienceStore, open_store_for_json, save_audience_records, store_path_for,
+)
+
+def record(audience_id, name="Audience", availability="Ready"):
+    return {"Name": name, "Type": "Custom audience", "Availability": availability,
+            "Date created": "01/01/2023", "Audience ID": audience_id}
+
+def test_upsert_inserts_and_updates():
+    with tempfile.TemporaryDirectory() as tmp, AudienceStore(str(Path(tmp) / "store.sqlite")) as store:
+        assert store.upsert([record("1000000000001"), record("1000000000002")]) == (2, 0)
+        # Known ID updated with the non-empty values only; a row without ID is kept as its own row
+        assert store.upsert([record("1000000000001", availability=""), record("1000000000003", name="New"),
+                             record("", name="No ID")]) == (2, 1)
+        assert store.count() == 4
+        first = store.records()[0]
+        assert first["Audience ID"] == "1000000000001" and first["Availability"] == "Ready"
+
+def test_existing_json_imported_and_exported():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = str(Path(tmp) / "audiences.json")
+        existing = [dict(record("1000000000001"), Extra="kept")]
+        Path(json_path).write_text(json.dumps(existing))
+
+        stats = save_audience_records(json_path, [record("1000000000001"), record("1000000000002")])
+        assert stats == {"inserted": 1, "updated": 1, "total": 2, "exported": 2}
+        data = json.loads(Path(json_path).read_text())
+        assert [item["Audience ID"] for item in data] == ["1000000000001", "1000000000002"]
+        assert data[0]["Extra"] == "kept"
+
+        # Without export the file is left alone while the store keeps growing
+        save_audience_records(json_path, [record("1000000000003")], export_json=False)
+        assert len(json.loads(Path(json_path).read_text())) == 2
+        with AudienceStore(store_path_for(json_path)) as store:
+            assert store.count() == 3
+
+def test_malformed_json_rejected():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = str(Path(tmp) / "broken.json")
+        Path(json_path).write_text("{not valid json")
+        with pytest.raises(ValueError):
+            open_store_for_json(json_path)
+
+def test_concurrent_writers_keep_all_rows():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = str(Path(tmp) / "shared.json")
+
+        def write_page(page):
+            rows = [record(str(2000000000000 + page * 100 + i)) for i in range(20)]
+            # Every page repeats one shared audience
+            rows.append(record("1999999999999"))
+            save_audience_records(json_path, rows)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(write_page, range(16)))
+
+        data = json.loads(Path(json_path).read_text())
+        assert len(data) == 16 * 20 + 1
+        assert len({item["Audience ID"] for item in data}) == len(data)
+
+if __name__ == "__main__":
+    test_upsert_inserts_and_updates()
+    test_existing_json_imported_and_exported()
+    test_malformed_json_rejected()
+    test_concurrent_writers_keep_all_rows()
+    print("All audience store tests passed")
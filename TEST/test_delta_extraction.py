@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the delta vision extraction (only the rows revealed by a scroll).
+Verifies that:
+1. After a scroll only the newly revealed row band is sent to the vision model
+2. An unchanged screen after the previous extraction needs no vision call at all
+3. A screenshot that cannot be aligned with the previous one is transcribed whole
+"""
+
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions.action_extract_audience_data import _extract_with_vision
+
+IMAGES = Path(__file__).parent.parent / "training_images" / "output_images_condition_stop_audience_page"
+BEFORE_SCROLL = IMAGES / "screenshot_2025-03-27_13-05-52_396.png"
+AFTER_SCROLL = IMAGES / "screenshot_2025-03-27_13-07-07_590.png"
+OTHER_PAGE = IMAGES / "screenshot_2025-04-02_09-22-51_686.png"
+
+class MockBrowserContext:
+    """Mock browser context whose screenshot can be swapped between calls"""
+    def __init__(self, path):
+        self.path = path
+
+    async def get_current_page(self):
+        return None
+
+    async def take_screenshot(self, full_page=False):
+        return base64.b64encode(self.path.read_bytes()).decode("ascii")
+
+class ImageRecordingClient:
+    """Mock client recording the height of every image it is sent"""
+    def __init__(self):
+        self.messages = self
+        self.heights = []
+
+    async def create(self, **kwargs):
+        source = kwargs["messages"][0]["content"][1]["source"]
+        self.heights.append(Image.open(io.BytesIO(base64.b64decode(source["data"]))).height)
+        rows = [{"Name": "A", "Type": "Custom audience", "Availability": "Ready",
+                 "Date created": "01/01/2023", "Audience ID": str(1234567890123 + len(self.heights))}]
+        return MagicMock(content=[MagicMock(text=f"```json\n{json.dumps(rows)}\n```")])
+
+def run_extractions(paths):
+    client = ImageRecordingClient()
+    browser = MockBrowserContext(paths[0])
+    logger = logging.getLogger("test_delta_extraction")
+    results = []
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test", "VISION_CACHE_DISABLED": "1"}), \
+         patch("remote_tools_folders.controller_actions.llm_clients.get_anthropic_client", return_value=client):
+        for path in paths:
+            browser.path = path
+            result = asyncio.run(_extract_with_vision(browser, logger, delta=True))
+            assert result.error is None
+            results.append(result.rows)
+    return client, results
+
+def test_only_revealed_rows_sent_after_scroll():
+    client, results = run_extractions([BEFORE_SCROLL, AFTER_SCROLL])
+    full_height, delta_height = client.heights
+    # About four of the ~fourteen visible rows are new (plus the header strip)
+    assert delta_height < full_height / 2
+    assert len(results[1]) == 1
+
+def test_unchanged_screen_needs_no_call():
+    client, results = run_extractions([AFTER_SCROLL, AFTER_SCROLL])
+    assert len(client.heights) == 1
+    assert results[1] == []
+
+def test_unaligned_screenshot_transcribed_whole():
+    client, _ = run_extractions([BEFORE_SCROLL, OTHER_PAGE])
+    assert len(client.heights) == 2
+    assert abs(client.heights[1] - client.heights[0]) < client.heights[0] / 10
+
+if __name__ == "__main__":
+    test_only_revealed_rows_sent_after_scroll()
+    test_unchanged_screen_needs_no_call()
+    test_unaligned_screenshot_transcribed_whole()
+    print("All delta extraction tests passed")
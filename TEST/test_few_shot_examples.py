@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the few-shot example registry used by check_condition_stop_page_wheel.
+Verifies that:
+1. The example images are loaded, downscaled and encoded once and the prefix is reused
+2. Changing, adding or removing an example file rebuilds the prefix
+3. A stop check sends a fresh copy of the prefix followed by the live screenshot, without reloading
+"""
+
+import asyncio
+import base64
+import io
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from PIL import Image
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions import action_check_condition_stop_page_wheel as stop_check
+from remote_tools_folders.controller_actions.few_shot_examples import FewShotRegistry
+from remote_tools_folders.controller_actions.table_region import MAX_LONG_EDGE_PX
+
+EXAMPLES = Path(__file__).parent.parent / "training_images" / "train-condition-scroll-audience-page"
+
+class MockBrowserContext:
+    """Mock browser context returning a training screenshot"""
+    async def get_current_page(self):
+        return None
+
+    async def take_screenshot(self, full_page=False):
+        return base64.b64encode((EXAMPLES / "2.png").read_bytes()).decode("ascii")
+
+class RecordingAnthropicClient:
+    """Mock client recording the requests and answering CONTINUE 100px"""
+    def __init__(self):
+        self.messages = self
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        text = "<reasoning>\nAbout two rows left.\n</reasoning>\n<decision>\nCONTINUE\n100px\n</decision>"
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)])
+
+def test_examples_encoded_once():
+    registry = FewShotRegistry(str(EXAMPLES), stop_check._build_example_messages)
+    prefix = registry.load()
+    assert registry.load() is prefix and registry.loads == 1
+    assert [example.name for example in prefix.examples] == ["1.png", "2.png", "3.png", "4.png", "5.png"]
+    # Introduction exchange plus one question/answer pair per example
+    assert len(prefix.prefix) == 2 + 2 * len(prefix.examples)
+    for example in prefix.examples:
+        size = Image.open(io.BytesIO(base64.b64decode(example.data))).size
+        assert max(size) <= MAX_LONG_EDGE_PX
+    assert sum(len(example.data) for example in prefix.examples) < sum(
+        os.path.getsize(EXAMPLES / example.name) for example in prefix.examples)
+
+def test_changed_files_rebuild_prefix():
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("1.png", "2.png"):
+            shutil.copy(EXAMPLES / name, directory)
+        registry = FewShotRegistry(directory, stop_check._build_example_messages)
+        first = registry.load()
+        stat = os.stat(os.path.join(directory, "1.png"))
+        os.utime(os.path.join(directory, "1.png"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        second = registry.load()
+        assert second is not first and second.key != first.key and registry.loads == 2
+        os.remove(os.path.join(directory, "2.png"))
+        assert len(registry.load().examples) == 1 and registry.loads == 3
+
+def test_stop_check_uses_shared_prefix():
+    registry = FewShotRegistry(str(EXAMPLES), stop_check._build_example_messages)
+    client = RecordingAnthropicClient()
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test", "VISION_CACHE_DISABLED": "1"}), \
+         patch.object(stop_check, "_stop_check_examples", registry), \
+         patch.object(stop_check, "thumb_decision", return_value=None), \
+         patch("remote_tools_folders.controller_actions.llm_clients.get_anthropic_client", return_value=client):
+        for _ in range(2):
+            result = asyncio.run(stop_check.perform_check_condition_stop_page_wheel(MockBrowserContext()))
+            assert result.error is None and "CONTINUE with 100px" in result.extracted_content
+    assert registry.loads == 1
+    prefix = registry.load().prefix
+    for request in client.requests:
+        assert request["messages"][:len(prefix)] == list(prefix)
+        assert request["messages"][-1]["content"][1]["type"] == "image"
+    # Each request gets its own copy: mutating one leaves the shared prefix intact
+    client.requests[0]["messages"][0]["content"].clear()
+    assert prefix[0]["content"] and client.requests[1]["messages"][0]["content"]
+
+if __name__ == "__main__":
+    test_examples_encoded_once()
+    test_changed_files_rebuild_prefix()
+    test_stop_check_uses_shared_prefix()
+    print("All few-shot example tests passed")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared async LLM clients in llm_clients.py.
+Verifies that:
+1. One AsyncAnthropic client is shared per event loop and API key
+2. Concurrent calls are limited per provider without blocking the event loop
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions import llm_clients
+
+class SlowMessages:
+    """Mock messages API that records how many calls overlap"""
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+
+    async def create(self, **kwargs):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return kwargs["model"]
+
+class MockClient:
+    def __init__(self):
+        self.messages = SlowMessages()
+
+async def _shared_client():
+    first = llm_clients.get_anthropic_client("key-a")
+    second = llm_clients.get_anthropic_client("key-a")
+    other = llm_clients.get_anthropic_client("key-b")
+    await llm_clients.close_llm_clients()
+    return first is second and first is not other
+
+def test_client_is_shared_per_key():
+    assert asyncio.run(_shared_client())
+
+async def _concurrent_calls(client):
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        for _ in range(5):
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    results = await asyncio.gather(heartbeat(), *[llm_clients.create_anthropic_message(model=f"m{i}") for i in range(10)])
+    return results[1:], ticks
+
+def test_calls_respect_provider_limit(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_MAX_CONCURRENCY", "3")
+    client = MockClient()
+    with patch.object(llm_clients, "get_anthropic_client", return_value=client):
+        results, ticks = asyncio.run(_concurrent_calls(client))
+    assert results == [f"m{i}" for i in range(10)]
+    assert client.messages.peak == 3
+    assert ticks == 5
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the mouse trajectory engine in mouse_trajectory.py.
+Verifies that:
+1. Every model starts and ends exactly on the requested points with increasing timestamps
+2. Fitts' law makes long moves to small targets slower
+3. Minimum-jerk moves are fastest mid-way
+4. Bezier moves overshoot the target before correcting
+5. The move_mouse and pointer_sequence schemas only accept the available trajectory models and wait states
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions.action_move_mouse import MouseMoveAction
+from remote_tools_folders.controller_actions.action_pointer_sequence import PointerSequenceAction
+from remote_tools_folders.controller_actions.mouse_trajectory import (
+    TRAJECTORY_MODELS,
+    compute_trajectory,
+    fitts_duration_ms,
+)
+
+def test_models_hit_endpoints_with_monotonic_time():
+    for model in TRAJECTORY_MODELS:
+        trajectory = compute_trajectory(10, 20, 610, 420, model=model, min_points=15, seed=1)
+        assert (trajectory.x[0], trajectory.y[0]) == (10, 20)
+        assert (trajectory.x[-1], trajectory.y[-1]) == (610, 420)
+        assert trajectory.point_count >= 15
+        assert trajectory.t_ms[0] == 0
+        assert np.all(np.diff(trajectory.t_ms) > 0)
+        assert abs(trajectory.t_ms[-1] - trajectory.duration_ms) < 1e-6
+
+def test_fitts_duration_scales_with_difficulty():
+    assert fitts_duration_ms(800, 10) > fitts_duration_ms(800, 100) > fitts_duration_ms(50, 100)
+    slow = compute_trajectory(0, 0, 800, 0, target_width=10, seed=2)
+    fast = compute_trajectory(0, 0, 100, 0, target_width=10, seed=2)
+    assert slow.duration_ms > fast.duration_ms
+    assert slow.point_count > fast.point_count
+
+def test_minimum_jerk_peaks_mid_movement():
+    trajectory = compute_trajectory(0, 0, 1000, 0, model="minimum_jerk", seed=3)
+    speed = np.hypot(np.diff(trajectory.x), np.diff(trajectory.y)) / np.diff(trajectory.t_ms)
+    peak = np.argmax(speed) / len(speed)
+    assert 0.3 < peak < 0.7
+    assert speed[0] < speed.max() * 0.3 and speed[-1] < speed.max() * 0.3
+
+def test_bezier_overshoots_then_corrects():
+    trajectory = compute_trajectory(0, 0, 500, 0, model="bezier", seed=4)
+    assert trajectory.x.max() > 500 + 500 * 0.02
+    assert trajectory.x[-1] == 500
+
+def test_schema_rejects_unknown_models():
+    for model in TRAJECTORY_MODELS:
+        assert MouseMoveAction(x=1, y=2, steps=5, trajectory=model).trajectory == model
+    with pytest.raises(ValidationError):
+        MouseMoveAction(x=1, y=2, steps=5, trajectory="teleport")
+    schema = MouseMoveAction.model_json_schema()["properties"]["trajectory"]
+    assert schema["enum"] == list(TRAJECTORY_MODELS)
+    # The pointer sequence rejects bad values at validation, before anything is clicked
+    assert PointerSequenceAction(x=1, y=2, trajectory="arc", expect_state="detached").expect_state == "detached"
+    with pytest.raises(ValidationError):
+        PointerSequenceAction(x=1, y=2, trajectory="teleport")
+    with pytest.raises(ValidationError):
+        PointerSequenceAction(x=1, y=2, expect_selector="div[role=dialog]", expect_state="shown")
@@ -5,6 +5,8 @@ This test verifies that:
 1. The mouse_wheel function works correctly
 2. Logs are properly written to the file
 3. No logs appear in the terminal output
+
+The scrolls run on a VirtualClock, so the human-like delays are recorded instead of slept.
 """
 
 import os
@@ -16,6 +18,8 @@ from pathlib import Path
 # Add the parent directory to the path to import the custom controller module
 sys.path.append(str(Path(__file__).parent.parent))
 from remote_tools_folders.custom_controller import mouse_wheel, MouseWheelAction
+from remote_tools_folders.controller_actions.clock import VirtualClock, use_clock
+from remote_tools_folders.controller_actions.action_logging import ACTION_LOG_FILES, DEFAULT_LOG_DIR, flush_action_logs
 from browser_use.browser.context import BrowserContext
 
 class MockPage:
@@ -29,6 +33,10 @@ class MockPage:
         """Return mock viewport size"""
         return self.viewport_size_value
     
+    async def evaluate(self, expression, arg=None):
+        """Mock evaluate (no mouse position globals are set)"""
+        return {}
+    
     async def wait_for_load_state(self, state, timeout=None):
         """Mock wait for load state"""
         await asyncio.sleep(0.1)  # Simulate a small delay
@@ -78,8 +86,8 @@ async def test_mouse_wheel():
     browser = MockBrowserContext()
     
     # Clear the log file if it exists
-    log_dir = "/Users/meirsabag/Public/browser_use_ver4_newVersion/logs"
-    log_file = os.path.join(log_dir, "mouse_wheel_actions.log")
+    log_dir = os.environ.get("CONTROLLER_LOG_DIR", DEFAULT_LOG_DIR)
+    log_file = os.path.join(log_dir, ACTION_LOG_FILES["mouse_wheel"])
     
     try:
         os.makedirs(log_dir, exist_ok=True)
@@ -103,7 +111,8 @@ async def test_mouse_wheel():
         wheel_events = browser.page.mouse.wheel_events
         print(f"Total wheel events recorded: {len(wheel_events)}")
         
-        # Check if the log file was created
+        # Check if the log file was created (records are written by the shared logging thread)
+        flush_action_logs()
         if os.path.exists(log_file):
             file_size = os.path.getsize(log_file)
             print(f"Log file created successfully: {log_file} ({file_size} bytes)")
@@ -147,6 +156,7 @@ async def test_mouse_wheel():
     print("\nAll tests completed.")
     
     # Check final log file size
+    flush_action_logs()
     if os.path.exists(log_file):
         final_size = os.path.getsize(log_file)
         print(f"Final log file size: {final_size} bytes")
@@ -159,7 +169,9 @@ async def test_mouse_wheel():
 
 async def main():
     """Main function to run the test"""
-    await test_mouse_wheel()
+    with use_clock(VirtualClock()) as clock:
+        await test_mouse_wheel()
+    print(f"Simulated scrolling time: {clock.elapsed:.2f} seconds ({len(clock.schedule)} recorded waits)")
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
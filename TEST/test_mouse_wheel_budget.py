@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the time budget reporting of the mouse_wheel action.
+Verifies that:
+1. The returned result reports planned and actual duration and whether the budget was met
+2. A scroll with a budget finishes within it (in virtual time)
+3. A scroll without a budget reports max_duration_ms=None and counts as within budget
+"""
+
+import asyncio
+import re
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions.action_mouse_wheel import MouseWheelAction, perform_mouse_wheel
+from remote_tools_folders.controller_actions.clock import VirtualClock, use_clock
+
+class MockMouse:
+    """Mock mouse accepting wheel events"""
+    async def wheel(self, delta_x, delta_y):
+        pass
+
+class MockPage:
+    """Mock page without CDP support whose page scripts fail (no scroll metrics, no settle detection)"""
+    context = None
+
+    def __init__(self):
+        self.mouse = MockMouse()
+
+    def on(self, event, handler):
+        pass
+
+    async def evaluate(self, expression, arg=None):
+        raise RuntimeError("Execution context was destroyed")
+
+class MockBrowserContext:
+    """Mock browser context returning the mock page"""
+    def __init__(self):
+        self.page = MockPage()
+
+    async def get_current_page(self):
+        return self.page
+
+def run_scroll(**params):
+    with use_clock(VirtualClock()) as clock:
+        result = asyncio.run(perform_mouse_wheel(MouseWheelAction(**params), MockBrowserContext()))
+    assert result.error is None, result.error
+    timing = dict(re.findall(r"(\w+)=([^,\]]+)", result.extracted_content))
+    return result, timing, clock
+
+def test_result_reports_timing():
+    result, timing, clock = run_scroll(delta_y=500, max_duration_ms=4000)
+    assert {"planned_duration_ms", "actual_duration_ms", "max_duration_ms", "budget_met"} <= timing.keys()
+    assert abs(float(timing["actual_duration_ms"]) - clock.elapsed * 1000) < 1.0
+    assert timing["max_duration_ms"] == "4000"
+
+def test_budget_met():
+    _, timing, _ = run_scroll(delta_y=800, max_duration_ms=2500)
+    assert float(timing["planned_duration_ms"]) <= 2500
+    assert float(timing["actual_duration_ms"]) <= 2500
+    assert timing["budget_met"] == "True"
+
+def test_unbounded_scroll():
+    _, timing, _ = run_scroll(delta_y=300)
+    assert timing["max_duration_ms"] == "None" and timing["budget_met"] == "True"
+    assert float(timing["actual_duration_ms"]) >= float(timing["planned_duration_ms"]) > 0
+
+if __name__ == "__main__":
+    test_result_reports_timing()
+    test_budget_met()
+    test_unbounded_scroll()
+    print("All mouse wheel budget tests passed")
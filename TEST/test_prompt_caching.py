@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the provider prompt caching of the scroll-stop few-shot prefix.
+Verifies that:
+1. The stand-in Messages API caches marked prefixes: a miss writes them, a repeat reads them, expiry and changes miss
+2. A stop check marks the system prompt and the example conversation as cacheable, within the marker limit
+3. Repeated stop checks on different screenshots hit the cache and only the live screenshot is new input
+"""
+
+import asyncio
+import base64
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from messages_api_stand_in import MAX_CACHE_MARKERS, TTL_S, MessagesApiStandIn
+from remote_tools_folders.controller_actions import action_check_condition_stop_page_wheel as stop_check
+from remote_tools_folders.controller_actions.clock import VirtualClock, use_clock
+from remote_tools_folders.controller_actions.few_shot_examples import FewShotRegistry
+from remote_tools_folders.controller_actions.llm_clients import CACHE_CONTROL, prompt_cache_stats
+
+EXAMPLES = Path(__file__).parent.parent / "training_images" / "train-condition-scroll-audience-page"
+SCREENSHOTS = Path(__file__).parent.parent / "training_images" / "output_images_condition_stop_audience_page"
+ANSWER = "<reasoning>\nAbout two rows left.\n</reasoning>\n<decision>\nCONTINUE\n100px\n</decision>"
+
+class MockBrowserContext:
+    """Mock browser context returning a fixed screenshot"""
+    def __init__(self, path):
+        self.path = path
+
+    async def get_current_page(self):
+        return None
+
+    async def take_screenshot(self, full_page=False):
+        return base64.b64encode(self.path.read_bytes()).decode("ascii")
+
+def request(system_text, question):
+    return dict(model="claude-3-7-sonnet-20250219", max_tokens=100,
+                system=[{"type": "text", "text": system_text, "cache_control": CACHE_CONTROL}],
+                messages=[{"role": "user", "content": [{"type": "text", "text": question}]}])
+
+def test_stand_in_reads_written_prefix():
+    api = MessagesApiStandIn(ANSWER)
+    system_text = "Decide whether to keep scrolling. " * 200
+    clock = VirtualClock()
+    with use_clock(clock):
+        first = asyncio.run(api.create(**request(system_text, "first screenshot")))
+        second = asyncio.run(api.create(**request(system_text, "second screenshot")))
+        changed = asyncio.run(api.create(**request(system_text + "!", "second screenshot")))
+        clock.advance(TTL_S + 1)
+        expired = asyncio.run(api.create(**request(system_text, "third screenshot")))
+    assert first.usage.cache_read_input_tokens == 0 and first.usage.cache_creation_input_tokens > 0
+    assert second.usage.cache_read_input_tokens == first.usage.cache_creation_input_tokens
+    assert second.usage.cache_creation_input_tokens == 0
+    assert changed.usage.cache_read_input_tokens == 0 and expired.usage.cache_read_input_tokens == 0
+
+def run_stop_checks(screenshots):
+    registry = FewShotRegistry(str(EXAMPLES), stop_check._build_example_messages)
+    api = MessagesApiStandIn(ANSWER)
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test", "VISION_CACHE_DISABLED": "1"}), \
+         patch.object(stop_check, "_stop_check_examples", registry), \
+         patch.object(stop_check, "thumb_decision", return_value=None), \
+         patch("remote_tools_folders.controller_actions.llm_clients.get_anthropic_client", return_value=api):
+        for screenshot in screenshots:
+            result = asyncio.run(stop_check.perform_check_condition_stop_page_wheel(MockBrowserContext(screenshot)))
+            assert result.error is None, result.error
+    return api
+
+def test_prefix_marked_cacheable():
+    api = run_stop_checks([EXAMPLES / "1.png"])
+    request = api.requests[0]
+    assert request["system"][0]["cache_control"] == CACHE_CONTROL
+    markers = [block for message in request["messages"] for block in message["content"] if "cache_control" in block]
+    assert len(markers) + 1 <= MAX_CACHE_MARKERS
+    # The last example answer closes the cached prefix; the live screenshot is after it
+    assert request["messages"][-2]["content"][-1].get("cache_control") == CACHE_CONTROL
+    assert all("cache_control" not in block for block in request["messages"][-1]["content"])
+
+def test_repeated_checks_hit_prompt_cache():
+    before = prompt_cache_stats()
+    screenshots = sorted(SCREENSHOTS.glob("*.png"))[:3]
+    api = run_stop_checks(screenshots)
+    after = prompt_cache_stats()
+    assert after["misses"] - before["misses"] == 1 and after["hits"] - before["hits"] == 2
+    first, *repeats = api.usages
+    for usage in repeats:
+        assert usage.cache_read_input_tokens == first.cache_creation_input_tokens
+        # Only the live question and screenshot are processed as new input
+        assert usage.input_tokens < usage.cache_read_input_tokens / 3
+
+if __name__ == "__main__":
+    test_stand_in_reads_written_prefix()
+    test_prefix_marked_cacheable()
+    test_repeated_checks_hit_prompt_cache()
+    print("All prompt caching tests passed")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the DOM scroll oracle used by check_condition_stop_page_wheel.
+Verifies that:
+1. The row rules map the rows below the scroll bar thumb to the stop-check decisions, capped at the pixels left
+2. A stop check on a readable audience grid decides from its scroll metrics without calling the API
+3. The stop check falls back to the vision model when the grid's scroll container cannot be read
+4. A grid that does not scroll itself is decided from its scrolling wrapper, or left to the screenshot when none scrolls
+"""
+
+import asyncio
+import base64
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions import action_check_condition_stop_page_wheel as stop_check
+from remote_tools_folders.controller_actions.scroll_oracle import decide_from_rows, scroll_decision
+
+SCREENSHOT = Path(__file__).parent.parent / "training_images" / "train-condition-scroll-audience-page" / "2.png"
+
+def grid_metrics(scroll_top, scroll_height=4000, client_height=800, row_height=40, container="div.grid-body",
+                 scrollable=True):
+    return {"container": container, "scrollable": scrollable, "scroll_top": scroll_top, "scroll_left": 0,
+            "scroll_height": scroll_height, "scroll_width": 1200, "client_height": client_height,
+            "client_width": 1200, "first_visible_row": 1, "last_visible_row": 20,
+            "visible_row_count": 20, "row_height": row_height, "aria_row_count": None}
+
+class MockPage:
+    """Mock Playwright page returning fixed scroll metrics (or raising)"""
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    async def evaluate(self, script, arg=None):
+        if isinstance(self.metrics, Exception):
+            raise self.metrics
+        return dict(self.metrics)
+
+class MockBrowserContext:
+    """Mock browser context with a page and a training screenshot"""
+    def __init__(self, page):
+        self.page = page
+
+    async def get_current_page(self):
+        return self.page
+
+    async def take_screenshot(self, full_page=False):
+        return base64.b64encode(SCREENSHOT.read_bytes()).decode("ascii")
+
+class CountingAnthropicClient:
+    """Mock client counting the requests and answering CONTINUE 100px"""
+    def __init__(self):
+        self.messages = self
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        text = "<reasoning>\nAbout two rows left.\n</reasoning>\n<decision>\nCONTINUE\n100px\n</decision>"
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)])
+
+def run_stop_check(page):
+    client = CountingAnthropicClient()
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test", "VISION_CACHE_DISABLED": "1"}), \
+         patch.object(stop_check, "thumb_decision", return_value=None), \
+         patch("remote_tools_folders.controller_actions.llm_clients.get_anthropic_client", return_value=client):
+        result = asyncio.run(stop_check.perform_check_condition_stop_page_wheel(MockBrowserContext(page)))
+    assert result.error is None, result.error
+    return result, client
+
+def test_row_rules():
+    assert decide_from_rows(12) == {"decision": "CONTINUE", "scroll_value": 600}
+    assert decide_from_rows(7) == {"decision": "CONTINUE", "scroll_value": 600}
+    assert decide_from_rows(6.9) == {"decision": "CONTINUE", "scroll_value": 500}
+    assert decide_from_rows(3) == {"decision": "CONTINUE", "scroll_value": 500}
+    assert decide_from_rows(2) == {"decision": "CONTINUE", "scroll_value": 100}
+    assert decide_from_rows(1) == {"decision": "STOP", "scroll_value": 0}
+    assert decide_from_rows(0) == {"decision": "STOP", "scroll_value": 0}
+    # Never ask for more than is left to scroll
+    assert decide_from_rows(12, remaining_px=250) == {"decision": "CONTINUE", "scroll_value": 250}
+
+def test_decision_from_grid_metrics():
+    # 3200px left of 4000px in an 800px view: the thumb ends 640px (16 rows) above the track end
+    top = asyncio.run(scroll_decision(MockPage(grid_metrics(0))))
+    assert top["decision"] == "CONTINUE" and top["scroll_value"] == 600 and top["rows_left"] == 16
+    # 500px left: the thumb ends 100px (2.5 rows) above the track end
+    near_end = asyncio.run(scroll_decision(MockPage(grid_metrics(2700))))
+    assert near_end["decision"] == "CONTINUE" and near_end["scroll_value"] == 100
+    assert asyncio.run(scroll_decision(MockPage(grid_metrics(3200))))["decision"] == "STOP"
+
+    result, client = run_stop_check(MockPage(grid_metrics(0)))
+    assert client.calls == 0
+    assert "CONTINUE with 600px" in result.extracted_content
+
+def test_falls_back_to_vision():
+    assert asyncio.run(scroll_decision(None)) is None
+    for page in (MockPage(grid_metrics(0, container="document")),
+                 MockPage(grid_metrics(0, row_height=None)),
+                 MockPage(RuntimeError("Execution context was destroyed"))):
+        assert asyncio.run(scroll_decision(page)) is None
+        result, client = run_stop_check(page)
+        assert client.calls == 1
+        assert "CONTINUE with 100px" in result.extracted_content
+
+def test_grid_inside_scrolling_wrapper():
+    # The grid element does not scroll; the script resolves its scrolling ancestor and reads that
+    wrapper = asyncio.run(scroll_decision(MockPage(grid_metrics(0, container="div#scroll-wrapper"))))
+    assert wrapper["decision"] == "CONTINUE" and "div#scroll-wrapper" in wrapper["reasoning"]
+    # No scrolling element around the grid: its remaining_y of 0 must not read as the end of the table
+    static_grid = MockPage(grid_metrics(0, scroll_height=800, container="div[role=grid]", scrollable=False))
+    assert asyncio.run(scroll_decision(static_grid)) is None
+    result, client = run_stop_check(static_grid)
+    assert client.calls == 1
+    assert "CONTINUE with 100px" in result.extracted_content
+
+if __name__ == "__main__":
+    test_row_rules()
+    test_decision_from_grid_metrics()
+    test_falls_back_to_vision()
+    test_grid_inside_scrolling_wrapper()
+    print("All scroll oracle tests passed")
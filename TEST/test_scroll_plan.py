@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the precompiled scroll plans in scroll_plan.py.
+Verifies that:
+1. Plans are reproducible from a seed
+2. Segments and wheel steps add up to the requested distance
+3. Delays stay inside the ranges observed in real human scrolling data
+4. Every profile kernel compiles
+5. Time budgets are met while the full distance is still scrolled
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions.scroll_plan import (
+    PROFILE_KERNELS,
+    compile_scroll_plan,
+    plan_segments,
+)
+
+def test_seeded_plans_are_reproducible():
+    first = compile_scroll_plan(0, 600, seed=42)
+    second = compile_scroll_plan(0, 600, seed=42)
+    assert np.array_equal(first.as_array(), second.as_array())
+    assert np.array_equal(first.initial_delay_ms, second.initial_delay_ms)
+    assert first.total_duration_ms == second.total_duration_ms
+
+def test_segments_sum_to_total_distance():
+    rng = np.random.default_rng(0)
+    for total in (0, 3, -5, 7, 150, -350, 800, 2000):
+        segments = plan_segments(total, rng)
+        assert segments.sum() == total
+        assert 1 <= len(segments) <= 8
+
+def test_steps_cover_distance_except_tremors():
+    plan = compile_scroll_plan(120, -450, seed=7)
+    assert plan.step_count == 120 + 450
+    assert plan.segments_x.sum() == 120
+    assert plan.segments_y.sum() == -450
+    # Micro-tremors skip roughly 1% of the pixels, never change direction
+    assert 0 <= 120 - plan.dx.sum() <= 10
+    assert 0 <= plan.dy.sum() + 450 <= 20
+    assert set(np.unique(plan.dx)) <= {0, 1}
+    assert set(np.unique(plan.dy)) <= {-1, 0}
+
+def test_delays_follow_human_timing_ranges():
+    plan = compile_scroll_plan(0, 5000, seed=1)
+    delay = plan.delay_ms
+    assert delay.min() >= 7.0
+    assert delay.max() <= 450.0
+    # Most steps use the 15-18ms base delay, ~7% are 7-9ms micro-bursts
+    assert 0.75 < np.mean((delay >= 15) & (delay <= 18)) < 0.85
+    assert 0.05 < np.mean(delay <= 9) < 0.09
+
+def test_all_profile_kernels_compile():
+    for profile in PROFILE_KERNELS:
+        plan = compile_scroll_plan(0, 300, seed=3, profile=profile)
+        assert plan.summary()["profile"] == profile
+        assert np.all(plan.delay_ms > 0)
+
+def test_plans_fit_time_budget():
+    unbounded = compile_scroll_plan(0, 800, seed=5)
+    for budget in (20000, 5000, 1000, 200):
+        plan = compile_scroll_plan(0, 800, seed=5, max_duration_ms=budget)
+        assert plan.total_duration_ms <= budget + 1.0
+        assert plan.metadata["budget_met"]
+        # Compression never drops pixels: only micro-tremor skips are missing
+        assert abs(plan.dy.sum() - 800) <= 20
+    assert compile_scroll_plan(0, 800, seed=5, max_duration_ms=unbounded.total_duration_ms * 2).metadata["compression"] == {
+        "pause_scale": 1.0, "step_scale": 1.0, "merge_factor": 1}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the pixel-based scroll bar thumb detector used by check_condition_stop_page_wheel.
+Verifies that:
+1. On the labelled training screenshots the thumb is found and the rows below it give the labelled decisions
+2. A synthetic table gives the exact thumb position and row count, and a table without a thumb gives None
+3. A stop check without readable scroll metrics decides from the screenshot without calling the API
+"""
+
+import asyncio
+import base64
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+from PIL import Image
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions import action_check_condition_stop_page_wheel as stop_check
+from remote_tools_folders.controller_actions.scrollbar_thumb import detect_scrollbar_thumb, thumb_decision
+
+EXAMPLES = Path(__file__).parent.parent / "training_images" / "train-condition-scroll-audience-page"
+# Decisions of the few-shot example answers (rows below the thumb: 6, 1.5, 1.5, <1, 7)
+LABELS = {"1.png": ("CONTINUE", 500), "3.png": ("CONTINUE", 100), "4.png": ("STOP", 0), "5.png": ("CONTINUE", 600)}
+
+def synthetic_table(thumb_top=None, thumb_bottom=None, rows=10, row_height=60, width=1200):
+    """White page with a header line, row separators, text-like marks and an optional gray thumb"""
+    header, bottom = 100, 100 + rows * row_height
+    image = np.full((bottom + 200, width), 255, dtype=np.uint8)
+    image[header:header + 2, 40:width - 40] = 210
+    for i in range(rows):
+        y = header + i * row_height
+        image[y + 20:y + 30, 80:400:6] = 40  # row text
+        image[y + row_height:y + row_height + 2, 40:width - 40] = 220
+    image[bottom + 8:bottom + 10, 40:width - 40] = 225  # bottom border of the table
+    if thumb_top is not None:
+        image[thumb_top:thumb_bottom, width - 56:width - 48] = 195
+    return image
+
+def test_training_screenshots():
+    for name in ("1.png", "2.png", "3.png", "4.png", "5.png"):
+        image = Image.open(EXAMPLES / name)
+        thumb = detect_scrollbar_thumb(image)
+        assert thumb is not None, name
+        assert thumb.right - thumb.left < 20 and thumb.left > 0.95 * image.width
+        result = thumb_decision(image)
+        if name in LABELS:
+            assert (result["decision"], result["scroll_value"]) == LABELS[name], (name, result)
+    # The answer of example 2 names an audience id that is not in its screenshot; the image
+    # itself shows the thumb 3.6 rows above the bottom border
+    assert 3 < thumb_decision(Image.open(EXAMPLES / "2.png"))["rows_left"] < 4
+
+def test_synthetic_table():
+    thumb = detect_scrollbar_thumb(synthetic_table(300, 500))
+    assert thumb is not None
+    assert (thumb.top, thumb.bottom) == (300, 500)
+    # Bottom border at 708 (lines are located to within a pixel): (708 - 500) / 60 rows below the thumb
+    assert abs(thumb.rows_left - 208 / 60) < 1.5 / 60
+    assert thumb_decision(synthetic_table(300, 500))["scroll_value"] == 500
+    assert thumb_decision(synthetic_table(500, 690))["decision"] == "STOP"
+    assert detect_scrollbar_thumb(synthetic_table()) is None
+    assert thumb_decision(np.full((400, 400), 255, dtype=np.uint8)) is None
+
+class MockBrowserContext:
+    """Mock browser context without a readable page, returning a training screenshot"""
+    async def get_current_page(self):
+        return None
+
+    async def take_screenshot(self, full_page=False):
+        return base64.b64encode((EXAMPLES / "5.png").read_bytes()).decode("ascii")
+
+def test_stop_check_uses_thumb():
+    client = SimpleNamespace(messages=SimpleNamespace(create=None))
+    env = {key: value for key, value in os.environ.items() if key != "ANTHROPIC_API_KEY"}
+    with patch.dict(os.environ, env, clear=True), \
+         patch.object(stop_check, "load_dotenv"), \
+         patch("remote_tools_folders.controller_actions.llm_clients.get_anthropic_client", return_value=client):
+        result = asyncio.run(stop_check.perform_check_condition_stop_page_wheel(MockBrowserContext()))
+    assert result.error is None, result.error
+    assert "CONTINUE with 600px" in result.extracted_content
+
+if __name__ == "__main__":
+    test_training_screenshots()
+    test_synthetic_table()
+    test_stop_check_uses_thumb()
+    print("All scrollbar thumb tests passed")
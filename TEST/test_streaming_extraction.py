@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming vision extraction of the audience table.
+Verifies that:
+1. The incremental parser returns each flat record as soon as its closing brace arrives, whatever the chunking
+2. Streamed rows are upserted into the store while the response is still arriving, and a dropped stream keeps them
+3. The rows of the forced record_audience_rows tool call are used as-is, and a text answer cut off
+   at max_tokens keeps its complete records instead of failing the page
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions.action_extract_audience_data import (
+    AUDIENCE_TOOL, ExtractAudienceDataAction, _transcribe_table_image, perform_extract_audience_data,
+)
+from remote_tools_folders.controller_actions.audience_store import store_path_for
+from remote_tools_folders.controller_actions.json_stream import FlatObjectParser
+
+SCREENSHOT = Path(__file__).parent.parent / "training_images" / "train-condition-scroll-audience-page" / "1.png"
+
+ROWS = [{"name": f"Lookalike (IL, {i}%) - \"Buyers\" {{90 days}}", "type": "Lookalike audience",
+         "availability": "Ready", "date_created": "09/19/2023 10:09 AM", "audience_id": str(23859203708050520 + i)}
+        for i in range(4)]
+RESPONSE = "```json\n" + json.dumps({"audience_data": ROWS}, indent=2) + "\n```"
+RECORDS = [{"Name": row["name"], "Type": row["type"], "Availability": row["availability"],
+            "Date created": row["date_created"], "Audience ID": row["audience_id"]} for row in ROWS]
+TOOL_INPUT = json.dumps({"rows": RECORDS})
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class MockBrowserContext:
+    """Mock browser context returning a real screenshot"""
+    async def get_current_page(self):
+        return None
+
+    async def take_screenshot(self, full_page=False):
+        return base64.b64encode(SCREENSHOT.read_bytes()).decode("ascii")
+
+class MockStream:
+    def __init__(self, parts, on_chunk, error=None):
+        self.parts = parts
+        self.on_chunk = on_chunk
+        self.error = error
+
+    async def __aiter__(self):
+        for part in self.parts:
+            self.on_chunk()
+            yield SimpleNamespace(type="input_json", partial_json=part)
+        if self.error:
+            raise self.error
+
+    async def get_final_message(self):
+        return MagicMock(stop_reason="end_turn")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+class MockStreamingClient:
+    """Mock client streaming the tool input in small chunks, recording the stored row count before each chunk"""
+    def __init__(self, parts, store_path, error=None):
+        self.messages = self
+        self.parts = parts
+        self.store_path = store_path
+        self.error = error
+        self.stored_counts = []
+
+    def _record_stored(self):
+        count = 0
+        if os.path.exists(self.store_path):
+            with sqlite3.connect(self.store_path) as connection:
+                count = connection.execute("SELECT COUNT(*) FROM audiences").fetchone()[0]
+        self.stored_counts.append(count)
+
+    def stream(self, **kwargs):
+        return MockStream(self.parts, self._record_stored, self.error)
+
+def test_parser_emits_records_as_they_close():
+    for size in (1, 7, len(RESPONSE)):
+        parser = FlatObjectParser()
+        records = [record for part in chunks(RESPONSE, size) for record in parser.feed(part)]
+        assert records == ROWS, size
+        assert not parser.inside_value
+    # A cut-off response yields only the complete records and reports the open value
+    parser = FlatObjectParser()
+    cut = RESPONSE[:RESPONSE.index(ROWS[2]["audience_id"])]
+    assert parser.feed(cut) == ROWS[:2] and parser.inside_value
+
+def test_streamed_rows_stored_before_cut_off():
+    cut = TOOL_INPUT[:TOOL_INPUT.index(ROWS[3]["audience_id"])]
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "audiences.json")
+        client = MockStreamingClient(chunks(cut, 40), store_path_for(file_path), error=ConnectionError("connection reset"))
+        params = ExtractAudienceDataAction(is_first_run=False, file_path=file_path, mode="vision", stream=True)
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test-key", "VISION_CACHE_DISABLED": "1"}), \
+             patch("remote_tools_folders.controller_actions.llm_clients.get_anthropic_client", return_value=client):
+            result = asyncio.run(perform_extract_audience_data(params, MockBrowserContext()))
+        assert result.error is None, result.error
+        assert "cut off" in result.extracted_content
+        # Rows reached the store while later chunks were still streaming
+        assert client.stored_counts[0] == 0 and {1, 2, 3} <= set(client.stored_counts)
+        with open(file_path) as f:
+            saved = json.load(f)
+        assert saved == RECORDS[:3]
+
+def transcribe(*content, stop_reason="end_turn"):
+    client = MagicMock()
+    client.messages.create = MagicMock(side_effect=lambda **kwargs: asyncio.sleep(0, SimpleNamespace(
+        content=list(content), stop_reason=stop_reason)))
+    with patch("remote_tools_folders.controller_actions.llm_clients.get_anthropic_client", return_value=client):
+        result = asyncio.run(_transcribe_table_image("test-key", "image/png", "", logging.getLogger("test")))
+    return result, client.messages.create.call_args.kwargs
+
+def test_tool_rows_used_and_truncated_text_kept():
+    tool_call = SimpleNamespace(type="tool_use", name=AUDIENCE_TOOL["name"], input={"rows": RECORDS})
+    result, request = transcribe(tool_call)
+    assert request["tool_choice"] == {"type": "tool", "name": AUDIENCE_TOOL["name"]}
+    assert result.error is None and not result.truncated and result.rows == RECORDS
+    # A text answer cut off at max_tokens keeps the records completed before the cut
+    cut = RESPONSE[:RESPONSE.index(ROWS[1]["audience_id"])]
+    result, _ = transcribe(SimpleNamespace(type="text", text=cut), stop_reason="max_tokens")
+    assert result.error is None and result.truncated and result.rows == RECORDS[:1]
+
+if __name__ == "__main__":
+    test_parser_emits_records_as_they_close()
+    test_streamed_rows_stored_before_cut_off()
+    test_tool_rows_used_and_truncated_text_kept()
+    print("All streaming extraction tests passed")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for the row-boundary segmentation in table_geometry.py.
+Verifies that:
+1. On the training screenshots the header, row height, bottom border and complete rows are measured
+2. A synthetic table gives the exact row boxes, with the rows cut off by the header or the border marked partial
+3. The table region, its tiles and a DOM box re-segmented inside use the same separators and bottom border
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions.table_geometry import segment_table
+from remote_tools_folders.controller_actions.table_region import TableRegion, detect_table_region, resolve_rows, table_tiles
+
+EXAMPLES = Path(__file__).parent.parent / "training_images" / "train-condition-scroll-audience-page"
+
+def synthetic_table(header_bottom=100, first_separator=130, rows=8, row_height=60, width=1000, cut=20):
+    """White page: header line, a row partially scrolled under it, full rows and one cut at the bottom border"""
+    lines = [first_separator + i * row_height for i in range(rows + 1)]
+    border = lines[-1] + cut
+    image = np.full((border + 150, width), 255, dtype=np.uint8)
+    image[header_bottom - 40:header_bottom - 30, 80:300:6] = 40  # header text
+    image[header_bottom:header_bottom + 2, 20:width - 20] = 200
+    for top, bottom in zip([header_bottom] + lines, lines + [border]):
+        image[top + 5:min(bottom - 3, top + 15), 80:400:6] = 40  # row text
+    for y in lines:
+        image[y:y + 2, 20:width - 20] = 220
+    image[border:border + 2, 20:width - 20] = 225
+    return image, lines, border
+
+def test_training_screenshots():
+    # Visible complete rows: example 2 ends exactly at a row, the others show a cut row
+    complete = {"1.png": 12, "2.png": 13, "3.png": 12, "4.png": 13, "5.png": 13}
+    for name, count in complete.items():
+        geometry = segment_table(Image.open(EXAMPLES / name))
+        assert geometry is not None, name
+        assert geometry.row_height == 104.0
+        assert geometry.header_top < geometry.header_bottom and abs(geometry.header_bottom - 348) <= 2
+        assert abs(geometry.bottom - 1734) <= 2
+        assert len(geometry.complete_rows) == count, (name, len(geometry.complete_rows))
+        assert all(abs(row.height - 104) <= 2 for row in geometry.complete_rows)
+        assert 700 < geometry.left < 720 and 3440 < geometry.right < 3460
+
+def test_synthetic_table():
+    image, lines, border = synthetic_table()
+    geometry = segment_table(image)
+    assert geometry.row_height == 60.0
+    assert geometry.header_bottom == 99 and geometry.bottom == border - 1
+    # Lines are located at the last pixel row above them
+    assert [row.top for row in geometry.rows] == [99] + [y - 1 for y in lines]
+    assert [row.complete for row in geometry.rows] == [False] + [True] * 8 + [False]
+    assert geometry.row_boxes()[1] == (geometry.left, lines[0] - 1, geometry.right, lines[1] - 1)
+    assert abs(geometry.rows_below(lines[-3]) - (border - lines[-3]) / 60) < 0.05
+    assert segment_table(np.full((400, 400), 255, dtype=np.uint8)) is None
+
+def test_tiles_follow_geometry():
+    image = Image.open(EXAMPLES / "1.png").convert("RGB")
+    geometry = segment_table(image)
+    region = detect_table_region(np.asarray(image))
+    assert region.row_lines == geometry.separators
+    assert (region.header_bottom, region.body_bottom) == (geometry.header_bottom, geometry.bottom) and geometry.bottom < region.bottom
+    # A DOM region carries no separators; segmenting inside its box finds the same rows
+    dom_region = TableRegion(region.left, region.top, region.right, region.bottom, source="dom")
+    assert resolve_rows(image, dom_region) == resolve_rows(image, region)
+    tiles = table_tiles(image, region, rows_per_tile=6, overlap_rows=1)
+    bands = [info["band"] for _, _, info in tiles]
+    assert bands[0][0] == geometry.header_bottom and bands[-1][1] == geometry.bottom
+    for top, bottom in bands[1:]:
+        assert top in geometry.separators
+    for top, bottom in bands[:-1]:
+        assert bottom in geometry.separators
+
+if __name__ == "__main__":
+    test_training_screenshots()
+    test_synthetic_table()
+    test_tiles_follow_geometry()
+    print("All table geometry tests passed")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the audience-table region detection in table_region.py.
+Verifies that:
+1. The pixel detector finds the table on a real Ads Manager screenshot
+2. The DOM box is scaled by the device pixel ratio to screenshot pixels
+3. The cropped, re-encoded image is much smaller than the original screenshot
+"""
+
+import asyncio
+import base64
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions.table_region import (
+    LEGIBLE_ROW_HEIGHT_PX, detect_table_region, locate_table_region_dom, prepare_table_image,
+)
+
+SCREENSHOT = Path(__file__).parent.parent / "training_images" / "train-condition-scroll-audience-page" / "1.png"
+
+class MockPage:
+    """Mock page returning a predefined result for the DOM script"""
+    def __init__(self, result):
+        self.result = result
+
+    async def evaluate(self, expression, arg=None):
+        return self.result
+
+def test_pixel_detector_finds_table():
+    image = np.asarray(Image.open(SCREENSHOT).convert("RGB"))
+    region = detect_table_region(image)
+    assert region is not None and region.source == "pixels"
+    # The table sits right of the filter sidebar and spans most of the remaining width
+    assert 600 < region.left < 800 and region.right > 3300
+    assert region.height > 1000
+    assert 90 < region.row_height < 120
+
+def test_blank_image_has_no_table():
+    assert detect_table_region(np.full((400, 600, 3), 255, dtype=np.uint8)) is None
+
+def test_dom_box_scaled_by_device_pixel_ratio():
+    page = MockPage({"left": 400, "top": 150, "right": 1700, "bottom": 1000, "dpr": 2, "row_height": 59})
+    region = asyncio.run(locate_table_region_dom(page, (3528, 1866)))
+    assert region.source == "dom"
+    # Scaled by 2, widened by the crop margin and clipped to the screenshot
+    assert region.as_box() == (792, 292, 3408, 1866)
+    assert region.row_height == 118
+
+def test_prepared_image_is_smaller_and_legible():
+    screenshot_data = base64.b64encode(SCREENSHOT.read_bytes()).decode("ascii")
+    data, media_type, info = asyncio.run(prepare_table_image(None, screenshot_data))
+    assert media_type in ("image/png", "image/jpeg")
+    assert len(data) < len(screenshot_data) / 3
+    assert max(info["encoded_size"]) <= 1568
+    # Rows stay tall enough to read
+    assert 104 * info["scale"] >= LEGIBLE_ROW_HEIGHT_PX
+
+if __name__ == "__main__":
+    test_pixel_detector_finds_table()
+    test_blank_image_has_no_table()
+    test_dom_box_scaled_by_device_pixel_ratio()
+    test_prepared_image_is_smaller_and_legible()
+    print("All table region tests passed")
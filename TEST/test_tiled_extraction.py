@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the tiled vision extraction of tall audience tables.
+Verifies that:
+1. Row bands cover the whole table body and neighbouring bands share the overlap rows
+2. Overlapping tile results are merged by Audience ID, filling fields cut off in one tile
+3. Tiles of a real screenshot are transcribed concurrently and merged without duplicates
+"""
+
+import asyncio
+import base64
+import logging
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions.action_extract_audience_data import _extract_with_vision
+from remote_tools_folders.controller_actions.audience_dom import merge_records
+from remote_tools_folders.controller_actions.table_region import split_row_bands
+
+SCREENSHOT = Path(__file__).parent.parent / "training_images" / "train-condition-scroll-audience-page" / "1.png"
+
+class MockBrowserContext:
+    """Mock browser context returning a real screenshot"""
+    async def get_current_page(self):
+        return None
+
+    async def take_screenshot(self, full_page=False):
+        return base64.b64encode(SCREENSHOT.read_bytes()).decode("ascii")
+
+class MockAnthropicClient:
+    """Mock client answering each tile with two rows, the first shared with the previous tile"""
+    def __init__(self, delay=0.2):
+        self.messages = self
+        self.delay = delay
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+
+    async def create(self, **kwargs):
+        tile = self.calls
+        self.calls += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        rows = [{"Name": f"Audience {i}", "Type": "Custom audience", "Availability": "Ready",
+                 "Date created": "08/15/2023 11:15 AM", "Audience ID": str(23857669590000000 + i)}
+                for i in (tile, tile + 1)]
+        tool_call = SimpleNamespace(type="tool_use", name="record_audience_rows", input={"rows": rows})
+        return SimpleNamespace(content=[tool_call], stop_reason="tool_use")
+
+def test_bands_cover_body_with_overlap():
+    lines = [100, 200, 300, 400, 500, 600, 700]
+    bands = split_row_bands(lines, 50, 750, rows_per_band=3, overlap_rows=1)
+    assert bands[0][0] == 50 and bands[-1][1] == 750
+    for (_, previous_bottom), (top, _) in zip(bands, bands[1:]):
+        # The last row of a band is the first row of the next one
+        assert top < previous_bottom and top in lines
+    assert split_row_bands([], 0, 300) == [(0, 300)]
+
+def test_merge_fills_fields_cut_off_in_one_tile():
+    cut = {"Name": "A", "Type": "", "Availability": "", "Date created": "", "Audience ID": "1234567890123"}
+    full = {"Name": "A", "Type": "Custom audience", "Availability": "Ready", "Date created": "01/01/2023", "Audience ID": "1234567890123"}
+    other = dict(full, Name="B", **{"Audience ID": "1234567890124"})
+    merged = merge_records([[cut], [full, other]])
+    assert merged == [full, other]
+
+def test_tiles_transcribed_concurrently():
+    client = MockAnthropicClient()
+    logger = logging.getLogger("test_tiled_extraction")
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test", "VISION_CACHE_DISABLED": "1"}), \
+         patch("remote_tools_folders.controller_actions.llm_clients.get_anthropic_client", return_value=client):
+        result = asyncio.run(_extract_with_vision(MockBrowserContext(), logger, tiled=True,
+                                                  rows_per_tile=4, max_parallel_tiles=3))
+    assert result.error is None
+    # Bounded fan-out: several calls in flight, never more than max_parallel_tiles
+    assert client.calls >= 3 and client.max_running == 3
+    # Overlapping rows are merged: tile n returns rows n and n + 1
+    assert len(result.rows) == client.calls + 1
+    assert len({row["Audience ID"] for row in result.rows}) == len(result.rows)
+
+if __name__ == "__main__":
+    test_bands_cover_body_with_overlap()
+    test_merge_fills_fields_cut_off_in_one_tile()
+    test_tiles_transcribed_concurrently()
+    print("All tiled extraction tests passed")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the perceptual-hash vision cache in vision_cache.py.
+Verifies that:
+1. Identical screenshots hash the same and scrolled screenshots fall outside the threshold
+2. Entries expire after the TTL (virtual clock) and the least recently used entry is evicted
+3. A repeated extraction on an unchanged screenshot is served from the cache
+4. An extraction whose table cells changed with the layout unchanged misses the cache
+5. A repeated stop check reuses the decision and says so in its extracted content
+"""
+
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from PIL import Image
+
+# Add the parent directory to the path to import the controller actions
+sys.path.append(str(Path(__file__).parent.parent))
+from remote_tools_folders.controller_actions import action_check_condition_stop_page_wheel as stop_check
+from remote_tools_folders.controller_actions import vision_cache
+from remote_tools_folders.controller_actions.action_extract_audience_data import _extract_with_vision
+from remote_tools_folders.controller_actions.clock import VirtualClock, use_clock
+from remote_tools_folders.controller_actions.vision_cache import (
+    DEFAULT_MAX_DISTANCE, VisionResultCache, dhash, hamming_distance,
+)
+
+IMAGES = Path(__file__).parent.parent / "training_images" / "output_images_condition_stop_audience_page"
+SAME_A = IMAGES / "screenshot_2025-04-03_17-19-14_643.png"
+SAME_B = IMAGES / "screenshot_2025-04-03_17-19-35_513.png"
+SCROLLED = IMAGES / "screenshot_2025-04-02_09-24-18_075.png"
+
+class MockBrowserContext:
+    """Mock browser context returning a fixed screenshot (a file path or encoded image bytes)"""
+    def __init__(self, screenshot):
+        self.data = screenshot.read_bytes() if isinstance(screenshot, Path) else screenshot
+
+    async def get_current_page(self):
+        return None
+
+    async def take_screenshot(self, full_page=False):
+        return base64.b64encode(self.data).decode("ascii")
+
+class CountingAnthropicClient:
+    """Mock client counting the vision calls"""
+    def __init__(self):
+        self.messages = self
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        rows = [{"Name": "A", "Type": "Custom audience", "Availability": "Ready",
+                 "Date created": "01/01/2023", "Audience ID": "1234567890123"}]
+        return MagicMock(content=[MagicMock(text=f"```json\n{json.dumps(rows)}\n```")])
+
+class StopCheckClient:
+    """Mock client counting the stop-check calls and answering CONTINUE 100px"""
+    def __init__(self):
+        self.messages = self
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        text = "<reasoning>\nAbout two rows left.\n</reasoning>\n<decision>\nCONTINUE\n100px\n</decision>"
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)])
+
+def test_hash_separates_scroll_states():
+    assert hamming_distance(dhash(SAME_A.read_bytes()), dhash(SAME_B.read_bytes())) <= DEFAULT_MAX_DISTANCE
+    assert hamming_distance(dhash(SAME_A.read_bytes()), dhash(SCROLLED.read_bytes())) > DEFAULT_MAX_DISTANCE
+
+def test_ttl_and_lru_eviction():
+    clock = VirtualClock()
+    with use_clock(clock):
+        cache = VisionResultCache(max_entries=2, ttl_s=60, max_distance=2)
+        cache.put("check", "p", 0b0000, "first")
+        cache.put("check", "p", 0b1111_0000, "second")
+        # Near match (1 bit), other prompt keys never match
+        assert cache.get("check", "p", 0b0001) == ("first", 1)
+        assert cache.get("check", "other", 0b0000) is None
+        # "second" is now the least recently used entry
+        cache.put("check", "p", 0b1111_1111_0000_0000, "third")
+        assert cache.get("check", "p", 0b1111_0000) is None
+        clock.advance(61)
+        assert cache.get("check", "p", 0b0000) is None
+        assert cache.stats()["entries"] == 0
+
+def test_repeated_extraction_served_from_cache():
+    client = CountingAnthropicClient()
+    logger = logging.getLogger("test_vision_cache")
+    vision_cache._cache = None
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"}), \
+         patch("remote_tools_folders.controller_actions.llm_clients.get_anthropic_client", return_value=client):
+        first = asyncio.run(_extract_with_vision(MockBrowserContext(SAME_A), logger))
+        assert first.error is None and not first.cache_hit
+        again = asyncio.run(_extract_with_vision(MockBrowserContext(SAME_B), logger))
+        assert again.cache_hit and again.rows == first.rows
+        scrolled = asyncio.run(_extract_with_vision(MockBrowserContext(SCROLLED), logger))
+        assert not scrolled.cache_hit
+    assert client.calls == 2
+    vision_cache._cache = None
+
+def _shift_audience_ids(path: Path) -> bytes:
+    """ The screenshot with every Audience ID moved down one row (rows, lines and columns unchanged). """
+    pixels = np.asarray(Image.open(path).convert("RGB")).copy()
+    # Table body from the first to the last row border (104px rows), Audience ID column
+    ids = pixels[296:1647, 3040:3380]
+    pixels[296:1647, 3040:3380] = np.roll(ids, 104, axis=0)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def test_changed_cells_miss_the_cache():
+    edited = _shift_audience_ids(SAME_A)
+    # The perceptual hash cannot see the edit, so extraction must not rely on it
+    assert hamming_distance(dhash(SAME_A.read_bytes()), dhash(edited)) <= DEFAULT_MAX_DISTANCE
+    client = CountingAnthropicClient()
+    logger = logging.getLogger("test_vision_cache")
+    vision_cache._cache = None
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"}), \
+         patch("remote_tools_folders.controller_actions.llm_clients.get_anthropic_client", return_value=client):
+        first = asyncio.run(_extract_with_vision(MockBrowserContext(SAME_A), logger))
+        assert first.error is None and not first.cache_hit
+        changed = asyncio.run(_extract_with_vision(MockBrowserContext(edited), logger))
+        assert changed.error is None and not changed.cache_hit
+    assert client.calls == 2
+    vision_cache._cache = None
+
+def test_stop_check_marks_cache_hits():
+    client = StopCheckClient()
+    vision_cache._cache = None
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"}), \
+         patch.object(stop_check, "thumb_decision", return_value=None), \
+         patch("remote_tools_folders.controller_actions.llm_clients.get_anthropic_client", return_value=client):
+        first = asyncio.run(stop_check.perform_check_condition_stop_page_wheel(MockBrowserContext(SAME_A)))
+        again = asyncio.run(stop_check.perform_check_condition_stop_page_wheel(MockBrowserContext(SAME_B)))
+    assert first.error is None and "cached decision" not in first.extracted_content
+    assert again.extracted_content.startswith(first.extracted_content)
+    assert again.extracted_content.endswith("(cached decision, screenshot hash distance 0 bits)")
+    assert client.calls == 1
+    vision_cache._cache = None
+
+if __name__ == "__main__":
+    test_hash_separates_scroll_states()
+    test_ttl_and_lru_eviction()
+    test_repeated_extraction_served_from_cache()
+    test_changed_cells_miss_the_cache()
+    test_stop_check_marks_cache_hits()
+    print("All vision cache tests passed")
@@ -1,178 +1,28 @@
 from browser_use import ActionResult
 from browser_use.browser.context import BrowserContext
+from typing import List, Tuple
+import asyncio
 import os
-import anthropic
-import logging
 import datetime
 import re
 import base64
 import traceback
 from dotenv import load_dotenv
 
-async def perform_check_condition_stop_page_wheel(browser: BrowserContext) -> ActionResult:
-    """
-    Helper function containing the logic to analyze the current page screenshot 
-    to determine whether to continue scrolling vertically or stop.
-    
-    Args:
-        browser: Browser context instance to capture screenshot
-        
-    Returns:
-        ActionResult: Contains decision (CONTINUE/STOP) and scroll parameter
-    """
-    try:
-        # Set up logging
-        log_dir = "/Users/meirsabag/Public/browser_use_ver4_newVersion/logs"
-        os.makedirs(log_dir, exist_ok=True)
-        
-        log_file = os.path.join(log_dir, "scroll_condition_check.log")
-        
-        # Configure logger
-        logger = logging.getLogger("scroll_condition_check")
-        logger.setLevel(logging.DEBUG)
-        
-        # Prevent propagation to root logger (stops terminal output)
-        logger.propagate = False
-        
-        # Remove existing handlers if any
-        if logger.handlers:
-            for handler in logger.handlers:
-                logger.removeHandler(handler)
-        
-        # File handler for the log file
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        
-        # Create formatter with detailed timestamp
-        formatter = logging.Formatter(
-            '%(asctime)s [%(levelname)s] %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S.%f'
-        )
-        file_handler.setFormatter(formatter)
-        
-        # Add the file handler to the logger
-        logger.addHandler(file_handler)
-        
-        # Start logging with session boundary and basic info
-        session_start_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-        logger.info("="*80)
-        logger.info(f"STARTING NEW SCROLL CONDITION CHECK SESSION: {session_start_time}")
-        logger.info("="*80)
-        
-        # Load environment variables
-        load_dotenv()
-        logger.info("Environment variables loaded")
-        
-        # Initialize Anthropic client using API key from environment variables
-        api_key = os.environ.get("ANTHROPIC_API_KEY")
-        if not api_key:
-            logger.error("ANTHROPIC_API_KEY not found in environment variables")
-            return ActionResult(error="ANTHROPIC_API_KEY not found in environment variables")
-        
-        logger.info("Anthropic API key found in environment variables")
-        client = anthropic.Anthropic(api_key=api_key)
-        logger.info("Anthropic client initialized")
-        
-        # Take a screenshot of the current page
-        logger.info("Taking screenshot of current page")
-        start_time = datetime.datetime.now()
-        screenshot_data = await browser.take_screenshot(full_page=True)
-        end_time = datetime.datetime.now()
-        screenshot_duration = (end_time - start_time).total_seconds()
-        
-        if not screenshot_data:
-            logger.error("Failed to capture screenshot")
-            return ActionResult(error="Failed to capture screenshot")
-        
-        screenshot_size = len(screenshot_data)
-        logger.info(f"Screenshot captured successfully: {screenshot_size} characters, took {screenshot_duration:.2f} seconds")
-        
-        # Detect image format
-        if screenshot_data.startswith("iVBORw0KGgo"):
-            image_format = "image/png"
-            file_extension = "png"
-            logger.info("Detected image format: PNG")
-        else:
-            image_format = "image/jpeg"
-            file_extension = "jpg"
-            logger.info("Detected image format: JPEG (default)")
-        
-        # Save screenshot to file with readable timestamp filename
-        try:
-            # Create output directory if it doesn't exist
-            output_dir = "/Users/meirsabag/Public/browser_use_ver4_newVersion/training_images/output_images_condition_stop_audience_page"
-            os.makedirs(output_dir, exist_ok=True)
-            logger.info(f"Ensuring output directory exists: {output_dir}")
-            
-            # Generate a human-readable timestamp for the filename (YYYY-MM-DD_HH-MM-SS_mmm)
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")[:-3]
-            filename = f"screenshot_{timestamp}.{file_extension}"
-            filepath = os.path.join(output_dir, filename)
-            
-            # Decode the base64 data back to binary
-            # Remove the base64 prefix if present
-            if "," in screenshot_data:
-                image_data = screenshot_data.split(",")[1]
-            else:
-                image_data = screenshot_data
-                
-            # Decode the image data
-            binary_data = base64.b64decode(image_data)
-            
-            # Write to file
-            with open(filepath, 'wb') as f:
-                f.write(binary_data)
-                
-            logger.info(f"Screenshot saved to file: {filepath}")
-        except Exception as e:
-            # Log error but continue with the function (don't break existing functionality)
-            logger.error(f"Failed to save screenshot to file: {str(e)}")
-            logger.error(f"Error details: {traceback.format_exc()}")
-            logger.info("Continuing with function execution despite screenshot save error")
-        
-        # Load training images from directory
-        training_images = []
-        training_dir = "/Users/meirsabag/Public/browser_use_ver4_newVersion/training_images/train-condition-scroll-audience-page"
-        
-        # Check if directory exists
-        if os.path.exists(training_dir):
-            logger.info(f"Loading training images from {training_dir}")
-            try:
-                # List and sort image files
-                image_files = [f for f in os.listdir(training_dir) if f.lower().endswith('.png')]
-                image_files.sort()  # Sort alphabetically
-                
-                logger.info(f"Found {len(image_files)} training images")
-                
-                # Load each image
-                for img_file in image_files:
-                    img_path = os.path.join(training_dir, img_file)
-                    logger.info(f"Loading training image: {img_path}")
-                    
-                    try:
-                        with open(img_path, 'rb') as f:
-                            img_data = f.read()
-                            # Convert to base64
-                            img_base64 = base64.b64encode(img_data).decode('utf-8')
-                            # Determine image type
-                            img_type = "image/png" if img_file.lower().endswith('.png') else "image/jpeg"
-                            # Add to training images
-                            training_images.append({"media_type": img_type, "data": img_base64})
-                            logger.info(f"Successfully loaded training image: {img_file}")
-                    except Exception as e:
-                        logger.error(f"Failed to load training image {img_file}: {str(e)}")
-                        logger.error(f"Error details: {traceback.format_exc()}")
-                
-                logger.info(f"Successfully loaded {len(training_images)} training images")
-            except Exception as e:
-                logger.error(f"Error loading training images: {str(e)}")
-                logger.error(f"Error details: {traceback.format_exc()}")
-        else:
-            logger.warning(f"Training directory does not exist: {training_dir}")
-            logger.warning("Proceeding without training images")
-        
-        # Create the new system prompt
-        system_prompt = """You have perfect vision and pay great attention to detail which makes you an expert at counting details in table and to know how to observe and understand exactly the state of the table's scroll bar.
+from .action_logging import get_action_logger
+from .few_shot_examples import EncodedExample, FewShotRegistry
+from .llm_clients import CACHE_CONTROL, create_anthropic_message, prompt_cache_usage
+from .scroll_oracle import scroll_decision
+from .scrollbar_thumb import thumb_decision
+from .table_region import decode_screenshot
+from .vision_cache import get_vision_cache, hash_screenshot, prompt_hash
+
+CLAUDE_MODEL = "claude-3-7-sonnet-20250219"
+CACHE_ACTION = "check_condition_stop_page_wheel"
+TRAINING_DIR = "/Users/meirsabag/Public/browser_use_ver4_newVersion/training_images/train-condition-scroll-audience-page"
+
+# Static system prompt: sent byte-identical on every call so the provider can cache it
+SYSTEM_PROMPT = """You have perfect vision and pay great attention to detail which makes you an expert at counting details in table and to know how to observe and understand exactly the state of the table's scroll bar.
 
         You are an AI assistant tasked with deciding whether to continue scrolling or stop scrolling the audience table on the Facebook advertising dashboard. Your decision should be based on the image description provided and the previous examples in the discussion.
 
@@ -243,205 +93,351 @@ The parameters are calculated according to the following key:
 
 
         Remember, your goal is to make an appropriate decision based on the information provided in the image description and the patterns established in the previous examples."""
-        
-        logger.info("System prompt prepared")
-        
-        # Prepare the new message structure
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "\nBefore you start acting on your system prompt, I want to give you a few examples for calculating the number of rows in the table between the bottom edge of the scroll bar and the bottom border of the table. According to these examples, you will always be able to understand and use them when you need to calculate the number of rows for a new user query. Do you understand what I mean?\n\n\n\n\n\n"
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "I understand completely. You want to provide me with examples that will help me better understand how to calculate the number of rows between the bottom edge of the scroll bar and the bottom border of the table. These examples will serve as reference points for when I need to make similar calculations in future queries. I'm ready to review these examples and apply the knowledge to any new scenarios you present."
-                    }
-                ]
-            }
-        ]
-        
-        # Initialize a counter for adding training images to messages
-        image_counter = 0
-        
-        # Add Example 1
-        if image_counter < len(training_images):
-            messages.append({
-                "role": "user",
-                "content": [
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": training_images[image_counter]["media_type"],
-                            "data": training_images[image_counter]["data"]
-                        }
-                    },
-                    {
-                        "type": "text",
-                        "text": "<Example 1 for calculating the number of rows>\nWhat is the number of rows between the bottom edge of the scroll bar and the bottom border of the table?"
-                    }
-                ]
-            })
-            
-            messages.append({
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "<reasoning>\nI am an expert at distinguishing details in a screenshot of the Audiences dashboard on the Facebook Advertising dashboard.\n\nI see that the bottom edge of the gray scroll bar on the right side of the screen is opposite the value 23857669590730523 of the audience id column in the table in the screenshot.\n\nTherefore, the row with the id number 23857669590730523 is the row on which the bottom edge of the scroll bar is located.\n\nSo when I look at the screenshot again very, very carefully, I see that there are 6 rows below row 23857669590730523.\n\nI know there are 6 rows because I see that there are 6 more different values ​​below the row with the id 23857669590730523.\n\nSo according to the system prompt and according to the instructions where the xml tag is called Calculate the parameter by the lines between the bottom edge of the scroll bar and the bottom border of the table, then according to section 3 you need 500px to continue scrolling down.\n</reasoning>\n\n<decision>\nCONTINUE\n500px\n</decision>"
-                    }
-                ]
-            })
-            
-            image_counter += 1
-            logger.info(f"Added Example 1 to messages with training image {image_counter}")
-        
-        # Add Example 2
-        if image_counter < len(training_images):
-            messages.append({
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "<Example 2"
-                    },
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": training_images[image_counter]["media_type"],
-                            "data": training_images[image_counter]["data"]
-                        }
-                    },
-                    {
-                        "type": "text",
-                        "text": " for calculating the number of rows>\nWhat is the number of rows between the bottom edge of the scroll bar and the bottom border of the table?"
-                    }
-                ]
-            })
-            
-            messages.append({
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "<reasoning>\nI am an expert at distinguishing details in a screenshot of the Audiences dashboard on the Facebook Advertising dashboard.\n\nI see that the bottom edge of the gray scroll bar on the right side of the screen is opposite the value 23857301447110523 of the audience id column in the table in the screenshot.\n\nTherefore, the row with the id number 23857301447110523 is the row on which the bottom edge of the scroll bar is located.\n\nSo when I look at the screenshot again very, very carefully, I see that there are 1.5 rows below row 23857301447110523.\n\nI know there are 1.5 rows because I see that there are 1.5 more different values ​​below the row with the id 23857301447110523.\n\nSo according to the system prompt and according to the instructions where the xml tag is called Calculate the parameter by the lines between the bottom edge of the scroll bar and the bottom border of the table, then according to section 3 you need 100px to continue scrolling down.\n</reasoning>\n\n<decision>\nCONTINUE\n100px\n</decision>"
+
+def _build_example_messages(examples: Tuple[EncodedExample, ...]) -> List[dict]:
+    """ The few-shot conversation: an introduction and one question/answer pair per example image (up to five). """
+    # The introduction exchange
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "\nBefore you start acting on your system prompt, I want to give you a few examples for calculating the number of rows in the table between the bottom edge of the scroll bar and the bottom border of the table. According to these examples, you will always be able to understand and use them when you need to calculate the number of rows for a new user query. Do you understand what I mean?\n\n\n\n\n\n"
+                }
+            ]
+        },
+        {
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "I understand completely. You want to provide me with examples that will help me better understand how to calculate the number of rows between the bottom edge of the scroll bar and the bottom border of the table. These examples will serve as reference points for when I need to make similar calculations in future queries. I'm ready to review these examples and apply the knowledge to any new scenarios you present."
+                }
+            ]
+        }
+    ]
+    
+    # Initialize a counter for adding training images to messages
+    image_counter = 0
+    
+    # Add Example 1
+    if image_counter < len(examples):
+        messages.append({
+            "role": "user",
+            "content": [
+                {
+                    "type": "image",
+                    "source": {
+                        "type": "base64",
+                        "media_type": examples[image_counter].media_type,
+                        "data": examples[image_counter].data
                     }
-                ]
-            })
-            
-            image_counter += 1
-            logger.info(f"Added Example 2 to messages with training image {image_counter}")
+                },
+                {
+                    "type": "text",
+                    "text": "<Example 1 for calculating the number of rows>\nWhat is the number of rows between the bottom edge of the scroll bar and the bottom border of the table?"
+                }
+            ]
+        })
         
-        # Add Example 3
-        if image_counter < len(training_images):
-            messages.append({
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "<Example 3 for calculating the number of rows>\nWhat is the number of rows between the bottom edge of the scroll bar and the bottom border of the table?\n"
-                    },
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": training_images[image_counter]["media_type"],
-                            "data": training_images[image_counter]["data"]
-                        }
-                    }
-                ]
-            })
-            
-            messages.append({
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "<reasoning>\nI am an expert at distinguishing details in a screenshot of the Audiences dashboard on the Facebook Advertising dashboard.\n\nI see that the bottom edge of the gray scroll bar on the right side of the screen is opposite the value 23857301441360523 of the audience id column in the table in the screenshot.\n\nTherefore, the row with the id number 23857301441360523 is the row on which the bottom edge of the scroll bar is located.\n\nSo when I look at the screenshot again very, very carefully, I see that there are 1.5 rows below row 23857301441360523.\n\nI know there are 1.5 rows because I see that there are 1.5 more different values ​​below the row with the id 23857301441360523.\n\nSo according to the system prompt and according to the instructions where the xml tag is called Calculate the parameter by the lines between the bottom edge of the scroll bar and the bottom border of the table, then according to section 3 you need 100px to continue scrolling down.\n</reasoning>\n\n<decision>\nCONTINUE\n100px\n</decision>"
-                    }
-                ]
-            })
-            
-            image_counter += 1
-            logger.info(f"Added Example 3 to messages with training image {image_counter}")
+        messages.append({
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "<reasoning>\nI am an expert at distinguishing details in a screenshot of the Audiences dashboard on the Facebook Advertising dashboard.\n\nI see that the bottom edge of the gray scroll bar on the right side of the screen is opposite the value 23857669590730523 of the audience id column in the table in the screenshot.\n\nTherefore, the row with the id number 23857669590730523 is the row on which the bottom edge of the scroll bar is located.\n\nSo when I look at the screenshot again very, very carefully, I see that there are 6 rows below row 23857669590730523.\n\nI know there are 6 rows because I see that there are 6 more different values ​​below the row with the id 23857669590730523.\n\nSo according to the system prompt and according to the instructions where the xml tag is called Calculate the parameter by the lines between the bottom edge of the scroll bar and the bottom border of the table, then according to section 3 you need 500px to continue scrolling down.\n</reasoning>\n\n<decision>\nCONTINUE\n500px\n</decision>"
+                }
+            ]
+        })
         
-        # Add Example 4
-        if image_counter < len(training_images):
-            messages.append({
-                "role": "user",
-                "content": [
+        image_counter += 1
+    
+    # Add Example 2
+    if image_counter < len(examples):
+        messages.append({
+            "role": "user",
+            "content": [
                 {
                     "type": "text",
-                        "text": "<Example 4 for calculating the number of rows>\nWhat is the number of rows between the bottom edge of the scroll bar and the bottom border of the table?\n\n"
+                    "text": "<Example 2"
                 },
                 {
                     "type": "image",
                     "source": {
                         "type": "base64",
-                            "media_type": training_images[image_counter]["media_type"],
-                            "data": training_images[image_counter]["data"]
-                        }
+                        "media_type": examples[image_counter].media_type,
+                        "data": examples[image_counter].data
                     }
-                ]
-            })
-            
-            messages.append({
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "<reasoning>\nI am an expert at distinguishing details in a screenshot of the Audiences dashboard on the Facebook Advertising dashboard.\n\nLooking at the image carefully, I can see that the bottom edge of the gray scroll bar on the right side of the screen is positioned approximately opposite the value 23857301436680523 of the audience ID column in the table.\n\nTherefore, the row with the ID number 23857301436680523 is the row on which the bottom edge of the scroll bar is located.\n\nWhen I examine the screenshot very carefully, I can see that there is less than 1 row below the row with ID 23857301436680523. In fact, it appears to be the last visible row in the table, with perhaps a small portion of another row partially visible below it.\n\nSince there is less than 1 row between the bottom edge of the scroll bar and the bottom border of the table, according to the system prompt instructions in section 5 of the \"Calculate the parameter by the lines between the bottom edge of the scroll bar and the bottom border of the table\" tag, I need to issue a STOP command.\n</reasoning>\n\n<decision>\nSTOP\nNONE\n</decision>"
-                    }
-                ]
-            })
-            
-            image_counter += 1
-            logger.info(f"Added Example 4 to messages with training image {image_counter}")
+                },
+                {
+                    "type": "text",
+                    "text": " for calculating the number of rows>\nWhat is the number of rows between the bottom edge of the scroll bar and the bottom border of the table?"
+                }
+            ]
+        })
+        
+        messages.append({
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "<reasoning>\nI am an expert at distinguishing details in a screenshot of the Audiences dashboard on the Facebook Advertising dashboard.\n\nI see that the bottom edge of the gray scroll bar on the right side of the screen is opposite the value 23857301447110523 of the audience id column in the table in the screenshot.\n\nTherefore, the row with the id number 23857301447110523 is the row on which the bottom edge of the scroll bar is located.\n\nSo when I look at the screenshot again very, very carefully, I see that there are 1.5 rows below row 23857301447110523.\n\nI know there are 1.5 rows because I see that there are 1.5 more different values ​​below the row with the id 23857301447110523.\n\nSo according to the system prompt and according to the instructions where the xml tag is called Calculate the parameter by the lines between the bottom edge of the scroll bar and the bottom border of the table, then according to section 3 you need 100px to continue scrolling down.\n</reasoning>\n\n<decision>\nCONTINUE\n100px\n</decision>"
+                }
+            ]
+        })
         
-        # Add Example 5
-        if image_counter < len(training_images):
-            messages.append({
-                "role": "user",
-                "content": [
+        image_counter += 1
+    
+    # Add Example 3
+    if image_counter < len(examples):
+        messages.append({
+            "role": "user",
+            "content": [
                 {
                     "type": "text",
-                        "text": "<Example 5 for calculating the number of rows>\nWhat is the number of rows between the bottom edge of the scroll bar and the bottom border of the table?\n\n"
+                    "text": "<Example 3 for calculating the number of rows>\nWhat is the number of rows between the bottom edge of the scroll bar and the bottom border of the table?\n"
                 },
                 {
                     "type": "image",
                     "source": {
                         "type": "base64",
-                            "media_type": training_images[image_counter]["media_type"],
-                            "data": training_images[image_counter]["data"]
-                        }
+                        "media_type": examples[image_counter].media_type,
+                        "data": examples[image_counter].data
                     }
-                ]
-            })
-            
-            messages.append({
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "<reasoning>\nI am an expert at distinguishing details in a screenshot of the Audiences dashboard on the Facebook Advertising dashboard.\n\nI see that the bottom edge of the gray scroll bar on the right side of the screen is opposite the value 23857893763360523 of the audience id column in the table in the screenshot.\n\nTherefore, the row with the id number 23857893763360523 is the row on which the bottom edge of the scroll bar is located.\n\nSo when I look at the screenshot again very, very carefully, I see that there are 7 rows below row 23857893763360523.\n\nI know there are7 rows because I see that there are 7 more different values ​​below the row with the id 23857893763360523.\n\nSo according to the system prompt and according to the instructions where the xml tag is called Calculate the parameter by the lines between the bottom edge of the scroll bar and the bottom border of the table, then according to section 3 you need 600px to continue scrolling down.\n</reasoning>\n\n<decision>\nCONTINUE\n600px\n</decision>"
+                }
+            ]
+        })
+        
+        messages.append({
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "<reasoning>\nI am an expert at distinguishing details in a screenshot of the Audiences dashboard on the Facebook Advertising dashboard.\n\nI see that the bottom edge of the gray scroll bar on the right side of the screen is opposite the value 23857301441360523 of the audience id column in the table in the screenshot.\n\nTherefore, the row with the id number 23857301441360523 is the row on which the bottom edge of the scroll bar is located.\n\nSo when I look at the screenshot again very, very carefully, I see that there are 1.5 rows below row 23857301441360523.\n\nI know there are 1.5 rows because I see that there are 1.5 more different values ​​below the row with the id 23857301441360523.\n\nSo according to the system prompt and according to the instructions where the xml tag is called Calculate the parameter by the lines between the bottom edge of the scroll bar and the bottom border of the table, then according to section 3 you need 100px to continue scrolling down.\n</reasoning>\n\n<decision>\nCONTINUE\n100px\n</decision>"
+                }
+            ]
+        })
+        
+        image_counter += 1
+    
+    # Add Example 4
+    if image_counter < len(examples):
+        messages.append({
+            "role": "user",
+            "content": [
+            {
+                "type": "text",
+                    "text": "<Example 4 for calculating the number of rows>\nWhat is the number of rows between the bottom edge of the scroll bar and the bottom border of the table?\n\n"
+            },
+            {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                        "media_type": examples[image_counter].media_type,
+                        "data": examples[image_counter].data
                     }
-                ]
-            })
-            
-            image_counter += 1
-            logger.info(f"Added Example 5 to messages with training image {image_counter}")
+                }
+            ]
+        })
         
-        # Add the final user message with the current screenshot
+        messages.append({
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "<reasoning>\nI am an expert at distinguishing details in a screenshot of the Audiences dashboard on the Facebook Advertising dashboard.\n\nLooking at the image carefully, I can see that the bottom edge of the gray scroll bar on the right side of the screen is positioned approximately opposite the value 23857301436680523 of the audience ID column in the table.\n\nTherefore, the row with the ID number 23857301436680523 is the row on which the bottom edge of the scroll bar is located.\n\nWhen I examine the screenshot very carefully, I can see that there is less than 1 row below the row with ID 23857301436680523. In fact, it appears to be the last visible row in the table, with perhaps a small portion of another row partially visible below it.\n\nSince there is less than 1 row between the bottom edge of the scroll bar and the bottom border of the table, according to the system prompt instructions in section 5 of the \"Calculate the parameter by the lines between the bottom edge of the scroll bar and the bottom border of the table\" tag, I need to issue a STOP command.\n</reasoning>\n\n<decision>\nSTOP\nNONE\n</decision>"
+                }
+            ]
+        })
+        
+        image_counter += 1
+    
+    # Add Example 5
+    if image_counter < len(examples):
         messages.append({
+            "role": "user",
+            "content": [
+            {
+                "type": "text",
+                    "text": "<Example 5 for calculating the number of rows>\nWhat is the number of rows between the bottom edge of the scroll bar and the bottom border of the table?\n\n"
+            },
+            {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                        "media_type": examples[image_counter].media_type,
+                        "data": examples[image_counter].data
+                    }
+                }
+            ]
+        })
+        
+        messages.append({
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "<reasoning>\nI am an expert at distinguishing details in a screenshot of the Audiences dashboard on the Facebook Advertising dashboard.\n\nI see that the bottom edge of the gray scroll bar on the right side of the screen is opposite the value 23857893763360523 of the audience id column in the table in the screenshot.\n\nTherefore, the row with the id number 23857893763360523 is the row on which the bottom edge of the scroll bar is located.\n\nSo when I look at the screenshot again very, very carefully, I see that there are 7 rows below row 23857893763360523.\n\nI know there are7 rows because I see that there are 7 more different values ​​below the row with the id 23857893763360523.\n\nSo according to the system prompt and according to the instructions where the xml tag is called Calculate the parameter by the lines between the bottom edge of the scroll bar and the bottom border of the table, then according to section 3 you need 600px to continue scrolling down.\n</reasoning>\n\n<decision>\nCONTINUE\n600px\n</decision>"
+                }
+            ]
+        })
+        
+        image_counter += 1
+
+    # Cache breakpoint after the last example: the whole example conversation is one cached prefix
+    if len(messages) > 2:
+        messages[-1]["content"][-1]["cache_control"] = CACHE_CONTROL
+    return messages
+
+_stop_check_examples = FewShotRegistry(TRAINING_DIR, _build_example_messages)
+
+def _decision_message(decision: str, scroll_value: int) -> str:
+    if decision == "CONTINUE":
+        return f"🖱️ Analysis indicates scrolling should CONTINUE with {scroll_value}px"
+    return "🛑 Analysis indicates scrolling should STOP (end of content reached)"
+
+async def perform_check_condition_stop_page_wheel(browser: BrowserContext) -> ActionResult:
+    """
+    Helper function containing the logic to determine whether to continue scrolling the
+    audience table vertically or stop: from the grid's scroll metrics when they can be read,
+    otherwise from the scroll bar thumb measured in the screenshot, and only when neither is
+    available by analyzing the screenshot with the vision model.
+    
+    Args:
+        browser: Browser context instance to capture screenshot
+        
+    Returns:
+        ActionResult: Contains decision (CONTINUE/STOP) and scroll parameter
+    """
+    try:
+        logger = get_action_logger("scroll_condition_check")
+        
+        # Start logging with session boundary and basic info
+        session_start_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+        logger.info("="*80)
+        logger.info(f"STARTING NEW SCROLL CONDITION CHECK SESSION: {session_start_time}")
+        logger.info("="*80)
+        
+        # Load environment variables
+        load_dotenv()
+        logger.info("Environment variables loaded")
+
+        # Deterministic path: the grid's scroll metrics give the exact rows left below the scroll bar thumb
+        try:
+            page = await browser.get_current_page()
+        except Exception:
+            page = None
+        oracle_start = datetime.datetime.now()
+        oracle = await scroll_decision(page, logger)
+        if oracle is not None:
+            message = _decision_message(oracle["decision"], oracle["scroll_value"])
+            oracle_ms = (datetime.datetime.now() - oracle_start).total_seconds() * 1000
+            logger.info(f"Final decision (DOM scroll metrics, {oracle_ms:.1f}ms): {oracle['decision']}, "
+                        f"scroll value: {oracle['scroll_value']}")
+            logger.info("="*80)
+            logger.info(f"SCROLL CONDITION CHECK SESSION COMPLETED: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')}")
+            logger.info("="*80)
+            return ActionResult(extracted_content=message, include_in_memory=True,
+                                metadata={**oracle, "source": "dom", "cache_hit": False})
+        logger.info("Scroll container metrics unavailable, falling back to the screenshot")
+        
+        # Take a screenshot of the current page
+        logger.info("Taking screenshot of current page")
+        start_time = datetime.datetime.now()
+        screenshot_data = await browser.take_screenshot(full_page=True)
+        end_time = datetime.datetime.now()
+        screenshot_duration = (end_time - start_time).total_seconds()
+        
+        if not screenshot_data:
+            logger.error("Failed to capture screenshot")
+            return ActionResult(error="Failed to capture screenshot")
+        
+        screenshot_size = len(screenshot_data)
+        logger.info(f"Screenshot captured successfully: {screenshot_size} characters, took {screenshot_duration:.2f} seconds")
+        
+        # Detect image format
+        if screenshot_data.startswith("iVBORw0KGgo"):
+            image_format = "image/png"
+            file_extension = "png"
+            logger.info("Detected image format: PNG")
+        else:
+            image_format = "image/jpeg"
+            file_extension = "jpg"
+            logger.info("Detected image format: JPEG (default)")
+        
+        # Save screenshot to file with readable timestamp filename
+        try:
+            # Create output directory if it doesn't exist
+            output_dir = "/Users/meirsabag/Public/browser_use_ver4_newVersion/training_images/output_images_condition_stop_audience_page"
+            os.makedirs(output_dir, exist_ok=True)
+            logger.info(f"Ensuring output directory exists: {output_dir}")
+            
+            # Generate a human-readable timestamp for the filename (YYYY-MM-DD_HH-MM-SS_mmm)
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")[:-3]
+            filename = f"screenshot_{timestamp}.{file_extension}"
+            filepath = os.path.join(output_dir, filename)
+            
+            # Decode the base64 data back to binary
+            # Remove the base64 prefix if present
+            if "," in screenshot_data:
+                image_data = screenshot_data.split(",")[1]
+            else:
+                image_data = screenshot_data
+                
+            # Decode the image data
+            binary_data = base64.b64decode(image_data)
+            
+            # Write to file
+            with open(filepath, 'wb') as f:
+                f.write(binary_data)
+                
+            logger.info(f"Screenshot saved to file: {filepath}")
+        except Exception as e:
+            # Log error but continue with the function (don't break existing functionality)
+            logger.error(f"Failed to save screenshot to file: {str(e)}")
+            logger.error(f"Error details: {traceback.format_exc()}")
+            logger.info("Continuing with function execution despite screenshot save error")
+        
+        # Local path: measure the rows below the scroll bar thumb in the screenshot itself
+        try:
+            pixel_start = datetime.datetime.now()
+            image = decode_screenshot(screenshot_data)
+            thumb = await asyncio.to_thread(thumb_decision, image, logger)
+        except Exception as e:
+            logger.warning(f"Scrollbar thumb detection failed: {str(e)}")
+            thumb = None
+        if thumb is not None:
+            message = _decision_message(thumb["decision"], thumb["scroll_value"])
+            pixel_ms = (datetime.datetime.now() - pixel_start).total_seconds() * 1000
+            logger.info(f"Final decision (scrollbar thumb, {pixel_ms:.1f}ms): {thumb['decision']}, "
+                        f"scroll value: {thumb['scroll_value']}")
+            logger.info("="*80)
+            logger.info(f"SCROLL CONDITION CHECK SESSION COMPLETED: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')}")
+            logger.info("="*80)
+            return ActionResult(extracted_content=message, include_in_memory=True,
+                                metadata={**thumb, "source": "pixels", "cache_hit": False})
+        logger.info("Scrollbar thumb not found, falling back to the vision model")
+        
+        # Initialize Anthropic client using API key from environment variables
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+        if not api_key:
+            logger.error("ANTHROPIC_API_KEY not found in environment variables")
+            return ActionResult(error="ANTHROPIC_API_KEY not found in environment variables")
+        
+        logger.info("Anthropic API key found in environment variables")
+        # Shared async client: the vision call no longer blocks the event loop (see llm_clients.py)
+        logger.info("Using shared async Anthropic client")
+        
+        # Few-shot examples: loaded, downscaled and encoded once per process, rebuilt when a file changes
+        few_shot = await _stop_check_examples.get(logger)
+        if not few_shot.examples:
+            logger.warning(f"No example images found in {TRAINING_DIR}, proceeding without training images")
+        else:
+            logger.info(f"Using {len(few_shot.examples)} cached example images ({len(few_shot.prefix)} prefix messages)")
+        
+        # The live screenshot follows a fresh copy of the shared example prefix
+        live_message = {
             "role": "user",
             "content": [
             {
@@ -457,26 +453,51 @@ The parameters are calculated according to the following key:
                 }
             }
         ]
-        })
+        }
+        messages = few_shot.messages(live_message)
         
         logger.info(f"Prepared {len(messages)} messages for Claude API")
+
+        # A near-identical screenshot was already analysed with the same prompt: reuse its decision
+        cache = get_vision_cache()
+        cache_key = prompt_hash(CLAUDE_MODEL, 0.5, SYSTEM_PROMPT, few_shot.key,
+                                [block.get("text") for block in live_message["content"] if block.get("type") == "text"])
+        image_hash = await hash_screenshot(screenshot_data, logger)
+        if image_hash is not None:
+            cached = cache.get(CACHE_ACTION, cache_key, image_hash)
+            if cached:
+                (message, metadata), distance = cached
+                logger.info(f"Vision cache hit (screenshot hash distance {distance} bits): "
+                            f"{metadata['decision']}, scroll value: {metadata['scroll_value']} - skipping the API call")
+                # ActionResult keeps no metadata: the hit is marked in the text the agent and the history see
+                return ActionResult(extracted_content=f"{message} (cached decision, screenshot hash distance {distance} bits)",
+                                    include_in_memory=True,
+                                    metadata={**metadata, "source": "vision", "cache_hit": True})
         
         # Call Claude's Vision API with the new implementation
         try:
             logger.info("Calling Claude Vision API with screenshot and training data")
-            logger.info(f"Using Claude model: claude-3-7-sonnet-20250219")
+            logger.info(f"Using Claude model: {CLAUDE_MODEL}")
             logger.info(f"API parameters: max_tokens=20000, temperature=0.5")
             
             api_call_start = datetime.datetime.now()
             
             # The new API call implementation
-            message = client.messages.create(
-                model="claude-3-7-sonnet-20250219",
+            message = await create_anthropic_message(
+                api_key=api_key,
+                logger=logger,
+                model=CLAUDE_MODEL,
                 max_tokens=20000,
                 temperature=0.5,
-                system=system_prompt,
+                # The system prompt and the example conversation are a cacheable prefix: on a provider
+                # cache hit only the live screenshot is processed as new input
+                system=[{"type": "text", "text": SYSTEM_PROMPT, "cache_control": CACHE_CONTROL}],
                 messages=messages
             )
+            cache_usage = prompt_cache_usage(message)
+            if cache_usage:
+                logger.info(f"Prompt cache {'hit' if cache_usage['hit'] else 'miss'}: {cache_usage['read_tokens']} tokens read, "
+                            f"{cache_usage['written_tokens']} written, {cache_usage['input_tokens']} uncached input tokens")
             
             api_call_end = datetime.datetime.now()
             api_call_duration = (api_call_end - api_call_start).total_seconds()
@@ -554,10 +575,7 @@ The parameters are calculated according to the following key:
                 logger.info("Scroll value set to 0 for STOP decision")
             
             # Create a user-friendly message
-            if decision == "CONTINUE":
-                message = f"🖱️ Analysis indicates scrolling should CONTINUE with {scroll_value}px"
-            else:
-                message = "🛑 Analysis indicates scrolling should STOP (end of content reached)"
+            message = _decision_message(decision, scroll_value)
             
             # Log the final result
             logger.info(f"Final decision: {decision}, scroll value: {scroll_value}")
@@ -568,15 +586,19 @@ The parameters are calculated according to the following key:
             logger.info(f"SCROLL CONDITION CHECK SESSION COMPLETED: {session_end_time}")
             logger.info("="*80)
             
+            metadata = {
+                "decision": decision,
+                "scroll_value": scroll_value,
+                "reasoning": reasoning
+            }
+            if image_hash is not None:
+                cache.put(CACHE_ACTION, cache_key, image_hash, (message, metadata))
+
             # Return the result
             return ActionResult(
                 extracted_content=message,
                 include_in_memory=True,
-                metadata={
-                    "decision": decision,
-                    "scroll_value": scroll_value,
-                    "reasoning": reasoning
-                }
+                metadata={**metadata, "source": "vision", "cache_hit": False, "prompt_cache": cache_usage}
             )
             
         except Exception as e:
@@ -0,0 +1,53 @@
+from browser_use import ActionResult
+from browser_use.browser.context import BrowserContext
+from pydantic import BaseModel, Field
+from typing import Optional
+import asyncio
+import json
+import traceback
+
+from .action_logging import get_action_logger
+from .audience_capture import ensure_audience_capture
+from .audience_store import save_audience_records
+
+class CollectCapturedAudiencesAction(BaseModel):
+    file_path: Optional[str] = Field(None, description="Optional JSON file to merge the captured audiences into (entries with an existing Audience ID are updated, not duplicated)")
+    clear: bool = Field(False, description="Forget the captured audiences after collecting them")
+
+async def perform_collect_captured_audiences(params: CollectCapturedAudiencesAction, browser: BrowserContext) -> ActionResult:
+    """
+    Helper function returning the audience rows captured from the Ads Manager network responses.
+    The first call attaches the capture to the page; rows then accumulate while the agent scrolls.
+    """
+    logger = get_action_logger("audience_extraction")
+    try:
+        page = await browser.get_current_page()
+        capture = ensure_audience_capture(page, logger)
+        if capture is None:
+            return ActionResult(error="Could not attach the audience response capture to the current page")
+        await capture.drain()
+        rows = capture.rows()
+        logger.info(f"Collected {len(rows)} captured audience records ({capture.stats()})")
+
+        if params.file_path:
+            await asyncio.to_thread(save_audience_records, params.file_path, rows, True, logger)
+
+        if params.clear:
+            capture.clear()
+
+        if not rows:
+            message = ("📡 No audience rows captured yet. The capture is now listening: scroll the audience table "
+                       "(or reload the page) and collect again.")
+        else:
+            message = f"📡 Collected {len(rows)} audience rows from network responses"
+            message += f". Saved to: {params.file_path}" if params.file_path else f": {json.dumps(rows, ensure_ascii=False)}"
+        return ActionResult(
+            extracted_content=message,
+            include_in_memory=True,
+            metadata={"file_path": params.file_path, "entries_count": len(rows), "source": "network", **capture.stats()}
+        )
+    except Exception as e:
+        error_message = f"Failed to collect captured audiences: {str(e)}"
+        logger.error(error_message)
+        logger.error(f"Exception details: {traceback.format_exc()}")
+        return ActionResult(error=error_message)
@@ -1,50 +1,516 @@
 from browser_use import ActionResult
 from browser_use.browser.context import BrowserContext
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Literal, Optional, List, Tuple
 import os
 import json
-import anthropic
 import logging
 import datetime
 import traceback
 from dotenv import load_dotenv
-import re
 import base64
+import asyncio
+import weakref
+
+from .action_logging import get_action_logger
+from .audience_capture import ensure_audience_capture
+from .audience_dom import AUDIENCE_FIELDS, merge_records, read_audience_rows_from_dom
+from .audience_store import save_audience_records
+from .json_stream import FlatObjectParser
+from .llm_clients import create_anthropic_message, stream_anthropic_message
+from .table_region import (
+    DEFAULT_ROWS_PER_TILE, TILE_OVERLAP_ROWS, crop_and_encode, decode_screenshot, encode_table_rows,
+    locate_table_region, revealed_rows_top, table_snapshot, table_tiles,
+)
+from .vision_cache import content_hash, get_vision_cache, prompt_hash
+
+CLAUDE_MODEL = "claude-3-7-sonnet-20250219"
+CACHE_ACTION = "extract_audience_data"
+
+# Table body seen by the last vision extraction of each browser session (delta extraction)
+_previous_tables: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+# Prompt for Claude
+VISION_PROMPT = """
+    You have perfect vision and pay great attention to detail which makes you an expert at counting details in table. Transcribe every row of the audience table in the image, from top to bottom, with all the columns, by calling the record_audience_rows tool once.
+
+    Copy every value exactly as it is written. For example:
+    Name: Lookalike (IL, 2%) - Similar Last 90 Days
+    Type: Lookalike audience Similar Last 90 Days
+    Availability: Audience not created
+    Date created: 09/19/2023 10:09 AM
+    Audience ID: 23859203708050523
+
+    Use an empty string for a cell you cannot read.
+    """
+
+# The rows are returned as the input of a forced tool call, so they arrive as structured records
+# with exactly the AUDIENCE_FIELDS keys (no code fences, prose or key variants to clean up)
+AUDIENCE_TOOL = {
+    "name": "record_audience_rows",
+    "description": "Record the rows of the audience table, from top to bottom.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "rows": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {name: {"type": "string"} for name in AUDIENCE_FIELDS},
+                    "required": list(AUDIENCE_FIELDS),
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["rows"],
+    },
+}
+
+# Where the rows are read from; anything else is rejected by the controller rather than taking the vision path
+ExtractionMode = Literal["auto", "dom", "vision"]
 
 class ExtractAudienceDataAction(BaseModel):
     is_first_run: bool = Field(True, description="Whether this is the first run (create new file) or not (append to existing)")
     file_path: Optional[str] = Field(None, description="Path to the existing JSON file (only used if is_first_run=False)")
+    mode: ExtractionMode = Field("auto", description="Extraction source: 'auto' (read the table from the page DOM, fall back to a screenshot + vision model), 'dom' or 'vision'")
+    tiled: bool = Field(False, description="Vision extraction only: split a tall table into overlapping row tiles transcribed in parallel (faster for many rows)")
+    rows_per_tile: int = Field(6, ge=2, description="Table rows per tile in tiled mode")
+    max_parallel_tiles: int = Field(4, ge=1, description="Maximum concurrent vision calls in tiled mode")
+    export_json: bool = Field(True, description="Rewrite the JSON file after saving the page. Set False while paging through a long table and True on the last call; every row is kept in the store next to the file either way")
+    delta: bool = Field(True, description="Vision extraction on subsequent runs: only transcribe the rows revealed since the previous extraction (falls back to the whole table when the scroll cannot be determined)")
+    stream: bool = Field(False, description="Vision extraction: stream the response and save each row as soon as it is transcribed (rows completed before a cut-off response are kept)")
+
+@dataclass
+class VisionExtraction:
+    """ Outcome of a vision transcription of the audience table. """
+    rows: Optional[List[dict]] = None
+    error: Optional[str] = None
+    cache_hit: bool = False
+    # The response was cut off (max_tokens, dropped stream) or malformed: rows holds the complete records before the cut
+    truncated: bool = False
+
+# Called with each batch of rows as soon as a streamed response completes them
+RowSink = Callable[[List[dict]], Awaitable[None]]
+
+_AUDIENCE_KEYS = ("Name", "name", "Audience ID", "audience_id")
+
+def _is_audience_entry(entry) -> bool:
+    return isinstance(entry, dict) and any(key in entry for key in _AUDIENCE_KEYS)
+
+def _tool_row(row) -> Optional[dict]:
+    """ Record of one record_audience_rows row checked against the schema (None if it is not a record). """
+    if not isinstance(row, dict) or not (row.get("Name") or row.get("Audience ID")):
+        return None
+    return {name: str(row.get(name) or "") for name in AUDIENCE_FIELDS}
+
+def _standardize_entry(entry: dict) -> dict:
+    """
+    Audience record with capitalized field names (entries that already use them are kept as is).
+    Only needed for a free-text answer, when the model did not call the tool.
+    """
+    if "Name" in entry and "Audience ID" in entry:
+        return entry
+    return {
+        "Name": entry.get("Name", entry.get("name", "")),
+        "Type": entry.get("Type", entry.get("type", "")),
+        "Availability": entry.get("Availability", entry.get("availability", "")),
+        "Date created": entry.get("Date created", entry.get("date_created", "")),
+        "Audience ID": entry.get("Audience ID", entry.get("audience_id", ""))
+    }
+
+def _remember_table(browser: BrowserContext, snapshot):
+    try:
+        _previous_tables[browser] = snapshot
+    except TypeError:
+        pass
+
+async def _extract_with_vision(browser: BrowserContext, logger: logging.Logger, tiled: bool = False,
+                               rows_per_tile: int = DEFAULT_ROWS_PER_TILE,
+                               max_parallel_tiles: int = 4, delta: bool = False, stream: bool = False,
+                               on_rows: Optional[RowSink] = None) -> VisionExtraction:
+    """
+    Vision fallback: screenshot the page and ask Claude to transcribe the audience table.
+
+    Args:
+        browser: Browser context used for the screenshot
+        logger: Extraction logger
+        tiled: Transcribe overlapping row tiles of the table concurrently instead of one image
+        rows_per_tile: Table rows per tile (tiled mode)
+        max_parallel_tiles: Maximum concurrent tile calls (tiled mode)
+        delta: Only transcribe the rows revealed since the previous extraction of this browser
+        stream: Stream the response and parse the rows as they complete
+        on_rows: Optional async callback receiving each batch of streamed rows (e.g. to store them)
+
+    Returns:
+        VisionExtraction with the audience records (standardized field names) or the error
+    """
+    # Initialize Anthropic client using API key from environment variables
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        logger.error("ANTHROPIC_API_KEY not found in environment variables")
+        return VisionExtraction(error="ANTHROPIC_API_KEY not found in environment variables")
+
+    logger.info("Anthropic API key found in environment variables")
+    # Shared async client: the vision call no longer blocks the event loop (see llm_clients.py)
+    logger.info("Using shared async Anthropic client")
+
+    # Take a screenshot of the current page
+    logger.info("Taking screenshot of current page")
+    start_time = datetime.datetime.now()
+    screenshot_data = await browser.take_screenshot(full_page=True)
+    end_time = datetime.datetime.now()
+    screenshot_duration = (end_time - start_time).total_seconds()
+
+    if not screenshot_data:
+        logger.error("Failed to capture screenshot")
+        return VisionExtraction(error="Failed to capture screenshot")
+
+    screenshot_size = len(screenshot_data)
+    logger.info(f"Screenshot captured successfully: {screenshot_size} characters, took {screenshot_duration:.2f} seconds")
+
+    # Detect image format from base64 prefix or assume png/jpeg
+    if screenshot_data.startswith("data:image/png;base64,"):
+        image_format = "image/png"
+        image_data_b64 = screenshot_data.split(',')[1]
+        file_extension = "png"
+        logger.info("Detected image format: PNG from prefix")
+    elif screenshot_data.startswith("data:image/jpeg;base64,"):
+        image_format = "image/jpeg"
+        image_data_b64 = screenshot_data.split(',')[1]
+        file_extension = "jpg"
+        logger.info("Detected image format: JPEG from prefix")
+    elif screenshot_data.startswith("iVBORw0KGgo"):
+        image_format = "image/png"
+        image_data_b64 = screenshot_data
+        file_extension = "png"
+        logger.info("Detected image format: PNG from data")
+    else:
+        image_format = "image/jpeg"
+        image_data_b64 = screenshot_data
+        file_extension = "jpg"
+        logger.info("Detected image format: JPEG (default)")
+
+    # Save screenshot to file
+    try:
+        output_dir = "/Users/meirsabag/Public/browser_use_ver4_newVersion/training_images/output_images_condition_stop_audience_page"
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")[:-3]
+        filename = f"screenshot_{timestamp}.{file_extension}"
+        filepath = os.path.join(output_dir, filename)
+        binary_data = base64.b64decode(image_data_b64)
+        with open(filepath, 'wb') as f:
+            f.write(binary_data)
+        logger.info(f"Screenshot saved to file: {filepath}")
+    except Exception as e:
+        logger.error(f"Failed to save screenshot: {e}\n{traceback.format_exc()}")
+        # Continue even if saving fails
+
+    try:
+        page = await browser.get_current_page()
+    except Exception:
+        page = None
+
+    # Decode once and locate the table (a screenshot that cannot be decoded is sent unchanged)
+    image = region = snapshot = None
+    try:
+        image = await asyncio.to_thread(decode_screenshot, screenshot_data)
+    except Exception as e:
+        logger.warning(f"Could not decode screenshot, sending it unchanged: {str(e)}")
+    if image is not None:
+        region = await locate_table_region(page, image, logger)
+
+    # The rows of a pixel-identical table were already transcribed: reuse them. The key is an exact
+    # digest of the table crop, not the perceptual screenshot hash - that one misses changed cell text
+    cache = get_vision_cache()
+    cache_key = prompt_hash(CLAUDE_MODEL, VISION_PROMPT, AUDIENCE_TOOL, tiled, rows_per_tile)
+    image_hash = None
+    if cache is not None and image is not None:
+        table_image = image.crop(region.as_box()) if region else image
+        image_hash = await asyncio.to_thread(content_hash, table_image)
+        cached = cache.get(CACHE_ACTION, cache_key, image_hash, max_distance=0)
+        if cached:
+            rows, _ = cached
+            logger.info(f"Vision cache hit (identical table pixels): reusing {len(rows)} rows, skipping the API call")
+            return VisionExtraction(rows=[dict(row) for row in rows], cache_hit=True)
+
+    if region is not None:
+        snapshot = await asyncio.to_thread(table_snapshot, image, region)
+
+    # Delta mode: only transcribe the rows revealed since the previous extraction in this browser session
+    body_top = None
+    previous = _previous_tables.get(browser) if delta and region is not None else None
+    if previous is not None:
+        revealed_top = await asyncio.to_thread(revealed_rows_top, previous, image, region)
+        if revealed_top is None:
+            logger.info("Delta extraction: could not align with the previous extraction, transcribing the whole table")
+        elif revealed_top >= region.bottom:
+            logger.info("Delta extraction: no rows revealed since the previous extraction, skipping the API call")
+            _remember_table(browser, snapshot)
+            return VisionExtraction(rows=[])
+        else:
+            body_top = revealed_top
+            logger.info(f"Delta extraction: transcribing the rows from y={body_top} of the table spanning y={region.top}-{region.bottom}")
+
+    # Tiled mode: one call per row band, so the wall-clock time follows the slowest tile, not the row count
+    result = None
+    if tiled and region is not None:
+        tiles = await asyncio.to_thread(table_tiles, image, region, rows_per_tile, TILE_OVERLAP_ROWS, body_top)
+        if len(tiles) > 1:
+            logger.info(f"Split the table into {len(tiles)} tiles of up to {rows_per_tile} rows: {[info['band'] for _, _, info in tiles]}")
+            result = await _transcribe_tiles(api_key, tiles, max_parallel_tiles, logger, stream, on_rows)
+        else:
+            logger.info("Table fits a single tile, extracting from one image")
+
+    if result is None:
+        if image is not None:
+            # Send only the (new rows of the) audience table, downscaled and re-encoded as small as legibility allows
+            if body_top is not None:
+                image_data_b64, image_format, crop_info = await asyncio.to_thread(encode_table_rows, image, region, body_top)
+            else:
+                image_data_b64, image_format, crop_info = await asyncio.to_thread(crop_and_encode, image, region)
+            logger.info(f"Vision image: {crop_info['encoded_size']} {crop_info['media_type']}, "
+                        f"{len(image_data_b64)} characters (was {screenshot_size})")
+        result = await _transcribe_table_image(api_key, image_format, image_data_b64, logger,
+                                               stream=stream, on_rows=on_rows)
+
+    # A cut-off result misses rows: keep the previous snapshot so the next delta extraction re-reads them
+    if result.error or result.truncated:
+        return result
+    if snapshot is not None:
+        _remember_table(browser, snapshot)
+    # Delta results only hold the new rows: cache whole-table results only
+    if image_hash is not None and body_top is None:
+        cache.put(CACHE_ACTION, cache_key, image_hash, [dict(row) for row in result.rows])
+    return result
+
+async def _transcribe_table_image(api_key: str, image_format: str, image_data_b64: str, logger: logging.Logger,
+                                  label: str = "", stream: bool = False,
+                                  on_rows: Optional[RowSink] = None) -> VisionExtraction:
+    """
+    Ask Claude to transcribe the audience table in one image through the record_audience_rows tool.
+
+    Args:
+        api_key: Anthropic API key
+        image_format: Media type of the image
+        image_data_b64: Base64 image data
+        logger: Extraction logger
+        label: Optional prefix for the log lines (e.g. the tile number)
+        stream: Stream the response and parse the rows as they complete
+        on_rows: Optional async callback receiving each batch of streamed rows
+
+    Returns:
+        VisionExtraction with the audience records or the error
+    """
+    logger.info("Prepared prompt for Claude Vision API")
+    request = dict(
+        model=CLAUDE_MODEL,
+        max_tokens=20000,
+        temperature=0.1,
+        tools=[AUDIENCE_TOOL],
+        tool_choice={"type": "tool", "name": AUDIENCE_TOOL["name"]},
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": VISION_PROMPT
+                    },
+                    {
+                        "type": "image",
+                        "source": {
+                            "type": "base64",
+                            "media_type": image_format,
+                            "data": image_data_b64
+                        }
+                    }
+                ]
+            }
+        ]
+    )
+
+    if stream:
+        return await _stream_table_transcription(api_key, request, logger, label, on_rows)
+
+    # Call Claude's Vision API
+    try:
+        logger.info(f"{label}Calling Claude Vision API with screenshot data")
+        logger.info(f"Using Claude model: {CLAUDE_MODEL}")
+        logger.info(f"API parameters: max_tokens=20000, temperature=0.1, tool={AUDIENCE_TOOL['name']}")
+        
+        api_call_start = datetime.datetime.now()
+        message = await create_anthropic_message(api_key=api_key, logger=logger, **request)
+        api_call_end = datetime.datetime.now()
+        api_call_duration = (api_call_end - api_call_start).total_seconds()
+        
+        logger.info(f"{label}Claude Vision API call completed in {api_call_duration:.2f} seconds")
+        stop_reason = getattr(message, "stop_reason", None)
+
+        tool_call = next((block for block in message.content
+                          if getattr(block, "type", None) == "tool_use" and block.name == AUDIENCE_TOOL["name"]), None)
+        if tool_call is not None:
+            rows = tool_call.input.get("rows") if isinstance(tool_call.input, dict) else None
+            if not isinstance(rows, list):
+                logger.error(f"{label}Tool input does not match the audience schema: {str(tool_call.input)[:200]}")
+                return VisionExtraction(error="Claude's record_audience_rows call does not contain a list of rows")
+            audience_data = [record for record in map(_tool_row, rows) if record]
+            logger.info(f"{label}Received {len(audience_data)} audience rows through the {AUDIENCE_TOOL['name']} tool")
+            if stop_reason == "max_tokens":
+                logger.warning(f"{label}Response reached max_tokens: the rows may be incomplete")
+            return VisionExtraction(rows=audience_data, truncated=stop_reason == "max_tokens")
+
+        # The model answered in text instead of calling the tool: read the complete records it wrote
+        response_text = "".join(getattr(block, "text", "") or "" for block in message.content)
+        logger.warning(f"{label}No tool call in the response, reading {len(response_text)} characters of text")
+        parser = FlatObjectParser()
+        audience_data = [_standardize_entry(entry) for entry in parser.feed(response_text) if _is_audience_entry(entry)]
+        if not audience_data and not parser.values_closed:
+            logger.error("Response does not contain recognizable audience data format")
+            return VisionExtraction(error="Could not find audience data in Claude's response")
+        truncated = stop_reason == "max_tokens" or parser.inside_value
+        if truncated:
+            logger.warning(f"{label}Response was cut off (stop_reason={stop_reason}): "
+                           f"kept the {len(audience_data)} complete records before the cut")
+        logger.info(f"{label}Processed {len(audience_data)} audience entries with standardized field names")
+        return VisionExtraction(rows=audience_data, truncated=truncated)
+
+    except Exception as e:
+        error_msg = f"{label}Error calling Claude Vision API: {str(e)}"
+        logger.error(error_msg)
+        logger.error(f"Exception details: {traceback.format_exc()}")
+        return VisionExtraction(error=error_msg)
+
+async def _stream_table_transcription(api_key: str, request: dict, logger: logging.Logger, label: str,
+                                      on_rows: Optional[RowSink]) -> VisionExtraction:
+    """
+    Stream Claude's transcription and hand over each audience record as soon as its object closes
+    in the streamed tool input. When the stream is cut off (max_tokens, dropped connection) the
+    records completed before the cut are kept and the result is marked truncated. Errors raised
+    by on_rows are not a cut-off and propagate.
+
+    Args:
+        api_key: Anthropic API key
+        request: Arguments of the Messages API call
+        logger: Extraction logger
+        label: Prefix for the log lines
+        on_rows: Optional async callback receiving each batch of completed rows
+
+    Returns:
+        VisionExtraction with the rows streamed so far, or the error when no row was completed
+    """
+    # Tool input arrives as partial JSON; a text answer (no tool call) is read the tolerant way
+    tool_parser, text_parser = FlatObjectParser(), FlatObjectParser()
+    rows: List[dict] = []
+    stop_reason = cut_off = sink_error = None
+    logger.info(f"{label}Streaming Claude Vision API response ({CLAUDE_MODEL}, max_tokens=20000, temperature=0.1)")
+    start_time = datetime.datetime.now()
+    try:
+        async with stream_anthropic_message(api_key=api_key, logger=logger, **request) as response_stream:
+            async for event in response_stream:
+                if event.type == "input_json":
+                    records = [record for record in map(_tool_row, tool_parser.feed(event.partial_json)) if record]
+                elif event.type == "text":
+                    records = [_standardize_entry(entry) for entry in text_parser.feed(event.text) if _is_audience_entry(entry)]
+                else:
+                    continue
+                if not records:
+                    continue
+                if not rows:
+                    logger.info(f"{label}First row received after {(datetime.datetime.now() - start_time).total_seconds():.2f} seconds")
+                rows.extend(records)
+                if on_rows:
+                    try:
+                        await on_rows(records)
+                    except Exception as e:
+                        sink_error = e
+                        raise
+            message = await response_stream.get_final_message()
+            stop_reason = message.stop_reason
+    except Exception as e:
+        if sink_error is not None:
+            raise
+        cut_off = f"{type(e).__name__}: {str(e)}"
+    duration = (datetime.datetime.now() - start_time).total_seconds()
+
+    if cut_off is None and stop_reason == "max_tokens":
+        cut_off = "max_tokens reached"
+    elif cut_off is None and (tool_parser.inside_value or text_parser.inside_value):
+        cut_off = f"response ended inside a JSON value (stop_reason={stop_reason})"
+    if cut_off:
+        if not rows:
+            error_msg = f"{label}Claude Vision stream was cut off before any complete row ({cut_off})"
+            logger.error(error_msg)
+            return VisionExtraction(error=error_msg)
+        logger.warning(f"{label}Claude Vision stream cut off after {duration:.2f} seconds ({cut_off}): "
+                       f"kept the {len(rows)} rows completed before the cut")
+        return VisionExtraction(rows=rows, truncated=True)
+    if not rows and not (tool_parser.values_closed or text_parser.values_closed):
+        logger.error("Streamed response does not contain recognizable audience data format")
+        return VisionExtraction(error="Could not find audience data in Claude's response")
+
+    logger.info(f"{label}Streamed {len(rows)} audience entries in {duration:.2f} seconds")
+    return VisionExtraction(rows=rows)
+
+async def _transcribe_tiles(api_key: str, tiles: List[Tuple[str, str, dict]], max_parallel: int,
+                            logger: logging.Logger, stream: bool = False,
+                            on_rows: Optional[RowSink] = None) -> VisionExtraction:
+    """
+    Transcribe table tiles concurrently (bounded fan-out) and merge the rows by Audience ID.
+    A failed tile is retried once; if it still fails the whole extraction fails rather than
+    silently missing rows.
+
+    Args:
+        api_key: Anthropic API key
+        tiles: (base64 data, media type, info) tiles from top to bottom
+        max_parallel: Maximum concurrent tile calls
+        logger: Extraction logger
+        stream: Stream each tile's response
+        on_rows: Optional async callback receiving each batch of streamed rows
+
+    Returns:
+        VisionExtraction with the merged audience records (truncated if any tile was) or the error
+    """
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+    async def transcribe(index: int, tile: Tuple[str, str, dict]) -> VisionExtraction:
+        data, media_type, info = tile
+        label = f"[tile {index + 1}/{len(tiles)}] "
+        async with semaphore:
+            result = await _transcribe_table_image(api_key, media_type, data, logger, label, stream, on_rows)
+            if result.error:
+                logger.warning(f"{label}failed ({result.error}), retrying once")
+                result = await _transcribe_table_image(api_key, media_type, data, logger, label, stream, on_rows)
+        return result
+
+    start_time = datetime.datetime.now()
+    results = await asyncio.gather(*(transcribe(i, tile) for i, tile in enumerate(tiles)))
+    duration = (datetime.datetime.now() - start_time).total_seconds()
+
+    errors = [f"tile {i + 1}: {result.error}" for i, result in enumerate(results) if result.error]
+    if errors:
+        return VisionExtraction(error=f"Tiled extraction failed for {len(errors)} of {len(tiles)} tiles: {'; '.join(errors)}")
+    tile_rows = [result.rows for result in results]
+    audience_data = merge_records(tile_rows)
+    logger.info(f"Tiled extraction: {len(tiles)} tiles, {sum(len(rows) for rows in tile_rows)} rows, "
+                f"{len(audience_data)} after merging overlaps, {duration:.2f} seconds")
+    return VisionExtraction(rows=audience_data, truncated=any(result.truncated for result in results))
 
 async def perform_extract_audience_data(params: ExtractAudienceDataAction, browser: BrowserContext) -> ActionResult:
     """
-    Helper function to extract audience data using Claude Vision API.
+    Helper function to extract audience data: from the DOM when the grid is recognised,
+    otherwise using Claude Vision API.
     """
     logger = None
-    file_handler = None
     try:
-        # --- Logger Setup ---
-        log_dir = "/Users/meirsabag/Public/browser_use_ver4_newVersion/logs"
-        os.makedirs(log_dir, exist_ok=True)
-        log_file = os.path.join(log_dir, "audience_data_extraction.log")
-        logger = logging.getLogger("audience_extraction")
-        logger.setLevel(logging.DEBUG)
-        logger.propagate = False
-        if logger.handlers:
-            for handler in list(logger.handlers): 
-                logger.removeHandler(handler)
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S.%f')
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        # --- End Logger Setup ---
+        logger = get_action_logger("audience_extraction")
 
         session_start_time = datetime.datetime.now()
         logger.info("="*80)
         logger.info(f"STARTING NEW EXTRACTION SESSION: {session_start_time.strftime('%Y-%m-%d %H:%M:%S.%f')}")
         logger.info("="*80)
-        logger.info(f"Function parameters: is_first_run={params.is_first_run}, file_path={params.file_path}")
+        logger.info(f"Function parameters: is_first_run={params.is_first_run}, file_path={params.file_path}, "
+                    f"mode={params.mode}, tiled={params.tiled}, stream={params.stream}")
 
         # Load environment variables
         load_dotenv()
@@ -72,279 +538,85 @@ async def perform_extract_audience_data(params: ExtractAudienceDataAction, brows
         else:
             logger.info(f"Using provided file path for subsequent run: {file_path}")
 
-        # Initialize Anthropic client using API key from environment variables
-        api_key = os.environ.get("ANTHROPIC_API_KEY")
-        if not api_key:
-            logger.error("ANTHROPIC_API_KEY not found in environment variables")
-            return ActionResult(error="ANTHROPIC_API_KEY not found in environment variables")
-
-        logger.info("Anthropic API key found in environment variables")
-        client = anthropic.Anthropic(api_key=api_key)
-        logger.info("Anthropic client initialized")
-
-        # Take a screenshot of the current page
-        logger.info("Taking screenshot of current page")
-        start_time = datetime.datetime.now()
-        screenshot_data = await browser.take_screenshot(full_page=True)
-        end_time = datetime.datetime.now()
-        screenshot_duration = (end_time - start_time).total_seconds()
-
-        if not screenshot_data:
-            logger.error("Failed to capture screenshot")
-            return ActionResult(error="Failed to capture screenshot")
-
-        screenshot_size = len(screenshot_data)
-        logger.info(f"Screenshot captured successfully: {screenshot_size} characters, took {screenshot_duration:.2f} seconds")
-
-        # Detect image format from base64 prefix or assume png/jpeg
-        if screenshot_data.startswith("data:image/png;base64,"):
-            image_format = "image/png"
-            image_data_b64 = screenshot_data.split(',')[1]
-            file_extension = "png"
-            logger.info("Detected image format: PNG from prefix")
-        elif screenshot_data.startswith("data:image/jpeg;base64,"):
-            image_format = "image/jpeg"
-            image_data_b64 = screenshot_data.split(',')[1]
-            file_extension = "jpg"
-            logger.info("Detected image format: JPEG from prefix")
-        elif screenshot_data.startswith("iVBORw0KGgo"):
-            image_format = "image/png"
-            image_data_b64 = screenshot_data
-            file_extension = "png"
-            logger.info("Detected image format: PNG from data")
-        else:
-            image_format = "image/jpeg"
-            image_data_b64 = screenshot_data
-            file_extension = "jpg"
-            logger.info("Detected image format: JPEG (default)")
-
-        # Save screenshot to file
-        try:
-            output_dir = "/Users/meirsabag/Public/browser_use_ver4_newVersion/training_images/output_images_condition_stop_audience_page"
-            os.makedirs(output_dir, exist_ok=True)
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")[:-3]
-            filename = f"screenshot_{timestamp}.{file_extension}"
-            filepath = os.path.join(output_dir, filename)
-            binary_data = base64.b64decode(image_data_b64)
-            with open(filepath, 'wb') as f:
-                f.write(binary_data)
-            logger.info(f"Screenshot saved to file: {filepath}")
-        except Exception as e:
-            logger.error(f"Failed to save screenshot: {e}\n{traceback.format_exc()}")
-            # Continue even if saving fails
-            
-        # Prepare the prompt for Claude
-        prompt = """
-        You have perfect vision and pay great attention to detail which makes you an expert at counting details in table I want you to tell me everything that is written in the table and with all the columns. Write it down in free but neat text. Do you understand what I mean?
-
-        You must only output the rows in the table. Without any additional words.
+        # DOM first: read the rendered grid rows directly (one page.evaluate, no LLM call)
+        audience_data = None
+        source = "vision"
+        cache_hit = truncated = False
+        if params.mode in ("auto", "dom"):
+            page = await browser.get_current_page()
+            ensure_audience_capture(page, logger)
+            dom_result = await read_audience_rows_from_dom(page, logger)
+            if dom_result.complete:
+                audience_data = dom_result.rows
+                source = "dom"
+                logger.info(f"Extracted {len(audience_data)} audience entries from the DOM in {dom_result.duration_ms:.1f}ms")
+            elif params.mode == "dom":
+                logger.error(f"DOM extraction failed: {dom_result.reason}")
+                return ActionResult(error=f"DOM extraction failed: {dom_result.reason}")
+            else:
+                logger.info(f"Falling back to vision extraction: {dom_result.reason}")
 
-        For example:
-        Lookalike (IL, 2%) - Similar Last 90 Days
+        # Vision fallback: unrecognised table structure or incomplete rows
+        # Streaming: each batch of rows is upserted into the store as soon as the response completes it
+        streamed = {"rows": 0, "inserted": 0}
 
-        Type: Lookalike audience Similar Last 90 Days
-        Availability: Audience not created (check ✓)
-        Date created: 09/19/2023 10:09 AM
-        Audience ID: 23859203708050523
+        async def store_streamed_rows(rows: List[dict]):
+            stats = await asyncio.to_thread(save_audience_records, file_path, rows, False, logger)
+            streamed["rows"] += len(rows)
+            streamed["inserted"] += stats["inserted"]
 
-        Just make sure the format is in json
-        """
-        logger.info("Prepared prompt for Claude Vision API")
+        if audience_data is None:
+            vision_result = await _extract_with_vision(browser, logger, tiled=params.tiled,
+                                                       rows_per_tile=params.rows_per_tile,
+                                                       max_parallel_tiles=params.max_parallel_tiles,
+                                                       delta=params.delta and not params.is_first_run,
+                                                       stream=params.stream, on_rows=store_streamed_rows)
+            if vision_result.error:
+                if streamed["rows"]:
+                    return ActionResult(error=f"{vision_result.error} ({streamed['rows']} rows streamed before the failure "
+                                              f"were saved to the store of {file_path})")
+                return ActionResult(error=vision_result.error)
+            audience_data, cache_hit, truncated = vision_result.rows, vision_result.cache_hit, vision_result.truncated
 
-        # Call Claude's Vision API
+        # Persist through the indexed store next to the JSON file: one upsert transaction per page
+        # (O(new rows)); the store imports an existing JSON file once and is safe with concurrent writers
+        if not params.is_first_run and not os.path.exists(file_path):
+            logger.info(f"File does not exist at path {file_path}, starting a new store")
         try:
-            logger.info("Calling Claude Vision API with screenshot data")
-            logger.info(f"Using Claude model: claude-3-7-sonnet-20250219")
-            logger.info(f"API parameters: max_tokens=20000, temperature=0.1")
-            
-            api_call_start = datetime.datetime.now()
-            message = client.messages.create(
-                model="claude-3-7-sonnet-20250219",
-                max_tokens=20000,
-                temperature=0.1,
-                messages=[                   
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": image_format,
-                                    "data": image_data_b64
-                                }
-                            }
-                        ]
-                    }
-                ]
-            )
-            api_call_end = datetime.datetime.now()
-            api_call_duration = (api_call_end - api_call_start).total_seconds()
-            
-            logger.info(f"Claude Vision API call completed in {api_call_duration:.2f} seconds")
-            
-            # Extract the JSON response from Claude
-            response_text = message.content[0].text
-            response_length = len(response_text)
-            logger.info(f"Received response from Claude: {response_length} characters")
-            
-            # Log a preview of the response (first 100 chars)
-            response_preview = response_text[:100].replace('\n', ' ') + ("..." if len(response_text) > 100 else "")
-            logger.info(f"Response preview: {response_preview}")
-            
-            # Parse the JSON from the response - extract the portion between ```json and ```
-            logger.info("Attempting to extract JSON code block from response")
-            json_match = re.search(r'```json\n(.*?)\n```', response_text, re.DOTALL)
-            
-            if json_match:
-                json_content = json_match.group(1).strip()
-                logger.info(f"Successfully extracted JSON code block: {len(json_content)} characters")
-            else:
-                # If no JSON code block found, try to use the entire response
-                json_content = response_text.strip()
-                logger.info(f"No JSON code block found, using entire response: {len(json_content)} characters")
-            
-            # Parse the JSON content
-            try:
-                logger.info("Attempting to parse JSON content")
-                parsed_data = json.loads(json_content)
-                logger.info(f"Successfully parsed JSON content")
-                
-                # Check if the parsed data is a list or contains audience_data
-                if isinstance(parsed_data, list):
-                    audience_entries = parsed_data
-                    logger.info(f"Parsed data is a list with {len(audience_entries)} entries")
-                elif isinstance(parsed_data, dict) and "audience_data" in parsed_data:
-                    audience_entries = parsed_data.get("audience_data", [])
-                    logger.info(f"Parsed data is an object with 'audience_data' field containing {len(audience_entries)} entries")
-                else:
-                    logger.error("Parsed data does not contain recognizable audience data format")
-                    return ActionResult(error=f"Could not find audience data in Claude's response")
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON from Claude's response: {str(e)}")
-                return ActionResult(error=f"Failed to parse JSON from Claude's response: {str(e)}")
-            
-            # Process Claude's response to extract audience data
-            logger.info("Processing audience entries to standardize field names")
-            audience_data = []
-            for i, entry in enumerate(audience_entries):
-                entry_id = entry.get("audience_id", "") or entry.get("Audience ID", "")
-                entry_preview = f"Entry #{i+1}, ID: {entry_id}"
-                logger.info(f"Processing {entry_preview}")
-                
-                # Check if entry already has capitalized field names
-                if "Name" in entry and "Audience ID" in entry:
-                    logger.info(f"{entry_preview}: Entry already has capitalized field names")
-                    audience_data.append(entry)
-                else:
-                    # Ensure consistent field names with capitalization
-                    logger.info(f"{entry_preview}: Converting to capitalized field names")
-                    audience_entry = {
-                        "Name": entry.get("Name", entry.get("name", "")),
-                        "Type": entry.get("Type", entry.get("type", "")),
-                        "Availability": entry.get("Availability", entry.get("availability", "")),
-                        "Date created": entry.get("Date created", entry.get("date_created", "")),
-                        "Audience ID": entry.get("Audience ID", entry.get("audience_id", ""))
-                    }
-                    audience_data.append(audience_entry)
-            
-            logger.info(f"Processed {len(audience_data)} audience entries with standardized field names")
-            
-            # If not the first run, merge with existing data avoiding duplicates
-            if not params.is_first_run and os.path.exists(file_path):
-                try:
-                    logger.info(f"Reading existing data from file: {file_path}")
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        existing_data = json.load(f)
-                    
-                    logger.info(f"Successfully read existing data: {len(existing_data)} entries")
-                    
-                    # Create a set of existing audience IDs for faster lookup
-                    existing_ids = set()
-                    for item in existing_data:
-                        audience_id = item.get('Audience ID')
-                        if audience_id:
-                            existing_ids.add(audience_id)
-                    
-                    logger.info(f"Found {len(existing_ids)} unique audience IDs in existing data")
-                    
-                    # Add only new audience entries
-                    duplicates_count = 0
-                    new_entries_count = 0
-                    
-                    for item in audience_data:
-                        audience_id = item.get('Audience ID')
-                        if audience_id in existing_ids:
-                            logger.info(f"Skipping duplicate audience ID: {audience_id}")
-                            duplicates_count += 1
-                        else:
-                            logger.info(f"Adding new audience ID: {audience_id}")
-                            existing_data.append(item)
-                            new_entries_count += 1
-                    
-                    logger.info(f"Found {duplicates_count} duplicates and {new_entries_count} new entries")
-                    
-                    # Update the data to write
-                    data_to_write = existing_data
-                    logger.info(f"Final data to write: {len(data_to_write)} entries")
-                except Exception as e:
-                    error_msg = f"Failed to process existing data: {str(e)}"
-                    logger.error(error_msg)
-                    logger.error(f"Exception details: {traceback.format_exc()}")
-                    return ActionResult(error=error_msg)
+            if streamed["rows"]:
+                # The rows are stored already: only export the file and count
+                save_stats = await asyncio.to_thread(save_audience_records, file_path, [], params.export_json, logger)
+                save_stats.update(inserted=streamed["inserted"], updated=len(audience_data) - streamed["inserted"])
             else:
-                # First run or file doesn't exist, use only new data
-                if params.is_first_run:
-                    logger.info("First run: using only new data")
-                else:
-                    logger.info(f"File does not exist at path {file_path}, using only new data")
-                
-                data_to_write = audience_data
-                logger.info(f"Data to write: {len(data_to_write)} entries")
-            
-            # Write the data to the file
-            logger.info(f"Writing data to file: {file_path}")
-            file_write_start = datetime.datetime.now()
-            
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(data_to_write, f, indent=2, ensure_ascii=False)
-                
-                file_write_end = datetime.datetime.now()
-                file_write_duration = (file_write_end - file_write_start).total_seconds()
-                logger.info(f"Successfully wrote {len(data_to_write)} entries to file in {file_write_duration:.2f} seconds")
-            except Exception as e:
-                error_msg = f"Failed to write data to file: {str(e)}"
-                logger.error(error_msg)
-                logger.error(f"Exception details: {traceback.format_exc()}")
-                return ActionResult(error=error_msg)
-            
-            # Return success message with file path for future reference
-            message = f"📊 Successfully extracted audience data from table screenshot. Saved to: {file_path}"
-            logger.info("Function completed successfully")
-            logger.info(f"Final message: {message}")
-            
-            session_end_time = datetime.datetime.now()
-            logger.info("="*80)
-            logger.info(f"EXTRACTION SESSION COMPLETED: {session_end_time.strftime('%Y-%m-%d %H:%M:%S.%f')}")
-            logger.info("="*80)
-            
-            return ActionResult(
-                extracted_content=message,
-                include_in_memory=True,
-                metadata={"file_path": file_path, "entries_count": len(data_to_write)}
-            )
-            
+                save_stats = await asyncio.to_thread(save_audience_records, file_path, audience_data, params.export_json, logger)
         except Exception as e:
-            error_msg = f"Error calling Claude Vision API: {str(e)}"
+            error_msg = f"Failed to save audience data: {str(e)}"
             logger.error(error_msg)
             logger.error(f"Exception details: {traceback.format_exc()}")
             return ActionResult(error=error_msg)
+
+        # Return success message with file path for future reference
+        message = (f"📊 Successfully extracted audience data from the table ({source}{', cached' if cache_hit else ''}): {save_stats['inserted']} new, "
+                   f"{save_stats['updated']} already known, {save_stats['total']} total. "
+                   + (f"The response was cut off: kept the {len(audience_data)} rows completed before the cut, "
+                      f"re-run the extraction on this view for the rest. " if truncated else "")
+                   + f"Saved to: {file_path}")
+        logger.info("Function completed successfully")
+        logger.info(f"Final message: {message}")
         
+        session_end_time = datetime.datetime.now()
+        logger.info("="*80)
+        logger.info(f"EXTRACTION SESSION COMPLETED: {session_end_time.strftime('%Y-%m-%d %H:%M:%S.%f')}")
+        logger.info("="*80)
+        
+        return ActionResult(
+            extracted_content=message,
+            include_in_memory=True,
+            metadata={"file_path": file_path, "entries_count": save_stats["total"], "new_entries": save_stats["inserted"],
+                      "source": source, "tiled": params.tiled, "exported": params.export_json, "cache_hit": cache_hit,
+                      "streamed": streamed["rows"] > 0, "truncated": truncated}
+        )
+
     except Exception as e:
         error_message = f"Failed to extract audience data: {str(e)}"
         if logger: # Check if logger was initialized
@@ -360,11 +632,3 @@ async def perform_extract_audience_data(params: ExtractAudienceDataAction, brows
             print(traceback.format_exc())
         
         return ActionResult(error=error_message)
-        
-    finally: # Ensure handlers are closed/removed if logger was initialized
-        if logger and file_handler:
-            try:
-                logger.removeHandler(file_handler)
-                file_handler.close()
-            except Exception as close_err:
-                print(f"Error closing logger handler: {close_err}") # Non-critical, just print
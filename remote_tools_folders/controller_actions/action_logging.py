@@ -0,0 +1,173 @@
+"""
+Shared, non-blocking logging backend for the controller actions.
+
+Actions used to create and close a FileHandler on every call and wrote to it synchronously
+from inside the event loop. Instead, every action logger now puts its records on one
+process-wide queue (QueueHandler); a single QueueListener thread writes them to one
+size-rotated file per action. The event loop only pays for a queue put.
+
+Usage:
+    logger = get_action_logger("mouse_wheel")
+
+Configuration (optional, call once at startup or set the environment variables):
+    configure_action_logging(log_dir=..., jsonl=True)
+    CONTROLLER_LOG_DIR, CONTROLLER_LOG_FORMAT=jsonl, CONTROLLER_LOG_MAX_BYTES, CONTROLLER_LOG_BACKUPS
+"""
+
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+
+DEFAULT_LOG_DIR = "/Users/meirsabag/Public/browser_use_ver4_newVersion/logs"
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+# Log file of each action logger (loggers not listed here get "<name>.log")
+ACTION_LOG_FILES = {
+    "mouse_wheel": "mouse_wheel_actions.log",
+    "audience_extraction": "audience_data_extraction.log",
+    "scroll_condition_check": "scroll_condition_check.log",
+}
+
+TEXT_FORMAT = '%(asctime)s.%(msecs)03d [%(levelname)s] %(message)s'
+TEXT_DATEFMT = '%Y-%m-%d %H:%M:%S'
+
+class JsonLinesFormatter(logging.Formatter):
+    """ One JSON object per line: timestamp, level, logger, message and any `extra` fields. """
+
+    _RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        # Structured fields passed with logger.info(..., extra={...})
+        for key, value in vars(record).items():
+            if key not in self._RESERVED and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _ActionFileRouter(logging.Handler):
+    """ Runs on the listener thread: writes every record to the rotating file of its action logger. """
+
+    def __init__(self, log_dir: str, jsonl: bool, max_bytes: int, backup_count: int):
+        super().__init__(logging.DEBUG)
+        self.log_dir = log_dir
+        self.jsonl = jsonl
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.files: Dict[str, RotatingFileHandler] = {}
+
+    def _file_for(self, name: str) -> RotatingFileHandler:
+        handler = self.files.get(name)
+        if handler is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            file_name = ACTION_LOG_FILES.get(name, f"{name}.log")
+            if self.jsonl:
+                file_name = os.path.splitext(file_name)[0] + ".jsonl"
+            handler = RotatingFileHandler(os.path.join(self.log_dir, file_name), maxBytes=self.max_bytes,
+                                          backupCount=self.backup_count, encoding='utf-8')
+            handler.setFormatter(JsonLinesFormatter() if self.jsonl else logging.Formatter(TEXT_FORMAT, TEXT_DATEFMT))
+            self.files[name] = handler
+        return handler
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self._file_for(record.name).handle(record)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        for handler in self.files.values():
+            handler.close()
+        self.files.clear()
+        super().close()
+
+_lock = threading.Lock()
+_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+_queue_handler = QueueHandler(_queue)
+_listener: Optional[QueueListener] = None
+_router: Optional[_ActionFileRouter] = None
+
+def configure_action_logging(log_dir: Optional[str] = None, jsonl: Optional[bool] = None,
+                             max_bytes: Optional[int] = None, backup_count: Optional[int] = None):
+    """
+    Configure (or reconfigure) the shared logging backend. Safe to call more than once.
+
+    Args:
+        log_dir: Directory of the action log files
+        jsonl: Write structured JSON lines (.jsonl) instead of text
+        max_bytes: Size at which a log file is rotated
+        backup_count: Number of rotated files kept per action
+    """
+    global _listener, _router
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _router.close()
+        _router = _ActionFileRouter(
+            log_dir=log_dir or os.environ.get("CONTROLLER_LOG_DIR", DEFAULT_LOG_DIR),
+            jsonl=jsonl if jsonl is not None else os.environ.get("CONTROLLER_LOG_FORMAT", "").lower() == "jsonl",
+            max_bytes=max_bytes or int(os.environ.get("CONTROLLER_LOG_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            backup_count=backup_count if backup_count is not None else int(os.environ.get("CONTROLLER_LOG_BACKUPS", DEFAULT_BACKUP_COUNT)),
+        )
+        _listener = QueueListener(_queue, _router, respect_handler_level=True)
+        _listener.start()
+
+def get_action_logger(name: str) -> logging.Logger:
+    """
+    Get the logger of a controller action, attached to the shared queue.
+    The backend is configured with the defaults on first use.
+
+    Args:
+        name: Action logger name (e.g. "mouse_wheel")
+
+    Returns:
+        Logger that writes to the action's own log file without blocking the caller
+    """
+    if _listener is None:
+        with _lock:
+            needs_config = _listener is None
+        if needs_config:
+            configure_action_logging()
+    logger = logging.getLogger(name)
+    if _queue_handler not in logger.handlers:
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False  # Keep action logs out of the terminal
+        logger.addHandler(_queue_handler)
+    return logger
+
+def get_action_log_path(name: str) -> Optional[str]:
+    """ Path of the current log file of an action logger (None before it wrote anything). """
+    handler = _router.files.get(name) if _router is not None else None
+    return handler.baseFilename if handler is not None else None
+
+def flush_action_logs():
+    """ Block until every queued record has been written (restarts the listener thread). """
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _router.files.values():
+                handler.flush()
+            _listener.start()
+
+def shutdown_action_logging():
+    """ Write the remaining records and close the log files. """
+    global _listener, _router
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _router.close()
+            _listener = None
+            _router = None
+
+atexit.register(shutdown_action_logging)
@@ -3,13 +3,17 @@ from browser_use.browser.context import BrowserContext
 import traceback
 # import logging
 
+from .cursor_state import ensure_cursor_tracking, update_cursor_position
+
 async def perform_mouse_hover(x: float, y: float, browser: BrowserContext) -> ActionResult:
     """
     Helper function containing the logic to perform a mouse hover action.
     """
     try:
         page = await browser.get_current_page()
+        await ensure_cursor_tracking(page)
         await page.mouse.move(x, y) # Hover is achieved by moving the mouse
+        update_cursor_position(page, x, y, source="mouse_hover")
         message = f"🖱️ Mouse hovering at coordinates ({x}, {y})"
         return ActionResult(extracted_content=message, include_in_memory=True)
     except Exception as e:
@@ -2,23 +2,38 @@ from browser_use import ActionResult
 from browser_use.browser.context import BrowserContext
 from pydantic import BaseModel, Field
 from typing import Optional, List, Tuple  # Added Tuple
-import random
-import math
-import asyncio
-import base64  # Keep if used within, otherwise remove
 import datetime
-import os
-import logging
 import traceback
 
+import numpy as np
+
+from .action_logging import get_action_logger
+from .audience_capture import ensure_audience_capture
+from .clock import get_clock
+from .cursor_state import ensure_cursor_tracking, get_cursor_position, update_cursor_position
+from .input_dispatch import CDPInputStream, build_wheel_events, dispatch_steps_with_playwright
+from .scroll_plan import ScrollPlan, compile_scroll_plan, plan_segments, scroll_step_sizes, speed_profile_kernel
+from .scroll_metrics import read_scroll_metrics, summarize_scroll
+from .settle_detection import DEFAULT_SETTLE_TIMEOUT_MS, wait_for_settle
+
+# Closed-loop correction of scrolls that moved the container less than requested
+MAX_UNDERSHOOT_CORRECTIONS = 2
+UNDERSHOOT_TOLERANCE_PX = 3
+CORRECTION_BUDGET_MS = 1500
+
 class MouseWheelAction(BaseModel):
     delta_x: float = Field(0, description="Pixels to scroll horizontally (positive for right, negative for left). For most websites, use 0 for vertical-only scrolling.")
     delta_y: float = Field(..., description="Pixels to scroll vertically (positive for down, negative for up). Typical values: 100-300 for small scrolls, 500-800 for larger scrolls.")
+    max_duration_ms: Optional[int] = Field(None, gt=0, description="Optional time budget for the whole scroll in milliseconds. Pauses, rhythm and segment count are compressed so the scroll finishes within it. Leave empty for unhurried human timing.")
+    container_selector: Optional[str] = Field(None, description="Optional CSS selector of the scrolled container (e.g. '[role=\"grid\"]' for the audience table). Used to measure the scroll and to wait for it to settle. Defaults to the scrollable container under the mouse.")
+    settle_quiet_ms: int = Field(300, ge=0, description="Milliseconds without DOM changes in the scrolled container after which the scroll counts as settled.")
+    correct_undershoot: bool = Field(True, description="Whether to scroll again when the container moved less than requested and has not reached its end.")
 
 # Generate speed profile for natural scrolling
 def generate_speed_profile(duration_seconds: float) -> List[float]:
     """
     Generate a speed profile for natural scrolling acceleration/deceleration.
+    The profile itself is the "speed_profile" kernel in scroll_plan.py.
     
     Args:
         duration_seconds: Duration of the scrolling segment in seconds
@@ -26,58 +41,7 @@ def generate_speed_profile(duration_seconds: float) -> List[float]:
     Returns:
         List of speed factors for different time positions (0.0 to 1.0)
     """
-    # Create time positions (0.0 to 1.0)
-    steps = 100
-    time_positions = [i/steps for i in range(steps+1)]
-    
-    # Different humans have different scrolling patterns
-    # Randomly choose between acceleration profiles:
-    profile_type = random.choice([
-        "quick_start_slow_end",    # 40% probability
-        "gradual_accel_decel",     # 40% probability
-        "constant_with_bursts",    # 20% probability
-    ])
-    
-    speed_factors = []
-    
-    for t in time_positions:
-        if profile_type == "quick_start_slow_end":
-            # Fast acceleration, longer deceleration
-            if t < 0.2:
-                # Quick ramp up
-                factor = 0.4 + (t / 0.2) * 0.6
-            elif t > 0.7:
-                # Gradual slow down
-                factor = 1.0 - ((t - 0.7) / 0.3) * 0.6
-            else:
-                # Sustained speed in middle
-                factor = 1.0
-                
-        elif profile_type == "gradual_accel_decel":
-            # Sinusoidal acceleration/deceleration (smoother)
-            factor = math.sin((t * math.pi) + math.pi/2) * 0.5 + 0.5
-            
-        else:  # "constant_with_bursts"
-            # Mostly constant speed with occasional speed bursts
-            factor = 0.7  # Base speed
-            
-            # Add random bursts
-            for burst_center in [0.3, 0.6, 0.8]:
-                # If close to a burst center
-                distance = abs(t - burst_center)
-                if distance < 0.1:
-                    # Add boost based on proximity to burst center
-                    burst_factor = 0.3 * (1 - (distance / 0.1))
-                    factor += burst_factor
-        
-        # Add small random noise to the factor
-        factor *= random.uniform(0.95, 1.05)
-        
-        # Ensure factor is positive and reasonable
-        factor = max(0.3, min(1.2, factor))
-        speed_factors.append(factor)
-    
-    return speed_factors
+    return speed_profile_kernel(np.random.default_rng()).tolist()
 
 # Helper function to get speed factor at a specific time position
 def get_speed_factor(speed_profile: List[float], time_position: float) -> float:
@@ -99,7 +63,7 @@ def generate_scroll_steps(total_distance: float, steps_count: int) -> list:
     """
     Generate a list of scroll step sizes that sum approximately to the total distance.
     Creates variable-sized steps that mimic natural human scrolling behavior with
-    acceleration and deceleration patterns.
+    acceleration and deceleration patterns (see scroll_plan.scroll_step_sizes).
     
     Args:
         total_distance: Total distance to scroll
@@ -108,244 +72,90 @@ def generate_scroll_steps(total_distance: float, steps_count: int) -> list:
     Returns:
         List of scroll distances for each step
     """
-    if total_distance == 0:
-        return [0] * steps_count
-    
-    # Create acceleration/deceleration profile (slow start, faster middle, slow end)
-    # This better mimics how humans naturally scroll
-    positions = [i/(steps_count-1) if steps_count > 1 else 0.5 for i in range(steps_count)]
-    weights = []
-    
-    for pos in positions:
-        # Sinusoidal acceleration profile (slow→fast→slow)
-        # sin(π·x) creates a bell curve from 0 to 1
-        weight = math.sin(pos * math.pi)
-        
-        # Add slight randomness to make it more natural
-        weight *= random.uniform(0.9, 1.1)
-        weights.append(weight)
-    
-    # Ensure we have positive values
-    total_weight = sum(weights)
-    
-    # Calculate step sizes based on the acceleration profile weights
-    steps = [int(total_distance * weight / total_weight) for weight in weights]
-    
-    # Adjust the last step to ensure the sum is exactly the total distance
-    steps[-1] = total_distance - sum(steps[:-1])
-    
-    return steps
+    return scroll_step_sizes(total_distance, steps_count, np.random.default_rng()).tolist()
 
 # Helper function to create segments for natural scrolling
 def create_segments(total_distance: int) -> List[int]:
-    """ Break total scroll distance into natural segments. """
-    if abs(total_distance) <= 5:
-        return [total_distance]
-    segment_count = max(3, min(8, abs(total_distance) // 100))
-    segments = []
-    remaining = total_distance
-    for i in range(segment_count):
-        if i == segment_count - 1:
-            segments.append(remaining)
-            break
-        position = i / (segment_count - 1)
-        weight = math.sin(position * math.pi)
-        weight *= random.uniform(0.8, 1.2)
-        # Calculate segment size carefully, avoiding division by zero if segment_count=1
-        denominator = (segment_count - 0.5) if segment_count > 1 else 1
-        segment_size = int(max(1, abs(total_distance * weight / denominator))) * (1 if total_distance > 0 else -1)
-
-        # Ensure we don't overshoot if remaining is small, adjust segment size
-        if abs(segment_size) > abs(remaining):
-            segment_size = remaining
-
-        # Ensure segment_size has the correct sign relative to remaining
-        if remaining == 0:
-            segment_size = 0
-        elif (remaining > 0 and segment_size < 0) or (remaining < 0 and segment_size > 0):
-             segment_size = 0 # Avoid changing direction unexpectedly
-
-        # Ensure minimum step if not zero
-        if segment_size == 0 and remaining != 0:
-             segment_size = 1 if remaining > 0 else -1
-
-        segments.append(segment_size)
-        remaining -= segment_size
-        if remaining == 0 and i < segment_count - 1: # Stop if distance covered early
-             break
-
-    # Filter out potential zero segments added by adjustments, unless it's the only segment
-    final_segments = [s for s in segments if s != 0]
-    if not final_segments and total_distance == 0: return [0]
-    if not final_segments and total_distance != 0: return [total_distance] # fallback if filtering removed everything
-
-    # Final check to ensure sum matches total_distance
-    current_sum = sum(final_segments)
-    if current_sum != total_distance:
-        diff = total_distance - current_sum
-        if final_segments: # Add difference to the last non-zero segment
-            final_segments[-1] += diff
-        else: # If all segments became zero somehow, just use the total distance
-            final_segments = [total_distance]
-
-    return final_segments
-
-# Helper function with logging for scrolling
-async def _scroll_segment_with_logging(page, segment_x: int, segment_y: int, logger=None):
-    """Modified version of scroll_segment_with_1px_increments that includes logging"""
-    # Calculate total pixels to scroll (Manhattan distance)
-    total_pixels = abs(segment_x) + abs(segment_y)
-    if total_pixels == 0:
-        if logger:
-            logger.info("Segment has zero pixels to scroll, skipping")
-        return
-        
-    # Determine direction for each axis
-    x_dir = 1 if segment_x > 0 else -1 if segment_x < 0 else 0
-    y_dir = 1 if segment_y > 0 else -1 if segment_y < 0 else 0
-    if logger:
-        logger.info(f"Scroll directions: X: {x_dir}, Y: {y_dir}")
-    
-    # Count remaining pixels for each axis
-    x_remaining = abs(segment_x)
-    y_remaining = abs(segment_y)
-    if logger:
-        logger.info(f"Initial pixels remaining: X: {x_remaining}, Y: {y_remaining}")
-    
-    # Initial delay based on real human behavior (2000-2600ms)
-    # Only for the first segment
-    if random.random() < 0.7:  # 70% chance of initial pause
-        initial_delay = random.uniform(2.0, 2.6)  # 2000-2600ms
-        if logger:
-            logger.info(f"Applying initial delay of {initial_delay:.2f} seconds")
-        await asyncio.sleep(initial_delay)
-    
-    # Begin scrolling
-    step_counter = 0
-    steps_since_last_pause = 0
-    
-    # Track scroll clusters for realistic timing
-    current_cluster_size = random.randint(10, 20)  # Scrolls before rhythm change
-    cluster_count = 0
-    if logger:
-        logger.info(f"Initial cluster size: {current_cluster_size}")
-    
-    # Log start of scrolling
-    scroll_start_time = datetime.datetime.now()
-    if logger:
-        logger.info(f"Starting pixel-by-pixel scrolling at {scroll_start_time.strftime('%H:%M:%S.%f')}")
-    
-    # Use real human delay patterns: 15-18ms base
-    while x_remaining > 0 or y_remaining > 0:
-        step_counter += 1
-        steps_since_last_pause += 1
-        cluster_count += 1
-        
-        # Decide which axis to move next (probabilistic)
-        move_x = False
-        move_y = False
-        
-        if x_remaining > 0 and y_remaining > 0:
-            # If both axes have remaining distance, choose probabilistically
-            x_prob = x_remaining / (x_remaining + y_remaining)
-            move_x = random.random() < x_prob
-            move_y = not move_x
-        elif x_remaining > 0:
-            move_x = True
-        elif y_remaining > 0:
-            move_y = True
-            
-        # Perform the 1px scroll
-        wheel_x = x_dir if move_x else 0
-        wheel_y = y_dir if move_y else 0
-        
-        # Occasional micro-tremor (hand instability)
-        tremor_chance = 0.02  # 2% chance
-        tremor_occurred = False
-        if random.random() < tremor_chance:
-            if move_x and random.random() < 0.5:
-                wheel_x = 0  # Skip a pixel occasionally
-                tremor_occurred = True
-            if move_y and random.random() < 0.5:
-                wheel_y = 0  # Skip a pixel occasionally
-                tremor_occurred = True
-        
-        if tremor_occurred and logger and step_counter % 10 == 0:
-            logger.debug(f"Micro-tremor at step {step_counter}: wheel_x={wheel_x}, wheel_y={wheel_y}")
-                
-        # Send the wheel event
-        await page.mouse.wheel(wheel_x, wheel_y)
-        
-        # Update remaining distances
-        if move_x:
-            x_remaining -= 1
-        if move_y:
-            y_remaining -= 1
-        
-        # Log progress every 50 steps
-        if logger and step_counter % 50 == 0:
-            progress_pct = (total_pixels - (x_remaining + y_remaining)) / total_pixels * 100
-            logger.info(f"Scroll progress: {progress_pct:.1f}% - Steps: {step_counter}, Remaining: X={x_remaining}, Y={y_remaining}")
-            
-        # TIMING PATTERNS BASED ON REAL HUMAN DATA
-        
-        # 1. Base delay: 15-18ms (most common in real data)
-        wait_time = random.uniform(0.015, 0.018)  # 15-18ms
-        
-        # 2. Micro-burst chance (7-9ms delay) - observed in real data
-        if random.random() < 0.08:  # 8% chance
-            wait_time = random.uniform(0.007, 0.009)  # 7-9ms
-        
-        # 3. Medium pause (24-33ms) - every ~15-25 scrolls
-        if steps_since_last_pause > random.randint(15, 25) and random.random() < 0.3:
-            wait_time = random.uniform(0.024, 0.033)  # 24-33ms
-            steps_since_last_pause = 0
-            if logger and step_counter % 20 == 0:
-                logger.debug(f"Medium pause at step {step_counter}: {wait_time*1000:.1f}ms")
-        
-        # 4. Longer pause patterns based on real data
-        # These were observed to occur every ~30-40 scroll actions
-        if step_counter % random.randint(30, 40) == 0:
-            pause_type = random.choices(
-                ["medium", "long", "very_long", "cognitive"],
-                weights=[0.4, 0.3, 0.2, 0.1],
-                k=1
-            )[0]
-            
-            if pause_type == "medium":
-                wait_time = random.uniform(0.065, 0.085)  # ~80ms
-                pause_label = "medium"
-            elif pause_type == "long":
-                wait_time = random.uniform(0.09, 0.12)  # ~100ms
-                pause_label = "long"
-            elif pause_type == "very_long":
-                wait_time = random.uniform(0.13, 0.16)  # ~150ms
-                pause_label = "very_long"
-            else:  # cognitive
-                wait_time = random.uniform(0.35, 0.45)  # ~400ms
-                pause_label = "cognitive"
-            
+    """ Break total scroll distance into natural segments (see scroll_plan.plan_segments). """
+    return plan_segments(total_distance, np.random.default_rng()).tolist()
+
+# Executor for compiled scroll plans
+async def execute_scroll_plan(page, plan: ScrollPlan, origin: Tuple[float, float] = (0, 0), logger=None, clock=None) -> dict:
+    """
+    Walk a compiled ScrollPlan: initial delay, wheel steps and pause of every segment.
+    Wheel steps go through one pipelined CDP stream for the whole plan (see input_dispatch.py),
+    or through awaited page.mouse.wheel() calls when CDP is not available.
+
+    Args:
+        page: Playwright page
+        plan: Compiled scroll plan
+        origin: Pointer position (x, y) the wheel events are dispatched at
+        logger: Optional logger
+        clock: Optional clock (defaults to the current clock, see clock.py)
+
+    Returns:
+        Dictionary with execution statistics (mode, events, batches)
+    """
+    clock = clock if clock is not None else get_clock()
+    stream = CDPInputStream(page, logger=logger, clock=clock)
+    use_cdp = await stream.open()
+    totals = {"mode": "cdp" if use_cdp else "playwright", "events": 0, "batches": 0}
+    try:
+        for i in range(plan.segment_count):
+            dx, dy, delay_ms = plan.segment(i)
             if logger:
-                logger.debug(f"{pause_label.capitalize()} pause at step {step_counter}: {wait_time*1000:.1f}ms")
-        
-        # 5. Cluster boundary - when we need to change our rhythm
-        if cluster_count >= current_cluster_size:
-            # Create a more noticeable pause between clusters
-            wait_time = random.uniform(0.08, 0.11)  # 80-110ms
-            old_cluster_size = current_cluster_size
-            current_cluster_size = random.randint(10, 20)  # New cluster size
-            cluster_count = 0
+                logger.info(f"Processing segment {i+1}/{plan.segment_count}: X={plan.segments_x[i]}, Y={plan.segments_y[i]}")
+            segment_start_time = clock.now()
+
+            if len(dx) == 0:
+                if logger:
+                    logger.info("Segment has zero pixels to scroll, skipping")
+            else:
+                # Initial delay based on real human behavior (2000-2600ms)
+                if plan.initial_delay_ms[i] > 0:
+                    if logger:
+                        logger.info(f"Applying initial delay of {plan.initial_delay_ms[i] / 1000:.2f} seconds")
+                    await clock.sleep(float(plan.initial_delay_ms[i]) / 1000, "initial_delay")
+
+                steps = list(zip(dx.tolist(), dy.tolist(), (delay_ms / 1000).tolist()))
+                if use_cdp:
+                    stats = await stream.dispatch(build_wheel_events(steps, origin[0], origin[1]))
+                else:
+                    stats = await dispatch_steps_with_playwright(page, steps, clock=clock)
+                totals["events"] += stats["events"]
+                totals["batches"] += stats["batches"]
+
+                segment_duration = clock.now() - segment_start_time
+                if logger:
+                    logger.info(f"Completed segment {i+1} scrolling in {segment_duration:.2f} seconds, "
+                                f"{len(dx)} steps ({totals['mode']} mode, {stats['batches']} batches)")
+
+            # Pause between segments
+            pause_time = float(plan.segment_pause_ms[i]) / 1000
             if logger:
-                logger.debug(f"Cluster boundary at step {step_counter}: old size={old_cluster_size}, new size={current_cluster_size}, pause={wait_time*1000:.1f}ms")
-        
-        # Apply the wait time
-        await asyncio.sleep(wait_time)
-    
-    # Log completion of scrolling
-    scroll_end_time = datetime.datetime.now()
-    scroll_duration = (scroll_end_time - scroll_start_time).total_seconds()
+                logger.info(f"Pausing between segments for {pause_time:.2f} seconds")
+            await clock.sleep(pause_time, "segment_pause")
+    finally:
+        await stream.close()
+    return totals
+
+async def _settle_after_scroll(page, params: MouseWheelAction, origin: Tuple[float, float],
+                               session_start: float, logger=None) -> dict:
+    """ Wait for the scrolled container to settle, within whatever is left of the time budget. """
+    settle_timeout_ms = DEFAULT_SETTLE_TIMEOUT_MS
+    if params.max_duration_ms is not None:
+        elapsed_ms = (get_clock().now() - session_start) * 1000
+        settle_timeout_ms = int(min(settle_timeout_ms, params.max_duration_ms - elapsed_ms))
+
+    if settle_timeout_ms <= 0:
+        if logger:
+            logger.info("Time budget used up, skipping settle wait")
+        return {"settled": False, "duration_ms": 0}
+
     if logger:
-        logger.info(f"Completed pixel-by-pixel scrolling in {scroll_duration:.2f} seconds, {step_counter} steps")
+        logger.info(f"Waiting for scrolled container to settle (quiet window {params.settle_quiet_ms}ms, max {settle_timeout_ms / 1000:.2f}s)")
+    return await wait_for_settle(page, selector=params.container_selector, origin=origin,
+                                 quiet_ms=params.settle_quiet_ms, timeout_ms=settle_timeout_ms, logger=logger)
 
 async def perform_mouse_wheel(params: MouseWheelAction, browser: BrowserContext) -> ActionResult:
     """
@@ -353,72 +163,68 @@ async def perform_mouse_wheel(params: MouseWheelAction, browser: BrowserContext)
     """
     logger = None # Define logger variable early for use in except block
     try:
-        # --- Logger Setup ---
-        log_dir = "/Users/meirsabag/Public/browser_use_ver4_newVersion/logs"
-        os.makedirs(log_dir, exist_ok=True)
-        log_file = os.path.join(log_dir, "mouse_wheel_actions.log")
-        logger = logging.getLogger("mouse_wheel") # Assign to logger variable
-        logger.setLevel(logging.DEBUG)
-        logger.propagate = False
-        if logger.handlers:
-            for handler in list(logger.handlers): logger.removeHandler(handler) # Use list() for safe iteration
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S.%f')
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        # --- End Logger Setup ---
+        logger = get_action_logger("mouse_wheel")
 
+        clock = get_clock()
+        session_start = clock.now()  # Budget accounting follows the (possibly virtual) clock
         session_start_time = datetime.datetime.now()
         logger.info("="*80)
         logger.info(f"STARTING NEW MOUSE WHEEL SESSION: {session_start_time.strftime('%Y-%m-%d %H:%M:%S.%f')}")
         logger.info("="*80)
-        logger.info(f"Function parameters: delta_x={params.delta_x}, delta_y={params.delta_y}")
+        logger.info(f"Function parameters: delta_x={params.delta_x}, delta_y={params.delta_y}, max_duration_ms={params.max_duration_ms}")
 
         page = await browser.get_current_page()
         logger.info("Retrieved current page from browser context")
+        # Audience list responses triggered by the scroll are captured as they arrive
+        ensure_audience_capture(page, logger)
+
+        # Wheel events are dispatched at the tracked mouse position
+        await ensure_cursor_tracking(page, logger)
+        origin = get_cursor_position(page)
+        update_cursor_position(page, origin[0], origin[1], source="mouse_wheel")
+        logger.info(f"Wheel origin (mouse position): {origin}")
 
         total_x = params.delta_x
         total_y = params.delta_y
         logger.info(f"Total scroll distances - X: {total_x}, Y: {total_y}")
 
-        segments_x = create_segments(int(total_x)) # Uses helper in this file
-        segments_y = create_segments(int(total_y)) # Uses helper in this file
-        logger.info(f"Created {len(segments_x)} X segments and {len(segments_y)} Y segments")
-        logger.info(f"X segments: {segments_x}")
-        logger.info(f"Y segments: {segments_y}")
-
-        max_len = max(len(segments_x), len(segments_y))
-        segments_x.extend([0] * (max_len - len(segments_x)))
-        segments_y.extend([0] * (max_len - len(segments_y)))
-        # No need to log extension again if already logged above
-
-        logger.info(f"Starting to process {len(segments_x)} scroll segments")
-        for i, (seg_x, seg_y) in enumerate(zip(segments_x, segments_y)):
-            logger.info(f"Processing segment {i+1}/{len(segments_x)}: X={seg_x}, Y={seg_y}")
-            segment_start_time_inner = datetime.datetime.now() # Use different var name
-
-            # Call the refactored internal helper function, passing the logger
-            await _scroll_segment_with_logging(page, seg_x, seg_y, logger) # Uses helper in this file
-
-            segment_scroll_end = datetime.datetime.now()
-            segment_scroll_duration = (segment_scroll_end - segment_start_time_inner).total_seconds()
-            logger.info(f"Completed segment {i+1} scrolling in {segment_scroll_duration:.2f} seconds")
-
-            # Pause between segments is now inside _scroll_segment_with_logging? No, it was outside. Keep it here.
-            pause_time = random.uniform(0.2, 1.2) # Keep this pause between segments
-            logger.info(f"Pausing between segments for {pause_time:.2f} seconds")
-            await asyncio.sleep(pause_time)
-
-
-        logger.info("Waiting for page to potentially reach network idle state (max 5s)")
-        try:
-            network_idle_start = datetime.datetime.now()
-            await page.wait_for_load_state('networkidle', timeout=5000)
-            network_idle_duration = (datetime.datetime.now() - network_idle_start).total_seconds()
-            logger.info(f"Page reached network idle state after {network_idle_duration:.2f} seconds")
-        except Exception as e:
-            logger.warning(f"Network idle timeout/error (continuing): {str(e)}")
+        before = await read_scroll_metrics(page, params.container_selector, origin, logger)
+
+        plan = compile_scroll_plan(total_x, total_y, max_duration_ms=params.max_duration_ms)
+        plan_summary = plan.summary()
+        logger.info(f"Compiled scroll plan: {plan_summary}")
+
+        logger.info(f"Starting to process {plan.segment_count} scroll segments")
+        execution = await execute_scroll_plan(page, plan, origin, logger, clock)
+        logger.info(f"Scroll plan executed: {execution}")
+
+        settle = await _settle_after_scroll(page, params, origin, session_start, logger)
+        after = await read_scroll_metrics(page, params.container_selector, origin, logger)
+
+        # Closed loop: scroll the shortfall again while the container moved less than requested
+        corrections = 0
+        while params.correct_undershoot and before and after and total_y != 0 and corrections < MAX_UNDERSHOOT_CORRECTIONS:
+            outcome = summarize_scroll(before, after, total_x, total_y)
+            shortfall_y = int(total_y - outcome["achieved_delta_y"])
+            if outcome["reached_end"] or shortfall_y * total_y <= 0 or abs(shortfall_y) <= UNDERSHOOT_TOLERANCE_PX:
+                break
+            correction_budget_ms = CORRECTION_BUDGET_MS
+            if params.max_duration_ms is not None:
+                elapsed_ms = (clock.now() - session_start) * 1000
+                correction_budget_ms = min(correction_budget_ms, params.max_duration_ms - elapsed_ms)
+            if correction_budget_ms <= 0:
+                logger.info("Time budget used up, not correcting undershoot")
+                break
+
+            corrections += 1
+            logger.info(f"Undershoot of {shortfall_y}px detected, correction {corrections}/{MAX_UNDERSHOOT_CORRECTIONS}")
+            correction_plan = compile_scroll_plan(0, shortfall_y, max_duration_ms=correction_budget_ms)
+            await execute_scroll_plan(page, correction_plan, origin, logger, clock)
+            settle = await _settle_after_scroll(page, params, origin, session_start, logger)
+            after = await read_scroll_metrics(page, params.container_selector, origin, logger)
+
+        outcome = summarize_scroll(before, after, total_x, total_y)
+        logger.info(f"Scroll outcome: {outcome}, corrections: {corrections}")
 
         # Create appropriate message based on scroll direction
         horizontal_msg = f"{abs(total_x)} pixels {'right' if total_x > 0 else 'left'}" if total_x != 0 else ""
@@ -427,16 +233,45 @@ async def perform_mouse_wheel(params: MouseWheelAction, browser: BrowserContext)
         else: scroll_msg = horizontal_msg or vertical_msg
 
         message = f"🖱️ Performed human-like scroll: {scroll_msg}" # Simplified message
+        if outcome["achieved_delta_y"] is not None:
+            rows = outcome["visible_rows"]
+            message += f" (container moved {abs(outcome['achieved_delta_y'])}px, {outcome['remaining_px']}px left to scroll"
+            if rows["first"] is not None:
+                message += f", visible rows {rows['first']}-{rows['last']}"
+            message += ")"
+            if outcome["reached_end"]:
+                message += " - reached the end of the scrollable area, no need to scroll further in this direction"
+
+        # Timing against the plan and the budget, in the message itself (the agent only sees extracted_content)
+        total_session_duration = clock.now() - session_start
+        actual_duration_ms = round(total_session_duration * 1000, 1)
+        budget_met = params.max_duration_ms is None or actual_duration_ms <= params.max_duration_ms
+        message += (f" [planned_duration_ms={plan_summary['planned_duration_ms']}, actual_duration_ms={actual_duration_ms}, "
+                    f"max_duration_ms={params.max_duration_ms}, budget_met={budget_met}]")
         logger.info(f"Mouse wheel action completed: {message}")
 
         session_end_time = datetime.datetime.now()
-        total_session_duration = (session_end_time - session_start_time).total_seconds()
         logger.info(f"Total session duration: {total_session_duration:.2f} seconds")
         logger.info("="*80)
         logger.info(f"MOUSE WHEEL SESSION COMPLETED: {session_end_time.strftime('%Y-%m-%d %H:%M:%S.%f')}")
         logger.info("="*80)
 
-        return ActionResult(extracted_content=message, include_in_memory=True)
+        return ActionResult(
+            extracted_content=message,
+            include_in_memory=True,
+            metadata={
+                "planned_duration_ms": plan_summary["planned_duration_ms"],
+                "actual_duration_ms": actual_duration_ms,
+                "max_duration_ms": params.max_duration_ms,
+                "budget_met": budget_met,
+                "compression": plan_summary.get("compression"),
+                "dispatch_mode": execution["mode"],
+                "settled": settle.get("settled"),
+                "settle_duration_ms": settle.get("duration_ms"),
+                "corrections": corrections,
+                **outcome,
+            }
+        )
 
     except Exception as e:
         error_message = f"Failed to perform mouse wheel scroll: {str(e)}"
@@ -452,11 +287,3 @@ async def perform_mouse_wheel(params: MouseWheelAction, browser: BrowserContext)
             print(traceback.format_exc())
 
         return ActionResult(error=error_message)
-
-    finally: # Ensure handlers are closed/removed if logger was initialized
-      if logger and 'file_handler' in locals():
-           try:
-               logger.removeHandler(file_handler)
-               file_handler.close()
-           except Exception as close_err:
-               print(f"Error closing logger handler: {close_err}") # Non-critical, just print
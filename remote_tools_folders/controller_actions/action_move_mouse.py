@@ -7,6 +7,9 @@ import random
 import math
 # import logging # Add if planning to log errors within the helper
 
+from .cursor_state import ensure_cursor_tracking, get_cursor_position, update_cursor_position
+from .mouse_trajectory import DEFAULT_TARGET_WIDTH_PX, TRAJECTORY_MODELS, TrajectoryModel, compute_trajectory, dispatch_trajectory
+
 # Function to generate arc-based mouse movement positions
 def generate_arc_positions(
     start_x: float,
@@ -67,7 +70,9 @@ def generate_arc_positions(
 class MouseMoveAction(BaseModel):
     x: float = Field(..., description="X coordinate relative to the viewport in CSS pixels")
     y: float = Field(..., description="Y coordinate relative to the viewport in CSS pixels")
-    steps: Optional[int] = Field(1, description="Number of intermediate steps for the movement (default: 1)")
+    steps: Optional[int] = Field(1, description="Number of intermediate steps for the movement (default: 1 = direct jump). Values above 1 move along a human-like trajectory with at least this many points.")
+    trajectory: TrajectoryModel = Field("minimum_jerk", description=f"Trajectory model used when steps > 1: {', '.join(TRAJECTORY_MODELS)}. 'bezier' overshoots the target slightly and corrects.")
+    target_width: float = Field(DEFAULT_TARGET_WIDTH_PX, gt=0, description="Approximate size of the target in pixels. Smaller targets make the movement slower (Fitts' law).")
 
 async def perform_move_mouse(params: MouseMoveAction, browser: BrowserContext) -> ActionResult:
     """
@@ -75,31 +80,25 @@ async def perform_move_mouse(params: MouseMoveAction, browser: BrowserContext) -
     """
     try:
         page = await browser.get_current_page()
+        await ensure_cursor_tracking(page)
         
         if params.steps <= 1:
             # Simple direct movement for single step
             await page.mouse.move(params.x, params.y)
+            update_cursor_position(page, params.x, params.y, source="move_mouse")
         else:
-            # Human-like curved movement for multiple steps
-            # First, get current mouse position
-            current_position = await page.evaluate("""() => {
-                return { x: window.mousePosX || 0, y: window.mousePosY || 0 };
-            }""")
-            current_x = current_position.get('x', 0)
-            current_y = current_position.get('y', 0)
-            
-            # Generate arc positions for natural movement
-            positions = generate_arc_positions(
-                current_x, current_y, 
-                params.x, params.y, 
-                steps=params.steps
+            # Human-like movement: positions and timestamps computed in one pass, sent as a batched CDP stream
+            # Start from the tracked cursor position (no page round trip)
+            current_x, current_y = get_cursor_position(page)
+            trajectory = compute_trajectory(
+                current_x, current_y,
+                params.x, params.y,
+                model=params.trajectory,
+                min_points=params.steps + 1,
+                target_width=params.target_width
             )
-            
-            # Move through each position in sequence
-            for pos_x, pos_y in positions:
-                await page.mouse.move(pos_x, pos_y)
-                # Small random delay between movements (10-20ms)
-                await page.wait_for_timeout(random.randint(10, 20))
+            await dispatch_trajectory(page, trajectory)
+            update_cursor_position(page, params.x, params.y, source="move_mouse")
         
         message = f"🖱️ Mouse moved to coordinates ({params.x}, {params.y})"
         return ActionResult(extracted_content=message, include_in_memory=True)
@@ -0,0 +1,120 @@
+from browser_use import ActionResult
+from browser_use.browser.context import BrowserContext
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+# import logging
+
+from .clock import get_clock
+from .cursor_state import ensure_cursor_tracking, get_cursor_position, update_cursor_position
+from .mouse_trajectory import DEFAULT_TARGET_WIDTH_PX, TrajectoryModel, compute_trajectory, dispatch_trajectory
+
+DEFAULT_REVEAL_TIMEOUT_MS = 2000
+DEFAULT_EXPECT_TIMEOUT_MS = 3000
+
+# Element states Playwright's wait_for accepts
+ExpectState = Literal["visible", "hidden", "attached", "detached"]
+
+class PointerSequenceAction(BaseModel):
+    x: Optional[float] = Field(None, description="X coordinate of the target relative to the viewport in CSS pixels (use x/y or index)")
+    y: Optional[float] = Field(None, description="Y coordinate of the target relative to the viewport in CSS pixels (use x/y or index)")
+    index: Optional[int] = Field(None, description="Index of the interactive element to target (the pointer moves to its center)")
+    hover_ms: int = Field(0, ge=0, description="How long to hover over the target before continuing, in milliseconds")
+    reveal_selector: Optional[str] = Field(None, description="CSS selector of an element revealed by hovering (e.g. a row's 'Duplicate' button). The sequence waits until it is visible, then moves to it before clicking.")
+    reveal_timeout_ms: int = Field(DEFAULT_REVEAL_TIMEOUT_MS, ge=0, description="Maximum time to wait for the revealed element")
+    click: bool = Field(True, description="Whether to click at the final cursor position")
+    expect_selector: Optional[str] = Field(None, description="CSS selector whose state change confirms the click worked (e.g. the dialog that opens)")
+    expect_state: ExpectState = Field("visible", description="State expect_selector must reach: visible, hidden, attached or detached")
+    expect_timeout_ms: int = Field(DEFAULT_EXPECT_TIMEOUT_MS, ge=0, description="Maximum time to wait for the expected change")
+    trajectory: TrajectoryModel = Field("minimum_jerk", description="Trajectory model for the pointer moves: minimum_jerk, bezier or arc")
+
+async def _element_center(handle):
+    """ Center and size of an element's bounding box, or None if it is not rendered. """
+    box = await handle.bounding_box() if handle else None
+    if not box or box["width"] <= 0 or box["height"] <= 0:
+        return None
+    return box["x"] + box["width"] / 2, box["y"] + box["height"] / 2, min(box["width"], box["height"])
+
+async def _move_to(page, x: float, y: float, target_width: float, model: TrajectoryModel) -> dict:
+    """ Move the pointer from its tracked position to (x, y) along a human-like trajectory. """
+    start_x, start_y = get_cursor_position(page)
+    trajectory = compute_trajectory(start_x, start_y, x, y, model=model, target_width=target_width)
+    stats = await dispatch_trajectory(page, trajectory)
+    update_cursor_position(page, x, y, source="pointer_sequence")
+    return stats
+
+async def perform_pointer_sequence(params: PointerSequenceAction, browser: BrowserContext) -> ActionResult:
+    """
+    Helper function containing the logic of the compound pointer action:
+    move to a target, hover, wait for the element the hover reveals, click at the real
+    cursor position and wait for the expected DOM change - all in one agent step.
+    """
+    try:
+        page = await browser.get_current_page()
+        await ensure_cursor_tracking(page)
+        steps = []
+
+        # 1. Resolve the target point
+        if params.index is not None:
+            handle = await browser.get_element_by_index(params.index)
+            center = await _element_center(handle)
+            if center is None:
+                return ActionResult(error=f"Element with index {params.index} is not visible on the page")
+            target_x, target_y, target_width = center
+        elif params.x is not None and params.y is not None:
+            target_x, target_y, target_width = params.x, params.y, DEFAULT_TARGET_WIDTH_PX
+        else:
+            return ActionResult(error="pointer_sequence needs either x and y coordinates or an element index")
+
+        # 2. Move and hover
+        await _move_to(page, target_x, target_y, target_width, params.trajectory)
+        steps.append(f"moved to ({target_x:.0f}, {target_y:.0f})")
+        if params.hover_ms:
+            await get_clock().sleep(params.hover_ms / 1000, "hover")
+            steps.append(f"hovered {params.hover_ms}ms")
+
+        # 3. Wait for the element revealed by the hover and move onto it
+        if params.reveal_selector:
+            revealed = page.locator(params.reveal_selector).first
+            try:
+                await revealed.wait_for(state="visible", timeout=params.reveal_timeout_ms)
+            except Exception:
+                return ActionResult(error=f"Hovering at ({target_x:.0f}, {target_y:.0f}) did not reveal '{params.reveal_selector}' "
+                                          f"within {params.reveal_timeout_ms}ms")
+            center = await _element_center(await revealed.element_handle())
+            if center is not None:
+                target_x, target_y, target_width = center
+                await _move_to(page, target_x, target_y, target_width, params.trajectory)
+            steps.append(f"revealed '{params.reveal_selector}'")
+
+        # 4. Click where the cursor actually is
+        if params.click:
+            cursor_x, cursor_y = get_cursor_position(page)
+            await page.mouse.click(cursor_x, cursor_y)
+            steps.append(f"clicked at ({cursor_x:.0f}, {cursor_y:.0f})")
+
+        # 5. Confirm the expected DOM change
+        observed = None
+        if params.expect_selector:
+            try:
+                await page.locator(params.expect_selector).first.wait_for(state=params.expect_state,
+                                                                          timeout=params.expect_timeout_ms)
+                observed = True
+                steps.append(f"'{params.expect_selector}' became {params.expect_state}")
+            except Exception:
+                observed = False
+
+        if observed is False:
+            return ActionResult(error=f"Pointer sequence done ({', '.join(steps)}) but '{params.expect_selector}' did not become "
+                                      f"{params.expect_state} within {params.expect_timeout_ms}ms")
+
+        message = f"🖱️ Pointer sequence: {', '.join(steps)}"
+        return ActionResult(
+            extracted_content=message,
+            include_in_memory=True,
+            metadata={"target": [target_x, target_y], "expected_change_observed": observed}
+        )
+    except Exception as e:
+        error_message = f"Failed to perform pointer sequence: {str(e)}"
+        # Optional: Add logging here
+        # logging.error(f"Failed to perform pointer sequence: {str(e)}\n{traceback.format_exc()}")
+        return ActionResult(error=error_message)
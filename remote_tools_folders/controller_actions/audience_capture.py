@@ -0,0 +1,258 @@
+"""
+Capture of the network responses that feed the Ads Manager audience table.
+
+The audience grid is filled from XHR/GraphQL JSON responses (Graph API `customaudiences`
+edges and Ads Manager GraphQL queries). AudienceResponseCapture listens to the responses of a
+page, parses the audience objects out of matching payloads and accumulates them - keyed by
+Audience ID - in the same record schema the extraction actions write, while the agent scrolls.
+No LLM call is involved, so rows can neither be dropped nor hallucinated.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+import asyncio
+import datetime
+import json
+import logging
+import re
+import weakref
+
+from .audience_dom import AUDIENCE_FIELDS, AUDIENCE_ID_PATTERN
+
+# Endpoints that return audience lists
+AUDIENCE_URL_PATTERNS = [
+    re.compile(r"/customaudiences\b", re.I),
+    re.compile(r"/api/graphql/?", re.I),
+    re.compile(r"/audiences?/", re.I),
+]
+
+# Graph API subtype -> the Type label shown in the table
+AUDIENCE_SUBTYPE_LABELS = {
+    "LOOKALIKE": "Lookalike audience",
+    "CUSTOM": "Custom audience",
+    "WEBSITE": "Custom audience",
+    "ENGAGEMENT": "Custom audience",
+    "APP": "Custom audience",
+    "OFFLINE_CONVERSION": "Custom audience",
+    "VIDEO": "Custom audience",
+    "SAVED_AUDIENCE": "Saved audience",
+}
+
+DATE_FORMAT = "%m/%d/%Y %I:%M %p"  # Same format as the table ("09/19/2023 10:09 AM")
+
+def _label(value) -> str:
+    """ Text of a status/type value that may be a plain string or a {code, description} object. """
+    if isinstance(value, dict):
+        return str(value.get("description") or value.get("text") or value.get("name") or value.get("code") or "")
+    return str(value) if value is not None else ""
+
+def _format_date(value) -> str:
+    """ Format a Unix timestamp (or pass through a date string) like the table does. """
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.isdigit()):
+        return datetime.datetime.fromtimestamp(int(value)).strftime(DATE_FORMAT)
+    return str(value) if value else ""
+
+def audience_object_to_record(obj: dict) -> Optional[dict]:
+    """
+    Map one audience object of an API payload to an audience record.
+
+    Args:
+        obj: JSON object with at least an audience ID and a name
+
+    Returns:
+        Record with the AUDIENCE_FIELDS keys, or None if the object is not an audience
+    """
+    audience_id = str(obj.get("id") or obj.get("audience_id") or "")
+    name = obj.get("name")
+    if not name or not AUDIENCE_ID_PATTERN.fullmatch(audience_id):
+        return None
+    subtype = _label(obj.get("subtype") or obj.get("type") or obj.get("audience_type"))
+    return {
+        "Name": str(name),
+        "Type": AUDIENCE_SUBTYPE_LABELS.get(subtype.upper(), subtype),
+        "Availability": _label(obj.get("delivery_status") or obj.get("operation_status") or obj.get("availability")),
+        "Date created": _format_date(obj.get("time_created") or obj.get("creation_time") or obj.get("date_created")),
+        "Audience ID": audience_id,
+    }
+
+def iter_audience_objects(payload) -> Iterable[dict]:
+    """ Walk a JSON payload and yield every object that looks like an audience. """
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if "name" in node and ("id" in node or "audience_id" in node) and (
+                    "subtype" in node or "delivery_status" in node or "operation_status" in node
+                    or "time_created" in node or "audience_id" in node):
+                yield node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+def parse_payloads(text: str) -> List:
+    """
+    Parse a response body into JSON payloads.
+    Handles the `for (;;);` anti-hijacking prefix and GraphQL responses with one JSON object per line.
+    """
+    text = text.strip()
+    if text.startswith("for (;;);"):
+        text = text[len("for (;;);"):]
+    try:
+        return [json.loads(text)]
+    except ValueError:
+        payloads = []
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith("{") or line.startswith("["):
+                try:
+                    payloads.append(json.loads(line))
+                except ValueError:
+                    continue
+        return payloads
+
+def is_audience_url(url: str) -> bool:
+    """ Whether a response URL is one of the audience-list endpoints. """
+    return any(pattern.search(url) for pattern in AUDIENCE_URL_PATTERNS)
+
+class AudienceResponseCapture:
+    """
+    Accumulates audience records parsed from the network responses of one page.
+    Records are keyed by Audience ID; a later response for the same audience updates its record.
+    """
+
+    def __init__(self, page, logger: Optional[logging.Logger] = None):
+        self.page = page
+        self.logger = logger
+        self.records: "OrderedDict[str, dict]" = OrderedDict()
+        self.responses_matched = 0
+        self.responses_with_audiences = 0
+        self._pending: Set[asyncio.Future] = set()
+        self._attached = False
+
+    def start(self) -> bool:
+        """ Start listening to the page responses. Returns False if the page has no event API. """
+        if self._attached:
+            return True
+        try:
+            self.page.on("response", self._on_response)
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f"Could not attach audience response capture: {str(e)}")
+            return False
+        self._attached = True
+        return True
+
+    def stop(self):
+        """ Stop listening to the page responses (accumulated records are kept). """
+        if self._attached:
+            try:
+                self.page.remove_listener("response", self._on_response)
+            except Exception:
+                pass
+            self._attached = False
+
+    @property
+    def attached(self) -> bool:
+        return self._attached
+
+    def _on_response(self, response):
+        try:
+            if not is_audience_url(response.url):
+                return
+            if getattr(response.request, "resource_type", "xhr") not in ("xhr", "fetch"):
+                return
+        except Exception:
+            return
+        self.responses_matched += 1
+        # Reading the body is async: do it off the event callback and keep track of the task
+        task = asyncio.ensure_future(self._read_response(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _read_response(self, response):
+        try:
+            text = await response.text()
+        except Exception as e:
+            if self.logger:
+                self.logger.debug(f"Could not read response body of {response.url}: {str(e)}")
+            return
+        added = self.ingest(text)
+        if added and self.logger:
+            self.logger.info(f"Captured {added} audience records from {response.url[:120]} (total {len(self.records)})")
+
+    def ingest(self, text: str) -> int:
+        """
+        Parse a response body and store the audience records it contains.
+
+        Args:
+            text: Response body
+
+        Returns:
+            Number of audience records found in the body
+        """
+        found = 0
+        for payload in parse_payloads(text):
+            for obj in iter_audience_objects(payload):
+                record = audience_object_to_record(obj)
+                if record is None:
+                    continue
+                existing = self.records.get(record["Audience ID"])
+                if existing:
+                    # Partial payloads must not blank out fields known from an earlier response
+                    existing.update({key: value for key, value in record.items() if value})
+                else:
+                    self.records[record["Audience ID"]] = record
+                found += 1
+        if found:
+            self.responses_with_audiences += 1
+        return found
+
+    async def drain(self, timeout: float = 5.0):
+        """ Wait for the response bodies that are still being read. """
+        if self._pending:
+            await asyncio.wait(list(self._pending), timeout=timeout)
+
+    def rows(self) -> List[dict]:
+        """ Accumulated audience records in the order they were first seen. """
+        return [{name: record.get(name, "") for name in AUDIENCE_FIELDS} for record in self.records.values()]
+
+    def clear(self):
+        """ Forget the accumulated records. """
+        self.records.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "records": len(self.records),
+            "responses_matched": self.responses_matched,
+            "responses_with_audiences": self.responses_with_audiences,
+        }
+
+_captures: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+def get_audience_capture(page) -> Optional[AudienceResponseCapture]:
+    """ The capture attached to a page, if any. """
+    return _captures.get(page)
+
+def ensure_audience_capture(page, logger: Optional[logging.Logger] = None) -> Optional[AudienceResponseCapture]:
+    """
+    Attach an audience response capture to a page (once per page).
+
+    Args:
+        page: Playwright page
+        logger: Optional logger
+
+    Returns:
+        The page's AudienceResponseCapture, or None if it could not be attached
+    """
+    if page is None:
+        return None
+    capture = _captures.get(page)
+    if capture is None:
+        capture = AudienceResponseCapture(page, logger)
+        try:
+            _captures[page] = capture
+        except TypeError:
+            return None
+    if not capture.start():
+        return None
+    return capture
@@ -0,0 +1,186 @@
+"""
+DOM extraction of the Ads Manager audience table.
+
+read_audience_rows_from_dom() reads the rendered grid rows in a single page.evaluate and maps
+them to the same Name/Type/Availability/Date created/Audience ID records the vision
+extraction produces. It reports whether the table structure was recognised and whether every
+row came back complete, so the caller can fall back to the screenshot + vision path otherwise.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+import logging
+import re
+import time
+
+AUDIENCE_FIELDS = ["Name", "Type", "Availability", "Date created", "Audience ID"]
+
+# Header text (lowercased, whitespace collapsed) -> record field
+HEADER_ALIASES = {
+    "name": "Name",
+    "audience name": "Name",
+    "type": "Type",
+    "availability": "Availability",
+    "date created": "Date created",
+    "created": "Date created",
+    "audience id": "Audience ID",
+    "id": "Audience ID",
+}
+
+# Facebook audience IDs are long numeric strings
+AUDIENCE_ID_PATTERN = re.compile(r"\b(\d{13,20})\b")
+
+# Runs in the page. Finds the audience grid (ARIA grid/table first, then <table>) and returns its
+# header labels and the text of every rendered data row, plus any audience IDs found in row links.
+_AUDIENCE_ROWS_SCRIPT = """() => {
+    const clean = (text) => (text || '').replace(/\\s+/g, ' ').trim();
+    const candidates = Array.from(document.querySelectorAll('[role="grid"], [role="table"], table'));
+    let best = null;
+    for (const table of candidates) {
+        const headers = Array.from(table.querySelectorAll('[role="columnheader"], th')).map(h => clean(h.innerText));
+        if (headers.some(h => /^name$/i.test(h) || /audience name/i.test(h))) { best = { table, headers }; break; }
+    }
+    if (!best) return { recognized: false, headers: [], rows: [] };
+
+    const rows = [];
+    let rowElements = Array.from(best.table.querySelectorAll('[role="row"]'));
+    if (!rowElements.length) rowElements = Array.from(best.table.querySelectorAll('tr'));
+    for (const row of rowElements) {
+        if (row.querySelector('[role="columnheader"], th')) continue;
+        // Only the row's own cells (nested grids have rows of their own)
+        const cells = Array.from(row.querySelectorAll('[role="gridcell"], [role="cell"], td'))
+            .filter(cell => cell.closest('[role="row"], tr') === row);
+        if (!cells.length) continue;
+        const links = Array.from(row.querySelectorAll('a[href]')).map(a => a.getAttribute('href'));
+        rows.push({
+            index: parseInt(row.getAttribute('aria-rowindex'), 10) || null,
+            cells: cells.map(cell => clean(cell.innerText)),
+            links,
+        });
+    }
+    return { recognized: true, headers: best.headers, rows };
+}"""
+
+@dataclass
+class DomExtraction:
+    """ Outcome of a DOM read of the audience table. """
+    rows: List[dict] = field(default_factory=list)
+    recognized: bool = False
+    complete: bool = False
+    incomplete_rows: int = 0
+    reason: Optional[str] = None
+    duration_ms: float = 0.0
+
+def map_header(label: str) -> Optional[str]:
+    """ Map a column header label to its audience record field (None for other columns). """
+    key = re.sub(r"\s+", " ", (label or "")).strip().lower()
+    return HEADER_ALIASES.get(key)
+
+def row_to_record(headers: List[str], cells: List[str], links: Optional[List[str]] = None) -> dict:
+    """
+    Convert the cell texts of one grid row into an audience record.
+
+    Args:
+        headers: Column header labels
+        cells: Cell texts of the row (a leading checkbox column without header is tolerated)
+        links: Optional hrefs found in the row, searched for the audience ID
+
+    Returns:
+        Record with the AUDIENCE_FIELDS keys (empty strings for missing values)
+    """
+    record = {name: "" for name in AUDIENCE_FIELDS}
+    # Rows often have a selection checkbox cell that has no header text
+    offset = len(cells) - len(headers) if len(cells) > len(headers) else 0
+    for i, label in enumerate(headers):
+        name = map_header(label)
+        if name and 0 <= i + offset < len(cells) and not record[name]:
+            record[name] = cells[i + offset]
+
+    if record["Audience ID"]:
+        match = AUDIENCE_ID_PATTERN.search(record["Audience ID"])
+        record["Audience ID"] = match.group(1) if match else record["Audience ID"]
+    else:
+        # No ID column: look for the ID in the row links, then in the row text
+        for text in list(links or []) + cells:
+            match = AUDIENCE_ID_PATTERN.search(text or "")
+            if match:
+                record["Audience ID"] = match.group(1)
+                break
+    return record
+
+def is_complete(record: dict) -> bool:
+    """ Whether every audience field of a record has a value. """
+    return all(record.get(name) for name in AUDIENCE_FIELDS)
+
+def merge_records(record_lists: List[List[dict]]) -> List[dict]:
+    """
+    Merge record lists that may overlap (e.g. tiles sharing rows) into one list keyed by Audience ID.
+    Records seen again fill in fields that were empty before; records without an ID are keyed by Name
+    (records with neither are kept as they are).
+
+    Args:
+        record_lists: Record lists in page order
+
+    Returns:
+        Deduplicated records in the order they were first seen
+    """
+    merged = {}
+    for records in record_lists:
+        for record in records:
+            if record.get("Audience ID"):
+                key = record["Audience ID"]
+            elif record.get("Name"):
+                key = ("name", record["Name"])
+            else:
+                key = ("row", id(record))
+            if key in merged:
+                existing = merged[key]
+                existing.update({name: value for name, value in record.items() if value and not existing.get(name)})
+            else:
+                merged[key] = dict(record)
+    return list(merged.values())
+
+async def read_audience_rows_from_dom(page, logger: Optional[logging.Logger] = None) -> DomExtraction:
+    """
+    Read the audience table rows straight from the rendered DOM.
+
+    Args:
+        page: Playwright page (None yields an unrecognised result)
+        logger: Optional logger
+
+    Returns:
+        DomExtraction; `complete` is True only when the table was recognised, has rows and
+        every row has all AUDIENCE_FIELDS
+    """
+    start = time.monotonic()
+    if page is None:
+        return DomExtraction(reason="no page available")
+    try:
+        raw = await page.evaluate(_AUDIENCE_ROWS_SCRIPT)
+    except Exception as e:
+        if logger:
+            logger.warning(f"DOM extraction failed: {str(e)}")
+        return DomExtraction(reason=f"evaluate failed: {str(e)}", duration_ms=(time.monotonic() - start) * 1000)
+
+    result = DomExtraction(duration_ms=0.0)
+    if not raw or not raw.get("recognized"):
+        result.reason = "audience table not recognised in the DOM"
+    else:
+        result.recognized = True
+        headers = raw.get("headers", [])
+        mapped = {map_header(label) for label in headers} - {None}
+        result.rows = [row_to_record(headers, row.get("cells", []), row.get("links")) for row in raw.get("rows", [])]
+        result.incomplete_rows = sum(1 for record in result.rows if not is_complete(record))
+        if not result.rows:
+            result.reason = "audience table has no rendered rows"
+        elif result.incomplete_rows:
+            result.reason = f"{result.incomplete_rows} of {len(result.rows)} rows incomplete (columns found: {sorted(mapped)})"
+        else:
+            result.complete = True
+
+    result.duration_ms = (time.monotonic() - start) * 1000
+    if logger:
+        logger.info(f"DOM extraction: recognized={result.recognized}, rows={len(result.rows)}, "
+                    f"complete={result.complete}, took {result.duration_ms:.1f}ms"
+                    + (f" ({result.reason})" if result.reason else ""))
+    return result
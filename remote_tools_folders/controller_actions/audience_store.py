@@ -0,0 +1,186 @@
+"""
+Indexed audience store behind the audience JSON files.
+
+Saving a page of extracted audiences used to re-read the whole JSON file, rebuild the set of
+known IDs, append and rewrite the file - O(total rows) per page, and two agents writing the same
+file could lose each other's rows. AudienceStore keeps the records in a SQLite database next to
+the JSON file (`<file>.json.sqlite`) with a unique index on Audience ID: a page is saved in one
+batched upsert transaction (O(new rows)), SQLite's file locking serialises concurrent writers,
+and the JSON file is exported from the store in the usual format when requested.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+
+STORE_SUFFIX = ".sqlite"
+# Seconds a writer waits for another process holding the database lock
+LOCK_TIMEOUT_S = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audiences (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    audience_id TEXT UNIQUE,
+    record TEXT NOT NULL
+)
+"""
+
+def store_path_for(json_path: str) -> str:
+    """ Path of the store that backs an audience JSON file. """
+    return json_path + STORE_SUFFIX
+
+def merge_record(existing: dict, record: dict) -> dict:
+    """ Update a stored record with the non-empty values of a newer one. """
+    merged = dict(existing)
+    merged.update({key: value for key, value in record.items() if value not in (None, "")})
+    return merged
+
+class AudienceStore:
+    """
+    SQLite store of audience records keyed by Audience ID (records without an ID are kept as separate rows).
+    Records keep their first-seen order; extra fields of a record are preserved.
+    """
+
+    def __init__(self, path: str, timeout: float = LOCK_TIMEOUT_S):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM audiences").fetchone()[0]
+
+    def upsert(self, records: Iterable[dict], export_to: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Insert new records and update known ones in one transaction.
+
+        Args:
+            records: Audience records ("Audience ID" is the key)
+            export_to: Optional JSON path exported before the write lock is released, so
+                concurrent writers export their snapshots in the order they wrote them
+
+        Returns:
+            Tuple of (inserted, updated) counts
+        """
+        records = list(records)
+        ids = list({str(r["Audience ID"]) for r in records if r.get("Audience ID")})
+        inserted = updated = 0
+        # BEGIN IMMEDIATE takes the write lock up front, so the read below cannot go stale
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            known = {}
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self.connection.execute(
+                    f"SELECT audience_id, record FROM audiences WHERE audience_id IN ({','.join('?' * len(chunk))})", chunk)
+                known.update((audience_id, json.loads(record)) for audience_id, record in rows)
+            for record in records:
+                audience_id = str(record["Audience ID"]) if record.get("Audience ID") else None
+                if audience_id in known:
+                    known[audience_id] = merge_record(known[audience_id], record)
+                    self.connection.execute("UPDATE audiences SET record = ? WHERE audience_id = ?",
+                                            (json.dumps(known[audience_id], ensure_ascii=False), audience_id))
+                    updated += 1
+                else:
+                    self.connection.execute("INSERT INTO audiences (audience_id, record) VALUES (?, ?)",
+                                            (audience_id, json.dumps(record, ensure_ascii=False)))
+                    if audience_id:
+                        known[audience_id] = record
+                    inserted += 1
+            if export_to:
+                self.export_json(export_to)
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return inserted, updated
+
+    def records(self) -> List[dict]:
+        """ All records in first-seen order. """
+        return [json.loads(record) for (record,) in self.connection.execute("SELECT record FROM audiences ORDER BY seq")]
+
+    def export_json(self, json_path: str) -> int:
+        """
+        Write all records to a JSON file in the usual format (list of records, indent=2).
+        The file is replaced atomically, so readers never see a partial file.
+
+        Returns:
+            Number of records written
+        """
+        records = self.records()
+        directory = os.path.dirname(os.path.abspath(json_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".audiences-", suffix=".json")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(records, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, json_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return len(records)
+
+def open_store_for_json(json_path: str) -> AudienceStore:
+    """
+    Open the store backing a JSON file, importing the file's records when the store is new.
+
+    Args:
+        json_path: Audience JSON file path
+
+    Returns:
+        AudienceStore (close it, or use it as a context manager)
+
+    Raises:
+        ValueError: If an existing JSON file to import is not a list of records
+    """
+    store_path = store_path_for(json_path)
+    is_new = not os.path.exists(store_path)
+    existing = None
+    if is_new and os.path.exists(json_path):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            try:
+                existing = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Existing file {json_path} is not valid JSON: {str(e)}")
+        if not isinstance(existing, list):
+            raise ValueError(f"Existing file {json_path} does not contain a list of audience records")
+    store = AudienceStore(store_path)
+    if existing:
+        store.upsert(existing)
+    return store
+
+def save_audience_records(json_path: str, records: List[dict], export_json: bool = True,
+                          logger: Optional[logging.Logger] = None) -> dict:
+    """
+    Upsert a batch of audience records into the store of a JSON file and optionally re-export the file.
+    Blocking (SQLite and file I/O): call it through asyncio.to_thread from async code.
+
+    Args:
+        json_path: Audience JSON file path
+        records: Records to save
+        export_json: Rewrite the JSON file from the store afterwards
+        logger: Optional logger
+
+    Returns:
+        Dict with inserted, updated, total and exported counts
+    """
+    with open_store_for_json(json_path) as store:
+        inserted, updated = store.upsert(records, export_to=json_path if export_json else None)
+        total = store.count()
+        exported = total if export_json else None
+    if logger:
+        logger.info(f"Saved {len(records)} records to {store_path_for(json_path)}: {inserted} new, {updated} updated, "
+                    f"{total} total" + (f", exported {exported} to {json_path}" if export_json else ""))
+    return {"inserted": inserted, "updated": updated, "total": total, "exported": exported}
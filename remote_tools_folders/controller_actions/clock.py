@@ -0,0 +1,101 @@
+"""
+Clock abstraction for the human-timing engine.
+
+Every delay of the human-like input code (wheel steps, segment pauses, pointer moves,
+hover dwells) goes through the current clock instead of calling asyncio.sleep directly:
+
+- RealClock (the default) really sleeps.
+- VirtualClock advances instantly and records the intended schedule, so tests run in
+  milliseconds and thousands of scrolls can be simulated offline to estimate session duration.
+
+The current clock is held in a context variable, so `with use_clock(VirtualClock()):` only
+affects the code running in that context (e.g. one test or one simulated session).
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+import asyncio
+import contextlib
+import contextvars
+import time
+
+class RealClock:
+    """ Wall-clock time: sleeps really sleep. """
+    virtual = False
+
+    def now(self) -> float:
+        """ Monotonic time in seconds. """
+        return time.monotonic()
+
+    async def sleep(self, seconds: float, label: Optional[str] = None):
+        """ Sleep for the given number of seconds (label is only used by VirtualClock). """
+        await asyncio.sleep(max(0.0, seconds))
+
+@dataclass(frozen=True)
+class ScheduledWait:
+    """ One wait recorded by VirtualClock. """
+    start_s: float
+    duration_s: float
+    label: Optional[str]
+
+class VirtualClock:
+    """ Simulated time: sleeps return immediately, advance the clock and record the intended schedule. """
+    virtual = True
+
+    def __init__(self, start: float = 0.0):
+        self.start = start
+        self._now = start
+        self.schedule: List[ScheduledWait] = []
+
+    def now(self) -> float:
+        """ Current simulated time in seconds. """
+        return self._now
+
+    async def sleep(self, seconds: float, label: Optional[str] = None):
+        """ Advance the simulated time and record the wait. """
+        seconds = max(0.0, float(seconds))
+        self.schedule.append(ScheduledWait(self._now, seconds, label))
+        self._now += seconds
+        # Still yield to the event loop so concurrent tasks (e.g. CDP acknowledgements) make progress
+        await asyncio.sleep(0)
+
+    def advance(self, seconds: float):
+        """ Advance the simulated time without recording a wait (e.g. to model page work). """
+        self._now += max(0.0, seconds)
+
+    @property
+    def elapsed(self) -> float:
+        """ Simulated seconds since the clock was created or reset. """
+        return self._now - self.start
+
+    def total_slept(self, label: Optional[str] = None) -> float:
+        """ Total recorded wait time, optionally only for waits with the given label. """
+        return sum(wait.duration_s for wait in self.schedule if label is None or wait.label == label)
+
+    def reset(self):
+        """ Clear the schedule and restart the simulated time. """
+        self._now = self.start
+        self.schedule.clear()
+
+_current_clock: contextvars.ContextVar = contextvars.ContextVar("human_timing_clock", default=RealClock())
+
+def get_clock():
+    """ Clock used by the human-timing code in the current context. """
+    return _current_clock.get()
+
+@contextlib.contextmanager
+def use_clock(clock):
+    """
+    Use a clock for the human-timing code in the current context.
+
+    Args:
+        clock: RealClock, VirtualClock or any object with now() and async sleep(seconds, label)
+
+    Yields:
+        The clock
+    """
+    token = _current_clock.set(clock)
+    try:
+        yield clock
+    finally:
+        _current_clock.reset(token)
@@ -0,0 +1,137 @@
+"""
+Persistent per-page cursor position tracker.
+
+Playwright does not expose where its virtual mouse is, and nothing in the page sets the
+window.mousePosX/mousePosY globals the mouse actions used to read. The cursor position is
+therefore kept in Python, per page, and updated by every move, hover, click and wheel action,
+so curved moves start from the real position without an extra page.evaluate round trip.
+
+An init script keeps the page side honest across navigations: it restores the
+window.mousePosX/mousePosY globals from sessionStorage in every new document and reports
+pointer moves that did not come from these actions (e.g. browser-use's own element clicks)
+back to Python through an exposed binding.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import logging
+import time
+import weakref
+
+CURSOR_BINDING_NAME = "__reportCursorPosition"
+
+# Page-side tracker. Called with the position known to Python for the current document and
+# with null from the init script in every new document (the position is then restored from sessionStorage)
+_CURSOR_TRACKER_FUNCTION = """(seed) => {
+    if (seed) {
+        window.mousePosX = seed[0];
+        window.mousePosY = seed[1];
+    } else {
+        try {
+            const saved = JSON.parse(sessionStorage.getItem('__cursorPosition') || 'null');
+            if (saved) { window.mousePosX = saved.x; window.mousePosY = saved.y; }
+        } catch (e) {}
+    }
+    if (window.__cursorTrackerInstalled) return;
+    window.__cursorTrackerInstalled = true;
+    let reportTimer = null;
+    const report = () => {
+        reportTimer = null;
+        try { sessionStorage.setItem('__cursorPosition', JSON.stringify({ x: window.mousePosX, y: window.mousePosY })); } catch (e) {}
+        if (window.__reportCursorPosition) window.__reportCursorPosition(window.mousePosX, window.mousePosY);
+    };
+    document.addEventListener('mousemove', (e) => {
+        window.mousePosX = e.clientX;
+        window.mousePosY = e.clientY;
+        // Trailing throttle: at most one report to Python every 100ms
+        if (!reportTimer) reportTimer = setTimeout(report, 100);
+    }, { capture: true, passive: true });
+}"""
+
+CURSOR_TRACKING_SCRIPT = f"({_CURSOR_TRACKER_FUNCTION})(null);"
+
+@dataclass
+class CursorState:
+    """ Last known cursor position of a page in viewport CSS pixels. """
+    x: float = 0.0  # Playwright's virtual mouse starts at the viewport origin
+    y: float = 0.0
+    source: str = "initial"
+    updated_at: float = 0.0
+    tracking: Optional[bool] = None  # None until ensure_cursor_tracking() ran for the page
+
+_cursor_states: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+def get_cursor_state(page) -> CursorState:
+    """
+    Get the cursor state of a page (created at the viewport origin on first use).
+
+    Args:
+        page: Playwright page
+
+    Returns:
+        CursorState for the page
+    """
+    state = _cursor_states.get(page)
+    if state is None:
+        state = CursorState()
+        _cursor_states[page] = state
+    return state
+
+def get_cursor_position(page) -> Tuple[float, float]:
+    """ Current cursor position (x, y) of a page, without a page round trip. """
+    state = get_cursor_state(page)
+    return state.x, state.y
+
+def update_cursor_position(page, x: float, y: float, source: str = "action") -> CursorState:
+    """
+    Record a new cursor position for a page.
+
+    Args:
+        page: Playwright page
+        x: X coordinate in CSS pixels
+        y: Y coordinate in CSS pixels
+        source: What moved the cursor (action name, "page" for moves reported by the init script)
+
+    Returns:
+        The updated CursorState
+    """
+    state = get_cursor_state(page)
+    state.x, state.y = float(x), float(y)
+    state.source = source
+    state.updated_at = time.monotonic()
+    return state
+
+async def ensure_cursor_tracking(page, logger: Optional[logging.Logger] = None) -> bool:
+    """
+    Install the cursor tracking binding and init script on a page.
+    Installation is attempted once per page; later calls return the cached outcome.
+
+    Args:
+        page: Playwright page
+        logger: Optional logger
+
+    Returns:
+        True if tracking is installed, False if it could not be installed (e.g. mocked pages)
+    """
+    state = get_cursor_state(page)
+    if state.tracking is not None:
+        return state.tracking
+    # Mark the attempt first so a partial failure is never retried (the binding can only be exposed once)
+    state.tracking = False
+    try:
+        def on_page_move(source, x, y):
+            if x is not None and y is not None:
+                update_cursor_position(page, x, y, source="page")
+
+        await page.expose_binding(CURSOR_BINDING_NAME, on_page_move)
+        await page.add_init_script(CURSOR_TRACKING_SCRIPT)
+        # Seed the current document with the position known to Python
+        await page.evaluate(_CURSOR_TRACKER_FUNCTION, [state.x, state.y])
+        state.tracking = True
+        if logger:
+            logger.info("Cursor tracking installed on page")
+        return True
+    except Exception as e:
+        if logger:
+            logger.warning(f"Could not install cursor tracking (using Python state only): {str(e)}")
+        return False
@@ -0,0 +1,116 @@
+"""
+Process-level registry of few-shot example images for the vision actions.
+
+check_condition_stop_page_wheel used to list its training directory, read every PNG (several MB)
+and base64-encode it on every call, on the event loop, then rebuild the example conversation.
+A FewShotRegistry loads, downscales and encodes the images of a directory once and keeps the
+example messages built from them as an immutable prefix. Each lookup only stats the directory:
+when a file is added, removed or its mtime changes, the prefix is rebuilt.
+
+Images are downscaled to the long edge the Messages API resizes to anyway (MAX_LONG_EDGE_PX),
+so the model sees the same pixels for a fraction of the upload.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+import asyncio
+import copy
+import logging
+import os
+import threading
+
+from PIL import Image
+
+from .table_region import encode_image
+from .vision_cache import prompt_hash
+
+IMAGE_EXTENSIONS = (".png",)
+
+@dataclass(frozen=True)
+class EncodedExample:
+    """ One example image, downscaled and base64-encoded. """
+    name: str
+    media_type: str
+    data: str
+
+@dataclass(frozen=True)
+class FewShotPrefix:
+    """ Example images and the conversation built from them, shared by every call until a file changes. """
+    examples: Tuple[EncodedExample, ...]
+    prefix: Tuple[dict, ...]
+    # Stable hash of the prefix (file signature + message texts), for result cache keys
+    key: str
+
+    def messages(self, *messages: dict) -> List[dict]:
+        """ A fresh copy of the prefix messages followed by the given messages (the prefix itself is never modified). """
+        return copy.deepcopy(list(self.prefix)) + list(messages)
+
+# (file name, mtime in ns, size) of every example file, in name order
+Signature = Tuple[Tuple[str, int, int], ...]
+
+class FewShotRegistry:
+    """
+    Loads the example images of a directory once and serves the message prefix built from them.
+
+    Args:
+        directory: Directory of the example images (sorted by file name)
+        build_prefix: Builds the prefix messages from the encoded examples
+    """
+
+    def __init__(self, directory: str, build_prefix: Callable[[Tuple[EncodedExample, ...]], List[dict]]):
+        self.directory = directory
+        self.build_prefix = build_prefix
+        self.loads = 0
+        self._signature: Optional[Signature] = None
+        self._prefix: Optional[FewShotPrefix] = None
+        self._lock = threading.Lock()
+
+    def signature(self) -> Signature:
+        """ Current (name, mtime, size) of the example files; empty if the directory does not exist. """
+        if not os.path.isdir(self.directory):
+            return ()
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    stat = entry.stat()
+                    entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(entries))
+
+    def load(self, logger: Optional[logging.Logger] = None) -> FewShotPrefix:
+        """
+        The current prefix, (re)built if the example files changed since the last load.
+        Blocking (file I/O and image encoding): call it through get() from async code.
+
+        Returns:
+            FewShotPrefix
+        """
+        with self._lock:
+            signature = self.signature()
+            if self._prefix is not None and signature == self._signature:
+                return self._prefix
+            examples = []
+            for name, _, _ in signature:
+                try:
+                    with Image.open(os.path.join(self.directory, name)) as image:
+                        data, media_type, info = encode_image(image.convert("RGB"))
+                except Exception as e:
+                    if logger:
+                        logger.error(f"Failed to load example image {name}: {str(e)}")
+                    continue
+                examples.append(EncodedExample(name, media_type, data))
+                if logger:
+                    logger.info(f"Encoded example image {name}: {info['encoded_size']} {media_type}, {info['bytes']} bytes")
+            examples = tuple(examples)
+            prefix = tuple(self.build_prefix(examples))
+            texts = [block.get("text") for message in prefix for block in message["content"] if block.get("type") == "text"]
+            self._prefix = FewShotPrefix(examples, prefix, prompt_hash(signature, texts))
+            self._signature = signature
+            self.loads += 1
+            if logger:
+                logger.info(f"Built few-shot prefix from {len(examples)} example images in {self.directory}")
+            return self._prefix
+
+    async def get(self, logger: Optional[logging.Logger] = None) -> FewShotPrefix:
+        """ The current prefix, checked and (re)built in a worker thread. """
+        return await asyncio.to_thread(self.load, logger)
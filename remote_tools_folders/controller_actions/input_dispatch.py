@@ -0,0 +1,204 @@
+import asyncio
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+from .clock import get_clock
+
+# A single precomputed input event: (CDP method params, delay in seconds to wait AFTER sending it).
+# params=None is a pure wait step that keeps its slot in the timing schedule without sending anything.
+InputEvent = Tuple[Optional[dict], float]
+
+class CDPInputStream:
+    """
+    Pipelined input dispatcher that sends precomputed events over a raw CDP session.
+
+    Playwright's page.mouse.wheel()/move() await one CDP round trip per event. This stream
+    sends `Input.dispatchMouseEvent` commands at their scheduled times WITHOUT waiting for
+    each acknowledgement; acknowledgements are collected in the background and drained
+    every `max_in_flight` events (back-pressure) and at the end of the stream.
+    The events are the same ones Playwright would send, so the browser still receives
+    trusted (isTrusted=true) input events.
+
+    Events whose scheduled send time falls within `coalesce_ms` of each other are sent
+    together as one batch, so the number of timer wake-ups drops as well.
+    Scheduling uses absolute deadlines, so sleep jitter does not accumulate over the stream.
+    Time is read from the injectable clock (clock.py), so the schedule can run in virtual time.
+    """
+
+    def __init__(self, page, coalesce_ms: float = 4.0, max_in_flight: int = 64, logger: Optional[logging.Logger] = None,
+                 clock=None):
+        self.page = page
+        self.clock = clock if clock is not None else get_clock()
+        self.coalesce_s = max(0.0, coalesce_ms) / 1000.0
+        self.max_in_flight = max(1, max_in_flight)
+        self.logger = logger
+        self.session = None
+
+    async def open(self) -> bool:
+        """
+        Open the CDP session for the page.
+
+        Returns:
+            True if a CDP session is available (Chromium), False otherwise
+        """
+        if self.session is not None:
+            return True
+        try:
+            self.session = await self.page.context.new_cdp_session(self.page)
+            return True
+        except Exception as e:
+            # Non-Chromium browsers (or mocked pages) have no CDP - callers fall back to Playwright
+            if self.logger:
+                self.logger.info(f"CDP session unavailable, falling back to Playwright input: {e}")
+            self.session = None
+            return False
+
+    async def close(self):
+        """ Detach the CDP session if one was opened. """
+        if self.session is not None:
+            try:
+                await self.session.detach()
+            except Exception as e:
+                if self.logger:
+                    self.logger.debug(f"Error detaching CDP session: {e}")
+            self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def dispatch(self, events: Sequence[InputEvent], method: str = "Input.dispatchMouseEvent") -> dict:
+        """
+        Send the events following their timing schedule without awaiting each acknowledgement.
+
+        Args:
+            events: Sequence of (CDP params, delay_after_seconds) tuples
+            method: CDP method used for every event
+
+        Returns:
+            Dictionary with dispatch statistics (events, batches, acks_awaited, scheduled_s, elapsed_s)
+        """
+        if self.session is None and not await self.open():
+            raise RuntimeError("CDP session is not available for this page")
+
+        clock = self.clock
+        start = clock.now()
+        pending: List[asyncio.Future] = []
+        batches = 0
+        ack_drains = 0
+
+        # Absolute send time of each event: the first event goes out immediately,
+        # every following event after the delay of the previous one
+        deadline = 0.0
+        i = 0
+        total = len(events)
+        while i < total:
+            # Wait for the batch deadline (only if it is meaningfully in the future)
+            wait = (start + deadline) - clock.now()
+            if wait > self.coalesce_s:
+                await clock.sleep(wait, "input")
+
+            # Collect every event due within the coalescing window into this batch
+            batch_end = deadline + self.coalesce_s
+            while i < total and deadline <= batch_end:
+                params, delay = events[i]
+                if params is not None:
+                    pending.append(asyncio.ensure_future(self.session.send(method, params)))
+                deadline += max(0.0, delay)
+                i += 1
+            batches += 1
+
+            # Back-pressure: never keep more than max_in_flight unacknowledged commands
+            if len(pending) >= self.max_in_flight:
+                await self._drain(pending)
+                ack_drains += 1
+
+        # Honour the delay after the final event, then collect the remaining acknowledgements
+        wait = (start + deadline) - clock.now()
+        if wait > 0:
+            await clock.sleep(wait, "input")
+        if pending:
+            await self._drain(pending)
+            ack_drains += 1
+
+        stats = {
+            "events": total,
+            "batches": batches,
+            "acks_awaited": ack_drains,
+            "scheduled_s": deadline,
+            "elapsed_s": clock.now() - start,
+        }
+        if self.logger:
+            self.logger.info(
+                f"CDP dispatch: {total} events in {batches} batches, {ack_drains} ack drains, "
+                f"scheduled {deadline:.3f}s, elapsed {stats['elapsed_s']:.3f}s"
+            )
+        return stats
+
+    async def _drain(self, pending: List[asyncio.Future]):
+        """ Await all outstanding acknowledgements and re-raise the first failure. """
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        pending.clear()
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+def build_wheel_events(steps: Sequence[Tuple[float, float, float]], x: float, y: float) -> List[InputEvent]:
+    """
+    Convert (delta_x, delta_y, delay_seconds) steps into CDP mouseWheel events at a fixed pointer position.
+    Zero-delta steps (e.g. micro-tremor skips) become wait-only events that keep their delay in the schedule.
+
+    Args:
+        steps: Sequence of (delta_x, delta_y, delay_seconds) tuples
+        x: Pointer X coordinate in CSS pixels
+        y: Pointer Y coordinate in CSS pixels
+
+    Returns:
+        List of InputEvent tuples ready for CDPInputStream.dispatch
+    """
+    events: List[InputEvent] = []
+    for delta_x, delta_y, delay in steps:
+        if delta_x == 0 and delta_y == 0:
+            events.append((None, delay))
+            continue
+        events.append(({
+            "type": "mouseWheel",
+            "x": x,
+            "y": y,
+            "deltaX": delta_x,
+            "deltaY": delta_y,
+            "pointerType": "mouse",
+        }, delay))
+    return events
+
+async def dispatch_steps_with_playwright(page, steps: Sequence[Tuple[float, float, float]], clock=None) -> dict:
+    """
+    Fallback dispatcher: one awaited page.mouse.wheel() per step, followed by its delay.
+
+    Args:
+        page: Playwright page
+        steps: Sequence of (delta_x, delta_y, delay_seconds) tuples
+        clock: Optional clock (defaults to the current clock)
+
+    Returns:
+        Dictionary with dispatch statistics (mode "playwright")
+    """
+    clock = clock if clock is not None else get_clock()
+    start = clock.now()
+    scheduled = 0.0
+    for delta_x, delta_y, delay in steps:
+        if delta_x != 0 or delta_y != 0:
+            await page.mouse.wheel(delta_x, delta_y)
+        scheduled += delay
+        await clock.sleep(delay, "input")
+    return {
+        "events": len(steps),
+        "batches": len(steps),
+        "acks_awaited": len(steps),
+        "scheduled_s": scheduled,
+        "elapsed_s": clock.now() - start,
+        "mode": "playwright",
+    }
@@ -0,0 +1,99 @@
+"""
+Incremental parsing of JSON records out of a streamed LLM response.
+
+The vision model returns its rows as flat records inside a larger JSON value: the streamed input
+of a tool call ({"rows": [...]}), or a text answer (optionally fenced as ```json, optionally
+wrapped as {"audience_data": [...]}). FlatObjectParser scans the text as it arrives, tracking
+strings, escapes and bracket depth, and returns each flat object (one without nested objects or
+lists) as soon as its closing brace arrives - so the records completed before a truncated or
+dropped stream are never lost, and the caller can store them while the rest is still streaming.
+
+Text outside a JSON value (code fences, prose) is skipped.
+"""
+
+from typing import List
+import json
+
+class FlatObjectParser:
+    """
+    Feed response text chunk by chunk; each feed returns the flat JSON objects completed by the chunk.
+
+    Usage:
+        parser = FlatObjectParser()
+        async for text in stream.text_stream:
+            for record in parser.feed(text):
+                ...
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        # Open containers: [bracket, start offset, has nested containers]
+        self.stack: List[list] = []
+        self.in_string = False
+        self.escaped = False
+        self.objects_parsed = 0
+        self.objects_invalid = 0
+        # Top-level JSON values closed so far (e.g. a complete but empty list)
+        self.values_closed = 0
+
+    @property
+    def inside_value(self) -> bool:
+        """ True while a JSON value is open (the text so far ends mid-value). """
+        return bool(self.stack)
+
+    def feed(self, chunk: str) -> List[dict]:
+        """
+        Consume the next chunk of the response.
+
+        Args:
+            chunk: Response text following the previous chunk
+
+        Returns:
+            Flat objects whose closing brace is in this chunk, in order
+        """
+        self.text += chunk
+        completed = []
+        text, pos = self.text, self.pos
+        while pos < len(text):
+            char = text[pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                # Quotes only open strings inside a value; outside one they belong to prose
+                self.in_string = bool(self.stack)
+            elif char in "{[":
+                if self.stack:
+                    self.stack[-1][2] = True
+                self.stack.append([char, pos, False])
+            elif char in "}]" and self.stack:
+                bracket, start, nested = self.stack.pop()
+                if char == "}" and bracket == "{" and not nested:
+                    try:
+                        value = json.loads(text[start:pos + 1])
+                    except json.JSONDecodeError:
+                        self.objects_invalid += 1
+                    else:
+                        self.objects_parsed += 1
+                        completed.append(value)
+                if not self.stack:
+                    self.values_closed += 1
+            pos += 1
+        # Drop the text before the open value: only a container still open needs its start offset
+        keep_from = self.stack[0][1] if self.stack else pos
+        if keep_from:
+            self.text = text[keep_from:]
+            for entry in self.stack:
+                entry[1] -= keep_from
+            pos -= keep_from
+        self.pos = pos
+        return completed
+
+def parse_flat_objects(text: str) -> List[dict]:
+    """ Every complete flat object in a (possibly truncated or malformed) response. """
+    return FlatObjectParser().feed(text)
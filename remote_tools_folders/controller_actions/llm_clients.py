@@ -0,0 +1,171 @@
+"""
+Shared async LLM clients for the controller actions.
+
+The vision actions used to build a synchronous anthropic.Anthropic client on every call and
+run `messages.create` inside the async action, blocking the event loop - and every other
+browser session in the process - for the whole 10-40s call. This module keeps one
+AsyncAnthropic client (one pooled HTTP connection pool) per event loop and limits how many
+calls run at once per provider, so several agents in one process share the connections and
+queue politely instead of stalling each other.
+
+Usage:
+    message = await create_anthropic_message(model=..., max_tokens=..., messages=...)
+
+    async with stream_anthropic_message(model=..., max_tokens=..., messages=...) as stream:
+        async for text in stream.text_stream:
+            ...
+
+    async with provider_slot("gemini"):
+        response = await asyncio.to_thread(generate, ...)
+"""
+
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+import weakref
+
+import anthropic
+import httpx
+
+# Maximum concurrent calls per provider (override with <PROVIDER>_MAX_CONCURRENCY)
+DEFAULT_PROVIDER_CONCURRENCY = {
+    "anthropic": 4,
+    "gemini": 2,
+}
+
+# Pooled HTTP connections of the Anthropic client
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+REQUEST_TIMEOUT_S = 120.0
+
+# Prompt caching breakpoint: everything up to and including the marked block is cached by the provider
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Clients and semaphores are bound to the event loop they were created on
+_anthropic_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+# Prompt cache usage of the Anthropic calls made by this process
+_prompt_cache_totals = {"calls": 0, "hits": 0, "misses": 0, "read_tokens": 0, "written_tokens": 0, "input_tokens": 0}
+
+def provider_concurrency(provider: str) -> int:
+    """ Concurrency limit of a provider. """
+    env_value = os.environ.get(f"{provider.upper()}_MAX_CONCURRENCY")
+    if env_value and env_value.isdigit() and int(env_value) > 0:
+        return int(env_value)
+    return DEFAULT_PROVIDER_CONCURRENCY.get(provider, 2)
+
+def _provider_semaphore(provider: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphores: Dict[str, asyncio.Semaphore] = _semaphores.setdefault(loop, {})
+    if provider not in semaphores:
+        semaphores[provider] = asyncio.Semaphore(provider_concurrency(provider))
+    return semaphores[provider]
+
+@asynccontextmanager
+async def provider_slot(provider: str):
+    """
+    Hold one of the concurrent call slots of a provider.
+
+    Args:
+        provider: Provider name (e.g. "anthropic", "gemini")
+    """
+    async with _provider_semaphore(provider):
+        yield
+
+def get_anthropic_client(api_key: Optional[str] = None) -> anthropic.AsyncAnthropic:
+    """
+    Shared AsyncAnthropic client of the running event loop.
+
+    Args:
+        api_key: API key (defaults to ANTHROPIC_API_KEY); a different key gets its own client
+
+    Returns:
+        AsyncAnthropic client with a pooled HTTP connection
+    """
+    api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
+    loop = asyncio.get_running_loop()
+    clients: Dict[Optional[str], anthropic.AsyncAnthropic] = _anthropic_clients.setdefault(loop, {})
+    client = clients.get(api_key)
+    if client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS),
+            timeout=REQUEST_TIMEOUT_S,
+        )
+        client = anthropic.AsyncAnthropic(api_key=api_key, http_client=http_client)
+        clients[api_key] = client
+    return client
+
+async def create_anthropic_message(api_key: Optional[str] = None, logger: Optional[logging.Logger] = None, **kwargs):
+    """
+    Await `messages.create` on the shared client, within the Anthropic concurrency limit.
+
+    Args:
+        api_key: Optional API key (defaults to ANTHROPIC_API_KEY)
+        logger: Optional logger
+        **kwargs: Arguments of `messages.create`
+
+    Returns:
+        The Anthropic Message
+    """
+    semaphore = _provider_semaphore("anthropic")
+    if logger and semaphore.locked():
+        logger.info(f"Waiting for a free Anthropic slot ({provider_concurrency('anthropic')} calls already running)")
+    async with semaphore:
+        return await get_anthropic_client(api_key).messages.create(**kwargs)
+
+@asynccontextmanager
+async def stream_anthropic_message(api_key: Optional[str] = None, logger: Optional[logging.Logger] = None, **kwargs):
+    """
+    Open a `messages.stream` on the shared client, holding an Anthropic slot until the stream is closed.
+
+    Args:
+        api_key: Optional API key (defaults to ANTHROPIC_API_KEY)
+        logger: Optional logger
+        **kwargs: Arguments of `messages.stream`
+
+    Yields:
+        The AsyncMessageStream (iterate `text_stream`, then `get_final_message()`)
+    """
+    semaphore = _provider_semaphore("anthropic")
+    if logger and semaphore.locked():
+        logger.info(f"Waiting for a free Anthropic slot ({provider_concurrency('anthropic')} calls already running)")
+    async with semaphore:
+        async with get_anthropic_client(api_key).messages.stream(**kwargs) as stream:
+            yield stream
+
+def prompt_cache_usage(message) -> Optional[dict]:
+    """
+    Prompt cache usage of one Messages API response, also added to the process totals.
+
+    Args:
+        message: Anthropic Message
+
+    Returns:
+        Dict with hit, read_tokens, written_tokens and input_tokens (uncached), or None if the
+        response reports no usage
+    """
+    usage = getattr(message, "usage", None)
+    if usage is None:
+        return None
+    read_tokens = getattr(usage, "cache_read_input_tokens", None) or 0
+    written_tokens = getattr(usage, "cache_creation_input_tokens", None) or 0
+    input_tokens = getattr(usage, "input_tokens", None) or 0
+    _prompt_cache_totals["calls"] += 1
+    _prompt_cache_totals["hits" if read_tokens else "misses"] += 1
+    _prompt_cache_totals["read_tokens"] += read_tokens
+    _prompt_cache_totals["written_tokens"] += written_tokens
+    _prompt_cache_totals["input_tokens"] += input_tokens
+    return {"hit": read_tokens > 0, "read_tokens": read_tokens, "written_tokens": written_tokens, "input_tokens": input_tokens}
+
+def prompt_cache_stats() -> dict:
+    """ Prompt cache hits, misses and token counts of the calls made by this process. """
+    return dict(_prompt_cache_totals)
+
+async def close_llm_clients():
+    """ Close the shared clients of the running event loop. """
+    clients = _anthropic_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
@@ -0,0 +1,228 @@
+"""
+Human-like mouse trajectory engine.
+
+compute_trajectory() produces the positions AND timestamps of a pointer move in one
+vectorized NumPy pass, using one of several models:
+
+- "minimum_jerk": the smooth bell-shaped velocity profile of human reaching movements
+  (Flash & Hogan), along a slightly curved path.
+- "bezier": a cubic Bezier path with randomized control points that overshoots the target
+  and finishes with a short corrective sub-movement.
+- "arc": the original parabolic arc with uniform 10-20ms steps.
+
+The movement duration follows Fitts' law (MT = a + b * log2(D / W + 1)), so long moves to
+small targets take longer than short moves to large ones. dispatch_trajectory() sends the
+points through the pipelined CDP stream in input_dispatch.py.
+"""
+
+from dataclasses import dataclass
+from typing import Literal, Optional, get_args
+import logging
+import math
+
+import numpy as np
+
+from .clock import get_clock
+from .input_dispatch import CDPInputStream
+
+TrajectoryModel = Literal["minimum_jerk", "bezier", "arc"]
+TRAJECTORY_MODELS = get_args(TrajectoryModel)
+
+# Fitts' law constants (milliseconds), typical values for mouse pointing
+FITTS_A_MS = 120.0
+FITTS_B_MS = 150.0
+DEFAULT_TARGET_WIDTH_PX = 20.0
+MIN_DURATION_MS = 80.0
+
+# Pointer sampling: real mice report at ~60-125Hz
+SAMPLE_INTERVAL_MS = (8.0, 16.0)
+
+# Bezier overshoot: fraction of the distance past the target, and share of the time spent correcting
+OVERSHOOT_FRACTION = (0.03, 0.08)
+CORRECTION_TIME_SHARE = 0.2
+
+@dataclass(frozen=True)
+class Trajectory:
+    """ Pointer positions with the time (ms since the start of the move) at which each is reached. """
+    x: np.ndarray      # float64
+    y: np.ndarray      # float64
+    t_ms: np.ndarray   # float64, starts at 0, non-decreasing
+    model: str
+    duration_ms: float
+
+    @property
+    def point_count(self) -> int:
+        return len(self.x)
+
+    def delays_ms(self) -> np.ndarray:
+        """ Delay after each point until the next one (0 after the last point). """
+        return np.append(np.diff(self.t_ms), 0.0)
+
+def fitts_duration_ms(distance: float, target_width: float = DEFAULT_TARGET_WIDTH_PX,
+                      a_ms: float = FITTS_A_MS, b_ms: float = FITTS_B_MS) -> float:
+    """
+    Movement time predicted by Fitts' law (Shannon formulation).
+
+    Args:
+        distance: Distance to the target center in pixels
+        target_width: Width of the target in pixels
+        a_ms: Intercept in milliseconds
+        b_ms: Slope in milliseconds per bit
+
+    Returns:
+        Movement duration in milliseconds
+    """
+    index_of_difficulty = math.log2(distance / max(target_width, 1.0) + 1.0)
+    return max(MIN_DURATION_MS, a_ms + b_ms * index_of_difficulty)
+
+def _sample_times(rng: np.random.Generator, duration_ms: float, min_points: int) -> np.ndarray:
+    """ Jittered sample times from 0 to duration_ms (inclusive) at the pointer reporting rate. """
+    expected = int(duration_ms / np.mean(SAMPLE_INTERVAL_MS)) + 1
+    count = max(min_points, expected, 2)
+    intervals = rng.uniform(*SAMPLE_INTERVAL_MS, size=count - 1)
+    t = np.concatenate(([0.0], np.cumsum(intervals)))
+    return t * (duration_ms / t[-1])
+
+def _minimum_jerk(tau: np.ndarray) -> np.ndarray:
+    """ Minimum-jerk progress s(tau) = 10 tau^3 - 15 tau^4 + 6 tau^5 for tau in [0, 1]. """
+    return tau ** 3 * (10 - 15 * tau + 6 * tau ** 2)
+
+def _perpendicular(dx: float, dy: float, distance: float):
+    """ Unit vector perpendicular to (dx, dy). """
+    if distance == 0:
+        return 0.0, 0.0
+    return -dy / distance, dx / distance
+
+def compute_trajectory(start_x: float, start_y: float, end_x: float, end_y: float,
+                       model: str = "minimum_jerk", min_points: int = 2,
+                       target_width: float = DEFAULT_TARGET_WIDTH_PX, duration_ms: Optional[float] = None,
+                       seed: Optional[int] = None, rng: Optional[np.random.Generator] = None) -> Trajectory:
+    """
+    Compute a human-like pointer trajectory with timestamps.
+
+    Args:
+        start_x: Starting X coordinate
+        start_y: Starting Y coordinate
+        end_x: Target X coordinate
+        end_y: Target Y coordinate
+        model: One of TRAJECTORY_MODELS
+        min_points: Minimum number of points (including start and end)
+        target_width: Target size in pixels used for the Fitts' law duration
+        duration_ms: Explicit duration (overrides Fitts' law)
+        seed: Seed for the random generator
+        rng: Optional generator to use instead of seeding a new one
+
+    Returns:
+        Trajectory ending exactly on (end_x, end_y)
+    """
+    if model not in TRAJECTORY_MODELS:
+        raise ValueError(f"Unknown trajectory model '{model}'. Available: {', '.join(TRAJECTORY_MODELS)}")
+    rng = rng if rng is not None else np.random.default_rng(seed)
+
+    dx, dy = end_x - start_x, end_y - start_y
+    distance = math.hypot(dx, dy)
+    if duration_ms is None:
+        duration_ms = fitts_duration_ms(distance, target_width)
+    px, py = _perpendicular(dx, dy, distance)
+
+    if model == "arc":
+        # Original parabolic arc: uniform steps, 10-20ms apart, +-1px noise
+        steps = max(min_points - 1, 1)
+        t = np.linspace(0.0, 1.0, steps + 1)
+        parabola = -4 * (t - 0.5) ** 2 + 1
+        x = start_x + dx * t + rng.uniform(-1, 1, size=t.shape)
+        y = start_y + dy * t - parabola * distance * 0.2 + rng.uniform(-1, 1, size=t.shape)
+        t_ms = np.concatenate(([0.0], np.cumsum(rng.integers(10, 21, size=steps)).astype(np.float64)))
+        duration_ms = float(t_ms[-1])
+
+    elif model == "minimum_jerk":
+        t_ms = _sample_times(rng, duration_ms, min_points)
+        s = _minimum_jerk(t_ms / duration_ms)
+        # Slight curvature: sideways bulge peaking mid-move, direction and size at random
+        bulge = rng.uniform(-0.08, 0.08) * distance * np.sin(np.pi * s)
+        x = start_x + dx * s + px * bulge
+        y = start_y + dy * s + py * bulge
+
+    else:  # "bezier"
+        t_ms = _sample_times(rng, duration_ms, min_points)
+        split = 1.0 - CORRECTION_TIME_SHARE
+        overshoot = rng.uniform(*OVERSHOOT_FRACTION) * distance
+        ux, uy = (dx / distance, dy / distance) if distance else (0.0, 0.0)
+        over_x, over_y = end_x + ux * overshoot, end_y + uy * overshoot
+
+        # Primary movement: cubic Bezier from the start to the overshoot point
+        c1 = rng.uniform(0.2, 0.4), rng.uniform(-0.25, 0.25)
+        c2 = rng.uniform(0.6, 0.85), rng.uniform(-0.15, 0.15)
+        p0 = np.array([start_x, start_y])
+        p3 = np.array([over_x, over_y])
+        p1 = p0 + np.array([dx, dy]) * c1[0] + np.array([px, py]) * distance * c1[1]
+        p2 = p0 + np.array([dx, dy]) * c2[0] + np.array([px, py]) * distance * c2[1]
+
+        tau = t_ms / duration_ms
+        primary = tau <= split
+        u = _minimum_jerk(np.clip(tau / split, 0.0, 1.0))[:, None]
+        curve = ((1 - u) ** 3) * p0 + 3 * ((1 - u) ** 2) * u * p1 + 3 * (1 - u) * (u ** 2) * p2 + (u ** 3) * p3
+
+        # Corrective sub-movement back onto the target
+        v = _minimum_jerk(np.clip((tau - split) / (1 - split), 0.0, 1.0))[:, None]
+        correction = p3 + (np.array([end_x, end_y]) - p3) * v
+        points = np.where(primary[:, None], curve, correction)
+        x, y = points[:, 0], points[:, 1]
+
+    # Always start and finish exactly on the requested points
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x[0], y[0] = start_x, start_y
+    x[-1], y[-1] = end_x, end_y
+    return Trajectory(x=x, y=y, t_ms=np.asarray(t_ms, dtype=np.float64), model=model, duration_ms=float(duration_ms))
+
+async def dispatch_trajectory(page, trajectory: Trajectory, logger: Optional[logging.Logger] = None, clock=None) -> dict:
+    """
+    Send a trajectory as pointer moves through the pipelined CDP stream.
+    Falls back to awaited page.mouse.move() calls when CDP is not available.
+
+    Args:
+        page: Playwright page
+        trajectory: Trajectory to follow (its first point is the current position and is not sent)
+        logger: Optional logger
+        clock: Optional clock (defaults to the current clock)
+
+    Returns:
+        Dictionary with dispatch statistics, including the "mode" used ("cdp" or "playwright")
+    """
+    clock = clock if clock is not None else get_clock()
+    xs = trajectory.x[1:].tolist()
+    ys = trajectory.y[1:].tolist()
+    delays = (trajectory.delays_ms()[1:] / 1000).tolist()
+    first_delay = float(trajectory.t_ms[1] - trajectory.t_ms[0]) / 1000 if trajectory.point_count > 1 else 0.0
+
+    stream = CDPInputStream(page, logger=logger, clock=clock)
+    if await stream.open():
+        try:
+            # A wait-only event first keeps the time to the first point in the schedule
+            events = [(None, first_delay)] + [
+                ({"type": "mouseMoved", "x": x, "y": y, "button": "none", "pointerType": "mouse"}, delay)
+                for x, y, delay in zip(xs, ys, delays)
+            ]
+            stats = await stream.dispatch(events)
+        finally:
+            await stream.close()
+        # Raw CDP moves bypass Playwright's own mouse state: sync it with the final position
+        await page.mouse.move(float(trajectory.x[-1]), float(trajectory.y[-1]))
+        stats["mode"] = "cdp"
+        return stats
+
+    start = clock.now()
+    await clock.sleep(first_delay, "input")
+    for x, y, delay in zip(xs, ys, delays):
+        await page.mouse.move(x, y)
+        if delay > 0:
+            await clock.sleep(delay, "input")
+    return {
+        "events": len(xs),
+        "batches": len(xs),
+        "acks_awaited": len(xs),
+        "scheduled_s": trajectory.duration_ms / 1000,
+        "elapsed_s": clock.now() - start,
+        "mode": "playwright",
+    }
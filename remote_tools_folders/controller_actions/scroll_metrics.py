@@ -0,0 +1,148 @@
+"""
+Scroll position metrics of the container under the mouse cursor.
+
+read_scroll_metrics() reads scrollTop/scrollHeight/clientHeight (and the horizontal
+equivalents) of the scrolled container together with the range of table rows currently
+visible in it, in a single page.evaluate round trip. perform_mouse_wheel reads them before
+and after a scroll to measure the achieved offset, correct undershoot and tell the agent
+whether the end of the table was reached.
+"""
+
+from typing import Optional, Tuple
+import logging
+
+# Remaining pixels below which a container counts as scrolled to the end
+END_TOLERANCE_PX = 2
+
+_SCROLL_METRICS_SCRIPT = """({ selector, x, y }) => {
+    const isScrollable = (el) => {
+        const style = getComputedStyle(el);
+        return /(auto|scroll|overlay)/.test(style.overflowY + style.overflowX)
+            && (el.scrollHeight > el.clientHeight || el.scrollWidth > el.clientWidth);
+    };
+    let container = selector ? document.querySelector(selector) : null;
+    if (container && !isScrollable(container)) {
+        // A grid selector usually points at a wrapper: use its scrollable descendant,
+        // otherwise the nearest scrollable ancestor (the scroller often wraps the grid)
+        let scroller = Array.from(container.querySelectorAll('*')).find(isScrollable);
+        for (let el = container.parentElement; !scroller && el && el !== document.body && el !== document.documentElement; el = el.parentElement) {
+            if (isScrollable(el)) scroller = el;
+        }
+        container = scroller || container;
+    }
+    if (!container && x !== null && y !== null) {
+        let el = document.elementFromPoint(x, y);
+        while (el && el !== document.body && el !== document.documentElement && !isScrollable(el)) el = el.parentElement;
+        container = el && el !== document.body && el !== document.documentElement ? el : null;
+    }
+    const isDocument = !container;
+    const scroller = container || document.scrollingElement || document.documentElement;
+    const rect = isDocument
+        ? { top: 0, bottom: window.innerHeight }
+        : container.getBoundingClientRect();
+
+    // Visible rows: ARIA grid rows first, plain table rows otherwise
+    const scope = container || document;
+    let rows = Array.from(scope.querySelectorAll('[role="row"]'));
+    if (!rows.length) rows = Array.from(scope.querySelectorAll('tr'));
+    const visible = [];
+    rows.forEach((row, i) => {
+        const r = row.getBoundingClientRect();
+        if (r.height > 0 && r.bottom > rect.top + 1 && r.top < rect.bottom - 1) {
+            const ariaIndex = parseInt(row.getAttribute('aria-rowindex'), 10);
+            visible.push({ index: Number.isNaN(ariaIndex) ? i + 1 : ariaIndex, height: r.height });
+        }
+    });
+    const heights = visible.map(v => v.height).sort((a, b) => a - b);
+
+    return {
+        container: isDocument ? 'document' : (container.tagName.toLowerCase()
+            + (container.id ? '#' + container.id : '')
+            + (container.getAttribute('role') ? '[role=' + container.getAttribute('role') + ']' : '')),
+        scrollable: isDocument || isScrollable(container),
+        scroll_top: scroller.scrollTop,
+        scroll_left: scroller.scrollLeft,
+        scroll_height: scroller.scrollHeight,
+        scroll_width: scroller.scrollWidth,
+        client_height: isDocument ? window.innerHeight : scroller.clientHeight,
+        client_width: isDocument ? window.innerWidth : scroller.clientWidth,
+        first_visible_row: visible.length ? visible[0].index : null,
+        last_visible_row: visible.length ? visible[visible.length - 1].index : null,
+        visible_row_count: visible.length,
+        row_height: heights.length ? heights[Math.floor(heights.length / 2)] : null,
+        aria_row_count: (() => {
+            const grid = scope.closest ? scope.closest('[aria-rowcount]') || scope.querySelector('[aria-rowcount]') : null;
+            const count = grid ? parseInt(grid.getAttribute('aria-rowcount'), 10) : NaN;
+            return Number.isNaN(count) ? null : count;
+        })(),
+    };
+}"""
+
+async def read_scroll_metrics(page, selector: Optional[str] = None, origin: Optional[Tuple[float, float]] = None,
+                              logger: Optional[logging.Logger] = None) -> Optional[dict]:
+    """
+    Read the scroll metrics of the container under the cursor (or matching selector).
+
+    Args:
+        page: Playwright page
+        selector: Optional CSS selector of the scrolled container
+        origin: Optional pointer position used to find the container when no selector is given
+        logger: Optional logger
+
+    Returns:
+        Dictionary of scroll metrics with remaining_y/remaining_x and at_end_y/at_start_y added
+        (scrollable is False when no scrolling element was found for the selector), or None when
+        the metrics could not be read
+    """
+    x, y = origin if origin is not None else (None, None)
+    try:
+        metrics = await page.evaluate(_SCROLL_METRICS_SCRIPT, {"selector": selector, "x": x, "y": y})
+    except Exception as e:
+        if logger:
+            logger.warning(f"Could not read scroll metrics: {str(e)}")
+        return None
+    if not metrics or "scroll_top" not in metrics:
+        return None
+
+    metrics["remaining_y"] = max(0, metrics["scroll_height"] - metrics["client_height"] - metrics["scroll_top"])
+    metrics["remaining_x"] = max(0, metrics["scroll_width"] - metrics["client_width"] - metrics["scroll_left"])
+    metrics["at_end_y"] = metrics["remaining_y"] <= END_TOLERANCE_PX
+    metrics["at_start_y"] = metrics["scroll_top"] <= END_TOLERANCE_PX
+    if logger:
+        logger.info(f"Scroll metrics of {metrics['container']}: top={metrics['scroll_top']}, height={metrics['scroll_height']}, "
+                    f"client={metrics['client_height']}, remaining={metrics['remaining_y']}, "
+                    f"rows {metrics['first_visible_row']}-{metrics['last_visible_row']}")
+    return metrics
+
+def summarize_scroll(before: Optional[dict], after: Optional[dict], requested_x: float, requested_y: float) -> dict:
+    """
+    Compare metrics from before and after a scroll.
+
+    Args:
+        before: Metrics read before the scroll (may be None)
+        after: Metrics read after the scroll (may be None)
+        requested_x: Requested horizontal delta
+        requested_y: Requested vertical delta
+
+    Returns:
+        Dictionary with achieved deltas, remaining pixels in the scroll direction, visible row range
+        and whether the end was reached (values are None when metrics are unavailable)
+    """
+    if not before or not after:
+        return {"achieved_delta_x": None, "achieved_delta_y": None, "remaining_px": None,
+                "visible_rows": None, "reached_end": None, "container": None}
+
+    moving_up = requested_y < 0
+    return {
+        "achieved_delta_x": after["scroll_left"] - before["scroll_left"],
+        "achieved_delta_y": after["scroll_top"] - before["scroll_top"],
+        "remaining_px": after["scroll_top"] if moving_up else after["remaining_y"],
+        "visible_rows": {
+            "first": after["first_visible_row"],
+            "last": after["last_visible_row"],
+            "count": after["visible_row_count"],
+            "total": after["aria_row_count"],
+        },
+        "reached_end": after["at_start_y"] if moving_up else after["at_end_y"],
+        "container": after["container"],
+    }
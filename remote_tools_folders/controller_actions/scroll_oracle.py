@@ -0,0 +1,102 @@
+"""
+Deterministic stop/continue decision for scrolling the audience table.
+
+check_condition_stop_page_wheel asks Claude to estimate how many table rows lie between the
+bottom edge of the scroll bar thumb and the bottom border of the table, and maps that count to
+a decision with fixed rules. The count follows directly from the grid's scroll metrics: the
+thumb-to-track-end distance is remaining_y * client_height / scroll_height pixels of the
+visible table, which divided by the rendered row height gives the rows the model estimates.
+scroll_decision() applies the same rules to that exact count, so the decision takes one
+page.evaluate and is the same every time; the vision model is only needed when the grid's
+scroll container cannot be read.
+
+The rules (from the stop-check prompt), by rows below the thumb:
+- 7 or more: CONTINUE 600px
+- 3 to 7: CONTINUE 500px
+- 1 to 3: CONTINUE 100px
+- 1 or less: STOP
+A CONTINUE delta is capped at the pixels actually left to scroll.
+"""
+
+from typing import Optional
+import logging
+
+from .scroll_metrics import read_scroll_metrics
+
+# Scroll container of the audience table (the grid wrapper resolves to its scrollable descendant)
+AUDIENCE_GRID_SELECTOR = '[role="grid"], [role="table"], table'
+
+# (minimum rows below the thumb, scroll delta in px), first match wins
+ROW_RULES = ((7.0, 600), (3.0, 500))
+# More rows than this (and fewer than the last rule) still scroll SMALL_SCROLL_PX; this many or fewer means STOP
+STOP_ROWS = 1.0
+SMALL_SCROLL_PX = 100
+
+def decide_from_rows(rows_left: float, remaining_px: Optional[float] = None) -> dict:
+    """
+    Apply the stop-check rules to the number of rows below the scroll bar thumb.
+
+    Args:
+        rows_left: Table rows between the bottom edge of the thumb and the bottom border of the table
+        remaining_px: Optional pixels left to scroll; caps the CONTINUE delta
+
+    Returns:
+        Dict with decision ("CONTINUE" or "STOP") and scroll_value (px, 0 for STOP)
+    """
+    if rows_left <= STOP_ROWS:
+        return {"decision": "STOP", "scroll_value": 0}
+    scroll_px = next((px for min_rows, px in ROW_RULES if rows_left >= min_rows), SMALL_SCROLL_PX)
+    if remaining_px is not None:
+        scroll_px = min(scroll_px, int(round(remaining_px)))
+    if scroll_px <= 0:
+        return {"decision": "STOP", "scroll_value": 0}
+    return {"decision": "CONTINUE", "scroll_value": scroll_px}
+
+async def scroll_decision(page, logger: Optional[logging.Logger] = None,
+                          selector: str = AUDIENCE_GRID_SELECTOR) -> Optional[dict]:
+    """
+    Decide from the DOM whether to keep scrolling the audience table.
+
+    Args:
+        page: Playwright page
+        logger: Optional logger
+        selector: CSS selector of the table's scroll container
+
+    Returns:
+        Dict with decision, scroll_value, reasoning and rows_left (the stop-check metadata shape),
+        or None when the container cannot be read, does not scroll or has no rendered rows
+    """
+    if page is None:
+        return None
+    metrics = await read_scroll_metrics(page, selector, None, logger)
+    if not metrics or metrics["container"] == "document":
+        if logger:
+            logger.info("Scroll oracle: audience grid scroll container not found")
+        return None
+    if not metrics.get("scrollable", True):
+        # Neither the grid, its descendants nor its ancestors scroll: remaining_y = 0 says nothing about the end
+        if logger:
+            logger.info(f"Scroll oracle: {metrics['container']} does not scroll, leaving the decision to the screenshot")
+        return None
+    row_height = metrics.get("row_height")
+    if not row_height or metrics["scroll_height"] <= 0:
+        if logger:
+            logger.info(f"Scroll oracle: no rendered rows in {metrics['container']}")
+        return None
+
+    remaining_px = metrics["remaining_y"]
+    thumb_gap_px = remaining_px * metrics["client_height"] / metrics["scroll_height"]
+    rows_left = thumb_gap_px / row_height
+    result = decide_from_rows(rows_left, remaining_px)
+    if metrics["at_end_y"]:
+        result = {"decision": "STOP", "scroll_value": 0}
+    result["rows_left"] = round(rows_left, 2)
+    result["reasoning"] = (
+        f"Scroll metrics of {metrics['container']}: {remaining_px}px of {metrics['scroll_height']}px left below the "
+        f"{metrics['client_height']}px view, so the scroll bar thumb ends {thumb_gap_px:.0f}px "
+        f"({rows_left:.2f} rows of {row_height}px) above the bottom border of the table. "
+        + (f"CONTINUE with {result['scroll_value']}px." if result["decision"] == "CONTINUE" else "STOP: the end of the table is reached.")
+    )
+    if logger:
+        logger.info(f"Scroll oracle: {result['reasoning']}")
+    return result
@@ -0,0 +1,455 @@
+"""
+Precompiled, vectorized scroll trajectory plans.
+
+compile_scroll_plan() generates the complete human-like wheel timeline of a scroll
+action in one pass with NumPy from a seeded generator: segment sizes, 1px wheel steps,
+micro-tremors, micro-bursts, medium pauses, long/cognitive pauses and cluster boundaries.
+The result is a ScrollPlan holding compact (dx, dy, delay_ms) arrays that the executor in
+action_mouse_wheel.py only has to walk. The sampled distributions match the original
+per-step random.random() implementation.
+"""
+
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Tuple
+import math
+
+import numpy as np
+
+# --- Timing constants based on real human scrolling data (milliseconds) ---
+BASE_DELAY_MS = (15.0, 18.0)
+MICRO_BURST_DELAY_MS = (7.0, 9.0)
+MICRO_BURST_CHANCE = 0.08
+MEDIUM_PAUSE_DELAY_MS = (24.0, 33.0)
+MEDIUM_PAUSE_THRESHOLD = (15, 25)  # Steps since the last medium pause must exceed a randint in this range
+MEDIUM_PAUSE_CHANCE = 0.3
+LONG_PAUSE_PERIOD = (30, 40)  # A long pause happens when step % randint(30, 40) == 0
+LONG_PAUSE_TYPES = ("medium", "long", "very_long", "cognitive")
+LONG_PAUSE_WEIGHTS = (0.4, 0.3, 0.2, 0.1)
+LONG_PAUSE_DELAY_MS = ((65.0, 85.0), (90.0, 120.0), (130.0, 160.0), (350.0, 450.0))
+CLUSTER_SIZE = (10, 20)
+CLUSTER_BOUNDARY_DELAY_MS = (80.0, 110.0)
+TREMOR_CHANCE = 0.02 * 0.5  # 2% chance of a tremor, which skips the moving axis' pixel half of the time
+INITIAL_DELAY_CHANCE = 0.7
+INITIAL_DELAY_MS = (2000.0, 2600.0)
+SEGMENT_PAUSE_MS = (200.0, 1200.0)
+
+# --- Time-budget compression limits ---
+MIN_PAUSE_SCALE = 0.1       # Pauses are shortened to no less than 10% before wheel steps are sped up
+MIN_STEP_DELAY_MS = 2.0     # Fastest allowed delay between two wheel events
+
+SPEED_PROFILE_TYPES = ("quick_start_slow_end", "gradual_accel_decel", "constant_with_bursts")
+
+def _medium_pause_gap_pmf(max_gap: int = 256) -> np.ndarray:
+    """
+    Probability mass of the number of steps between two medium pauses.
+
+    The per-step rule "steps_since_last_pause > randint(15, 25) and random() < 0.3" is a renewal
+    process with hazard h(k) = 0.3 * P(randint(15, 25) < k), so gaps can be drawn directly.
+    """
+    low, high = MEDIUM_PAUSE_THRESHOLD
+    k = np.arange(1, max_gap + 1)
+    hazard = MEDIUM_PAUSE_CHANCE * np.clip((k - low) / (high - low + 1), 0.0, 1.0)
+    survival = np.concatenate(([1.0], np.cumprod(1.0 - hazard)[:-1]))
+    pmf = survival * hazard
+    return pmf / pmf.sum()
+
+_MEDIUM_PAUSE_GAP_PMF = _medium_pause_gap_pmf()
+
+# --- Speed profile kernels ---
+
+def speed_profile_kernel(rng: np.random.Generator, steps: int = 100, profile_type: Optional[str] = None) -> np.ndarray:
+    """
+    Vectorized speed profile for natural scrolling acceleration/deceleration.
+
+    Args:
+        rng: NumPy random generator
+        steps: Number of intervals of the profile (returns steps + 1 factors)
+        profile_type: One of SPEED_PROFILE_TYPES, or None to pick one at random
+
+    Returns:
+        Array of speed factors (0.3 to 1.2) for time positions 0.0 to 1.0
+    """
+    t = np.linspace(0.0, 1.0, steps + 1)
+    if profile_type is None:
+        profile_type = SPEED_PROFILE_TYPES[rng.integers(len(SPEED_PROFILE_TYPES))]
+
+    if profile_type == "quick_start_slow_end":
+        # Fast acceleration, sustained middle, longer deceleration
+        factor = np.where(t < 0.2, 0.4 + (t / 0.2) * 0.6,
+                          np.where(t > 0.7, 1.0 - ((t - 0.7) / 0.3) * 0.6, 1.0))
+    elif profile_type == "gradual_accel_decel":
+        # Sinusoidal acceleration/deceleration (smoother)
+        factor = np.sin((t * math.pi) + math.pi / 2) * 0.5 + 0.5
+    elif profile_type == "constant_with_bursts":
+        # Mostly constant speed with speed bursts around fixed centers
+        factor = np.full_like(t, 0.7)
+        for burst_center in (0.3, 0.6, 0.8):
+            distance = np.abs(t - burst_center)
+            factor += np.where(distance < 0.1, 0.3 * (1 - (distance / 0.1)), 0.0)
+    else:
+        raise ValueError(f"Unknown speed profile type: {profile_type}")
+
+    # Small random noise, then keep the factor positive and reasonable
+    factor = factor * rng.uniform(0.95, 1.05, size=t.shape)
+    return np.clip(factor, 0.3, 1.2)
+
+def _human_data_kernel(rng: np.random.Generator, n: int) -> np.ndarray:
+    """ Recorded human timing as-is: no speed modulation. """
+    return np.ones(n)
+
+def _speed_profile_kernel(rng: np.random.Generator, n: int) -> np.ndarray:
+    """ Modulate the per-step speed along the segment with a randomly chosen speed profile. """
+    profile = speed_profile_kernel(rng)
+    index = np.minimum((np.arange(n) / max(n, 1) * len(profile)).astype(np.int64), len(profile) - 1)
+    return profile[index]
+
+# Selectable profile kernels: (rng, steps) -> speed factor per step (delay is divided by the factor)
+PROFILE_KERNELS: Dict[str, Callable[[np.random.Generator, int], np.ndarray]] = {
+    "human_data": _human_data_kernel,
+    "speed_profile": _speed_profile_kernel,
+}
+
+# --- Distance splitting ---
+
+def plan_segments(total_distance: int, rng: np.random.Generator, max_segments: int = 8) -> np.ndarray:
+    """
+    Break a total scroll distance into natural segments (vectorized create_segments).
+
+    Args:
+        total_distance: Total distance to scroll in pixels
+        rng: NumPy random generator
+        max_segments: Upper bound on the number of segments (default: 8)
+
+    Returns:
+        Array of non-zero segment sizes that sum to total_distance ([0] for no scroll)
+    """
+    total_distance = int(total_distance)
+    if abs(total_distance) <= 5:
+        return np.array([total_distance], dtype=np.int64)
+
+    sign = 1 if total_distance > 0 else -1
+    magnitude = abs(total_distance)
+    segment_count = min(max(3, min(8, magnitude // 100)), max_segments)
+    if segment_count <= 1:
+        return np.array([total_distance], dtype=np.int64)
+
+    # Bell-shaped segment weights; every segment but the last is sized from its weight
+    position = np.arange(segment_count - 1) / (segment_count - 1)
+    weight = np.sin(position * math.pi) * rng.uniform(0.8, 1.2, size=segment_count - 1)
+    sizes = np.maximum(1, np.trunc(np.abs(magnitude * weight / (segment_count - 0.5)))).astype(np.int64)
+
+    # Never overshoot: clip the running total, the last segment takes the remainder
+    covered = np.minimum(np.cumsum(sizes), magnitude)
+    sizes = np.diff(covered, prepend=0)
+    sizes = np.append(sizes, magnitude - covered[-1])
+    return sizes[sizes != 0] * sign
+
+def scroll_step_sizes(total_distance: float, steps_count: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Split a distance into variable-sized steps with a slow-fast-slow profile (vectorized generate_scroll_steps).
+
+    Args:
+        total_distance: Total distance to scroll
+        steps_count: Number of steps
+        rng: NumPy random generator
+
+    Returns:
+        Array of step sizes that sum to total_distance
+    """
+    if total_distance == 0:
+        return np.zeros(steps_count)
+    if steps_count > 1:
+        positions = np.arange(steps_count) / (steps_count - 1)
+    else:
+        positions = np.full(steps_count, 0.5)
+    weights = np.sin(positions * math.pi) * rng.uniform(0.9, 1.1, size=steps_count)
+    steps = np.trunc(total_distance * weights / weights.sum())
+    steps[-1] = total_distance - steps[:-1].sum()
+    return steps
+
+# --- Plan compilation ---
+
+def _renewal_positions(rng: np.random.Generator, n: int, draw_gaps: Callable[[int], np.ndarray], min_gap: int) -> np.ndarray:
+    """ 1-based step indices of a renewal process over n steps, with gaps drawn by draw_gaps(size). """
+    positions = np.cumsum(draw_gaps(n // max(min_gap, 1) + 2))
+    return positions[positions <= n]
+
+def _compile_segment_steps(segment_x: int, segment_y: int, rng: np.random.Generator,
+                           kernel: Callable[[np.random.Generator, int], np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized 1px wheel steps and per-step delays for one segment.
+
+    Returns:
+        Tuple of (dx, dy, delay_ms) arrays
+    """
+    nx, ny = abs(int(segment_x)), abs(int(segment_y))
+    n = nx + ny
+    if n == 0:
+        return np.zeros(0, np.int8), np.zeros(0, np.int8), np.zeros(0, np.float32)
+
+    # Axis per step: choosing X with probability x_remaining / total_remaining is a uniform shuffle
+    is_x = np.zeros(n, dtype=bool)
+    is_x[:nx] = True
+    rng.shuffle(is_x)
+
+    # Occasional micro-tremor (hand instability) skips the pixel of the moving axis
+    moved = rng.random(n) >= TREMOR_CHANCE
+    dx = np.where(is_x & moved, int(np.sign(segment_x)), 0).astype(np.int8)
+    dy = np.where(~is_x & moved, int(np.sign(segment_y)), 0).astype(np.int8)
+
+    # 1. Base delay, modulated by the selected profile kernel
+    delay = rng.uniform(*BASE_DELAY_MS, size=n)
+    # 2. Micro-bursts
+    burst = rng.random(n) < MICRO_BURST_CHANCE
+    delay = np.where(burst, rng.uniform(*MICRO_BURST_DELAY_MS, size=n), delay)
+    delay = delay / kernel(rng, n)
+
+    step = np.arange(1, n + 1)
+
+    # 3. Medium pauses (renewal process, see _medium_pause_gap_pmf)
+    medium = _renewal_positions(
+        rng, n,
+        lambda size: rng.choice(len(_MEDIUM_PAUSE_GAP_PMF), size=size, p=_MEDIUM_PAUSE_GAP_PMF) + 1,
+        MEDIUM_PAUSE_THRESHOLD[0],
+    )
+    delay[medium - 1] = rng.uniform(*MEDIUM_PAUSE_DELAY_MS, size=len(medium))
+
+    # 4. Longer pauses when step % randint(30, 40) == 0
+    period = rng.integers(LONG_PAUSE_PERIOD[0], LONG_PAUSE_PERIOD[1] + 1, size=n)
+    long_index = np.flatnonzero(step % period == 0)
+    if len(long_index):
+        pause_type = rng.choice(len(LONG_PAUSE_TYPES), size=len(long_index), p=LONG_PAUSE_WEIGHTS)
+        bounds = np.asarray(LONG_PAUSE_DELAY_MS)[pause_type]
+        delay[long_index] = rng.uniform(bounds[:, 0], bounds[:, 1])
+
+    # 5. Cluster boundaries override everything else
+    cluster_ends = _renewal_positions(
+        rng, n,
+        lambda size: rng.integers(CLUSTER_SIZE[0], CLUSTER_SIZE[1] + 1, size=size),
+        CLUSTER_SIZE[0],
+    )
+    delay[cluster_ends - 1] = rng.uniform(*CLUSTER_BOUNDARY_DELAY_MS, size=len(cluster_ends))
+
+    return dx, dy, delay.astype(np.float32)
+
+@dataclass(frozen=True)
+class ScrollPlan:
+    """
+    Compiled scroll timeline.
+
+    Steps of all segments are stored back to back; segment i spans
+    dx/dy/delay_ms[segment_offsets[i]:segment_offsets[i + 1]]. Each segment may be preceded
+    by an initial delay (0 when none) and is followed by a pause.
+    """
+    dx: np.ndarray                 # int8, wheel delta X per step
+    dy: np.ndarray                 # int8, wheel delta Y per step
+    delay_ms: np.ndarray           # float32, delay after each step
+    segment_offsets: np.ndarray    # int64, len = segment_count + 1
+    segments_x: np.ndarray         # int64, requested X pixels per segment
+    segments_y: np.ndarray         # int64, requested Y pixels per segment
+    initial_delay_ms: np.ndarray   # float32, delay before each segment
+    segment_pause_ms: np.ndarray   # float32, pause after each segment
+    profile: str = "human_data"
+    seed: Optional[int] = None
+    metadata: dict = field(default_factory=dict)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self.segments_x)
+
+    @property
+    def step_count(self) -> int:
+        return len(self.dx)
+
+    @property
+    def total_duration_ms(self) -> float:
+        """ Planned wall-clock duration of the whole scroll (wheel steps + initial delays + pauses). """
+        return float(self.delay_ms.sum(dtype=np.float64) + self.initial_delay_ms.sum(dtype=np.float64)
+                     + self.segment_pause_ms.sum(dtype=np.float64))
+
+    def segment(self, index: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ (dx, dy, delay_ms) views of one segment. """
+        start, end = self.segment_offsets[index], self.segment_offsets[index + 1]
+        return self.dx[start:end], self.dy[start:end], self.delay_ms[start:end]
+
+    def as_array(self) -> np.ndarray:
+        """ Compact (step_count, 3) float32 array of (dx, dy, delay_ms). """
+        return np.column_stack((self.dx, self.dy, self.delay_ms)).astype(np.float32)
+
+    def summary(self) -> dict:
+        """ Small JSON-serializable description of the plan for logs and results. """
+        return {
+            "profile": self.profile,
+            "seed": self.seed,
+            "segments_x": self.segments_x.tolist(),
+            "segments_y": self.segments_y.tolist(),
+            "steps": self.step_count,
+            "scrolled_x": int(self.dx.sum(dtype=np.int64)),
+            "scrolled_y": int(self.dy.sum(dtype=np.int64)),
+            "planned_duration_ms": round(self.total_duration_ms, 1),
+            **self.metadata,
+        }
+
+def fit_plan_to_budget(plan: ScrollPlan, max_duration_ms: float) -> ScrollPlan:
+    """
+    Compress a plan so that it finishes within a time budget while keeping its human-like shape.
+
+    Compression is applied in stages, each only as far as needed:
+    1. Pauses (initial delays, pauses between segments and the part of in-step medium/long/cluster
+       pauses above the base delay) are scaled down together, to no less than MIN_PAUSE_SCALE.
+    2. The base wheel-step delays are scaled down uniformly, to no less than MIN_STEP_DELAY_MS.
+    3. Consecutive 1px steps are merged into multi-pixel wheel events (keeping the delay of the
+       last step of each group), which reduces the number of events.
+
+    Args:
+        plan: Compiled scroll plan
+        max_duration_ms: Time budget for the whole plan in milliseconds
+
+    Returns:
+        New ScrollPlan whose metadata records the budget and the compression that was applied
+    """
+    budget = max(0.0, float(max_duration_ms))
+    compression = {"pause_scale": 1.0, "step_scale": 1.0, "merge_factor": 1}
+    if plan.total_duration_ms <= budget:
+        return replace(plan, metadata={**plan.metadata, "max_duration_ms": budget, "budget_met": True,
+                                       "compression": compression})
+
+    delay = plan.delay_ms.astype(np.float64)
+    base = np.minimum(delay, BASE_DELAY_MS[1])
+    excess = delay - base
+    segment_pauses = plan.initial_delay_ms.sum(dtype=np.float64) + plan.segment_pause_ms.sum(dtype=np.float64)
+    pause_total = segment_pauses + excess.sum()
+    step_total = base.sum()
+
+    # 1. Shorten pauses
+    pause_scale = MIN_PAUSE_SCALE
+    if pause_total > 0 and step_total + MIN_PAUSE_SCALE * pause_total <= budget:
+        pause_scale = (budget - step_total) / pause_total
+    available = budget - pause_scale * pause_total
+
+    # 2. Speed up the wheel steps, down to the fastest allowed rhythm
+    min_base = base.min() if len(base) else 0.0
+    floor_scale = min(1.0, MIN_STEP_DELAY_MS / min_base) if min_base > 0 else 1.0
+    step_scale = 1.0
+    if step_total > available:
+        step_scale = max(floor_scale, available / step_total if step_total > 0 else 1.0)
+
+    # 3. Still too long: pauses may take at most a quarter of the budget, the rest is
+    #    reached by merging steps (see below)
+    merge_needed = step_total * step_scale > available + 1e-9
+    if merge_needed and pause_total > 0:
+        pause_scale = min(pause_scale, 0.25 * budget / pause_total)
+        available = budget - pause_scale * pause_total
+
+    dx, dy = plan.dx, plan.dy
+    offsets = plan.segment_offsets
+    new_delay = base * step_scale + excess * pause_scale
+    merge_factor = 1
+
+    # Merge steps when even the fastest wheel rhythm does not fit
+    if merge_needed and len(dx):
+        longest_segment = int(np.diff(offsets).max())
+        if available > 0:
+            merge_factor = min(longest_segment, int(math.ceil(step_total * step_scale / available)))
+        else:
+            merge_factor = longest_segment
+        merged_dx, merged_dy, merged_delay, merged_offsets = [], [], [], [0]
+        for i in range(plan.segment_count):
+            start, end = offsets[i], offsets[i + 1]
+            if end == start:
+                merged_offsets.append(merged_offsets[-1])
+                continue
+            group_starts = np.arange(start, end, merge_factor)
+            group_ends = np.minimum(group_starts + merge_factor, end) - 1
+            merged_dx.append(np.add.reduceat(dx[start:end].astype(np.int16), group_starts - start))
+            merged_dy.append(np.add.reduceat(dy[start:end].astype(np.int16), group_starts - start))
+            merged_delay.append(new_delay[group_ends])
+            merged_offsets.append(merged_offsets[-1] + len(group_starts))
+        dx = np.concatenate(merged_dx)
+        dy = np.concatenate(merged_dy)
+        new_delay = np.concatenate(merged_delay)
+        offsets = np.asarray(merged_offsets, dtype=np.int64)
+
+    compression = {"pause_scale": round(float(pause_scale), 4), "step_scale": round(float(step_scale), 4),
+                   "merge_factor": merge_factor}
+    fitted = replace(
+        plan,
+        dx=dx,
+        dy=dy,
+        delay_ms=new_delay.astype(np.float32),
+        segment_offsets=offsets,
+        initial_delay_ms=(plan.initial_delay_ms * pause_scale).astype(np.float32),
+        segment_pause_ms=(plan.segment_pause_ms * pause_scale).astype(np.float32),
+    )
+    return replace(fitted, metadata={**plan.metadata, "max_duration_ms": budget,
+                                     "budget_met": fitted.total_duration_ms <= budget + 1.0,
+                                     "compression": compression})
+
+def compile_scroll_plan(delta_x: float, delta_y: float, seed: Optional[int] = None,
+                        profile: str = "human_data", rng: Optional[np.random.Generator] = None,
+                        max_duration_ms: Optional[float] = None) -> ScrollPlan:
+    """
+    Compile the complete human-like timeline of a scroll action.
+
+    With a time budget, fewer segments are planned first (each segment brings an initial delay
+    and a pause), then the plan is compressed with fit_plan_to_budget().
+
+    Args:
+        delta_x: Pixels to scroll horizontally
+        delta_y: Pixels to scroll vertically
+        seed: Seed for the random generator (None for a fresh random plan)
+        profile: Name of the speed profile kernel (see PROFILE_KERNELS)
+        rng: Optional generator to use instead of seeding a new one
+        max_duration_ms: Optional time budget for the whole plan in milliseconds
+
+    Returns:
+        ScrollPlan with per-step (dx, dy, delay_ms) arrays and per-segment delays
+    """
+    if profile not in PROFILE_KERNELS:
+        raise ValueError(f"Unknown scroll profile '{profile}'. Available: {', '.join(PROFILE_KERNELS)}")
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    if max_duration_ms is None:
+        return _compile_plan(delta_x, delta_y, rng, profile, seed, max_segments=8)
+
+    # Keep as many segments as possible while pauses keep at least half of their length;
+    # every dropped segment removes an initial delay and a pause between segments
+    fitted = None
+    for max_segments in range(8, 0, -1):
+        fitted = fit_plan_to_budget(_compile_plan(delta_x, delta_y, rng, profile, seed, max_segments=max_segments),
+                                    max_duration_ms)
+        if fitted.metadata["compression"]["pause_scale"] >= 0.5:
+            break
+    return fitted
+
+def _compile_plan(delta_x: float, delta_y: float, rng: np.random.Generator, profile: str,
+                  seed: Optional[int], max_segments: int) -> ScrollPlan:
+    """ Compile one plan with at most max_segments segments per axis. """
+    kernel = PROFILE_KERNELS[profile]
+    segments_x = plan_segments(int(delta_x), rng, max_segments)
+    segments_y = plan_segments(int(delta_y), rng, max_segments)
+    segment_count = max(len(segments_x), len(segments_y))
+    segments_x = np.pad(segments_x, (0, segment_count - len(segments_x)))
+    segments_y = np.pad(segments_y, (0, segment_count - len(segments_y)))
+
+    compiled: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = [
+        _compile_segment_steps(seg_x, seg_y, rng, kernel) for seg_x, seg_y in zip(segments_x, segments_y)
+    ]
+    lengths = np.array([len(c[0]) for c in compiled], dtype=np.int64)
+
+    # Initial delay (70% chance) before every non-empty segment, pause after every segment
+    has_initial = (rng.random(segment_count) < INITIAL_DELAY_CHANCE) & (lengths > 0)
+    initial_delay_ms = np.where(has_initial, rng.uniform(*INITIAL_DELAY_MS, size=segment_count), 0.0)
+    segment_pause_ms = rng.uniform(*SEGMENT_PAUSE_MS, size=segment_count)
+
+    return ScrollPlan(
+        dx=np.concatenate([c[0] for c in compiled]),
+        dy=np.concatenate([c[1] for c in compiled]),
+        delay_ms=np.concatenate([c[2] for c in compiled]),
+        segment_offsets=np.concatenate(([0], np.cumsum(lengths))),
+        segments_x=segments_x,
+        segments_y=segments_y,
+        initial_delay_ms=initial_delay_ms.astype(np.float32),
+        segment_pause_ms=segment_pause_ms.astype(np.float32),
+        profile=profile,
+        seed=seed,
+    )
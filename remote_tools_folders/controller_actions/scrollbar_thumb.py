@@ -0,0 +1,164 @@
+"""
+Pixel-based scroll bar thumb detector for the audience table.
+
+When the grid's scroll metrics cannot be read (see scroll_oracle.py) the stop check still has the
+screenshot, and the quantity the vision prompt asks for - table rows between the bottom edge of
+the scroll bar thumb and the bottom border of the table - can be measured in it directly:
+- the header line, bottom border and row height of the table come from table_geometry.segment_table();
+- the thumb is the narrow, long, gray vertical bar at the right edge of the table body, found with
+  vectorized run lengths over the right-hand strip of the table.
+The thumb-to-border distance divided by the row height gives the row count, and
+scroll_oracle.decide_from_rows() maps it to the same CONTINUE/STOP decision, locally and in milliseconds.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+import logging
+
+import numpy as np
+
+from .scroll_oracle import decide_from_rows
+from .table_geometry import TableGeometry, segment_table, to_gray
+
+# Thumb pixels: mid gray, darker than the row separators (~217) and lighter than text
+THUMB_MIN_GRAY = 150
+THUMB_MAX_GRAY = 212
+# Thumb width in screenshot pixels and minimum length as a share of the table body height
+THUMB_MIN_WIDTH_PX = 4
+THUMB_MAX_WIDTH_PX = 40
+THUMB_MIN_LENGTH_SHARE = 0.05
+# The thumb is searched in this right-hand share of the table width
+THUMB_SEARCH_SHARE = 0.06
+# Columns of one thumb end within this many pixels of each other
+THUMB_EDGE_TOLERANCE_PX = 4
+
+@dataclass(frozen=True)
+class ScrollbarThumb:
+    """ Scroll bar thumb and its track in screenshot pixels. """
+    left: int
+    right: int
+    top: int
+    bottom: int
+    track_top: int  # Line under the column header
+    track_bottom: int  # Bottom border of the table
+    row_height: float
+
+    @property
+    def gap_px(self) -> int:
+        """ Distance between the bottom edge of the thumb and the bottom border of the table. """
+        return max(0, self.track_bottom - self.bottom)
+
+    @property
+    def rows_left(self) -> float:
+        return self.gap_px / self.row_height
+
+    @property
+    def remaining_fraction(self) -> float:
+        """ Share of the scroll range still below the current position (0 at the end). """
+        travel = (self.track_bottom - self.track_top) - (self.bottom - self.top)
+        return min(1.0, self.gap_px / travel) if travel > 0 else 0.0
+
+def _longest_runs(mask: np.ndarray):
+    """
+    Longest vertical run of True per column.
+
+    Returns:
+        Tuple of (length, start row) arrays, one entry per column
+    """
+    padded = np.pad(mask.T.astype(np.int8), ((0, 0), (1, 1)))
+    edges = np.diff(padded, axis=1)
+    start_cols, start_rows = np.nonzero(edges == 1)
+    _, end_rows = np.nonzero(edges == -1)
+    lengths = np.zeros(mask.shape[1], dtype=np.int64)
+    starts = np.zeros(mask.shape[1], dtype=np.int64)
+    if start_cols.size == 0:
+        return lengths, starts
+    run_lengths = end_rows - start_rows
+    # Sort by column, then by length, so the last run of every column is its longest
+    order = np.lexsort((run_lengths, start_cols))
+    last = np.append(start_cols[order][1:] != start_cols[order][:-1], True)
+    columns = start_cols[order][last]
+    lengths[columns] = run_lengths[order][last]
+    starts[columns] = start_rows[order][last]
+    return lengths, starts
+
+def detect_scrollbar_thumb(image, geometry: Optional[TableGeometry] = None) -> Optional[ScrollbarThumb]:
+    """
+    Find the vertical scroll bar thumb of the audience table in a screenshot.
+
+    Args:
+        image: PIL image or HxW(xC) array
+        geometry: Optional table geometry of the screenshot (segmented when omitted)
+
+    Returns:
+        ScrollbarThumb, or None when no table or no thumb is visible (e.g. all rows fit)
+    """
+    gray = to_gray(image)
+    if geometry is None:
+        geometry = segment_table(gray)
+    if geometry is None:
+        return None
+    track_top, track_bottom = geometry.header_bottom, geometry.bottom
+    if track_bottom - track_top < 2 * geometry.row_height:
+        return None
+
+    width = geometry.right - geometry.left
+    x0 = max(geometry.left, geometry.right - max(THUMB_MAX_WIDTH_PX * 2, int(width * THUMB_SEARCH_SHARE)))
+    strip = gray[track_top:track_bottom, x0:geometry.right]
+    lengths, starts = _longest_runs((strip >= THUMB_MIN_GRAY) & (strip <= THUMB_MAX_GRAY))
+    long_enough = lengths >= max(THUMB_MIN_LENGTH_SHARE * strip.shape[0], 2 * THUMB_MIN_WIDTH_PX)
+
+    # Groups of adjacent columns whose runs start and end together; the rightmost narrow one is the thumb
+    candidates = []
+    column = 0
+    while column < long_enough.size:
+        if not long_enough[column]:
+            column += 1
+            continue
+        first = column
+        top, bottom = starts[column], starts[column] + lengths[column]
+        while (column + 1 < long_enough.size and long_enough[column + 1]
+               and abs(starts[column + 1] - top) <= THUMB_EDGE_TOLERANCE_PX
+               and abs(starts[column + 1] + lengths[column + 1] - bottom) <= THUMB_EDGE_TOLERANCE_PX):
+            column += 1
+        if THUMB_MIN_WIDTH_PX <= column - first + 1 <= THUMB_MAX_WIDTH_PX:
+            candidates.append((first, column))
+        column += 1
+    if not candidates:
+        return None
+    first, last = candidates[-1]
+    run_tops = starts[first:last + 1]
+    run_bottoms = run_tops + lengths[first:last + 1]
+    return ScrollbarThumb(left=x0 + first, right=x0 + last + 1,
+                          top=track_top + int(run_tops.min()), bottom=track_top + int(run_bottoms.max()),
+                          track_top=track_top, track_bottom=track_bottom, row_height=geometry.row_height)
+
+def thumb_decision(image, logger: Optional[logging.Logger] = None) -> Optional[dict]:
+    """
+    Decide from a screenshot whether to keep scrolling the audience table.
+
+    Args:
+        image: PIL image or HxW(xC) array of the screenshot
+        logger: Optional logger
+
+    Returns:
+        Dict with decision, scroll_value, rows_left, remaining_fraction and reasoning
+        (the stop-check metadata shape), or None when the thumb is not found
+    """
+    thumb = detect_scrollbar_thumb(image)
+    if thumb is None:
+        if logger:
+            logger.info("Scrollbar thumb detector: no table scroll bar found in the screenshot")
+        return None
+    result = decide_from_rows(thumb.rows_left)
+    result["rows_left"] = round(thumb.rows_left, 2)
+    result["remaining_fraction"] = round(thumb.remaining_fraction, 3)
+    result["reasoning"] = (
+        f"Scroll bar thumb at x {thumb.left}-{thumb.right}, y {thumb.top}-{thumb.bottom} on a track ending at the "
+        f"table's bottom border (y {thumb.track_bottom}): {thumb.gap_px}px ({thumb.rows_left:.2f} rows of "
+        f"{thumb.row_height:.0f}px) below the thumb, {thumb.remaining_fraction:.0%} of the scroll range left. "
+        + (f"CONTINUE with {result['scroll_value']}px." if result["decision"] == "CONTINUE" else "STOP: the end of the table is reached.")
+    )
+    if logger:
+        logger.info(f"Scrollbar thumb detector: {result['reasoning']}")
+    return result
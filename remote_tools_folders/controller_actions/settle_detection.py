@@ -0,0 +1,119 @@
+"""
+Settle detection for scrolled containers.
+
+Ads Manager polls in the background, so page.wait_for_load_state('networkidle') almost
+never resolves after a scroll. wait_for_settle() instead injects a MutationObserver and a
+ResizeObserver scoped to the scrolled container (e.g. the audience table grid) and resolves
+as soon as no DOM change has happened there for a quiet window.
+"""
+
+from typing import Optional, Tuple
+import logging
+
+DEFAULT_QUIET_MS = 300
+DEFAULT_SETTLE_TIMEOUT_MS = 3000
+
+# Runs in the page. Resolves with {settled, duration_ms, mutations, resizes, target}.
+# The container is the element matching `selector`, or else the nearest scrollable ancestor of
+# the element under the pointer, or else the document.
+_SETTLE_SCRIPT = """async ({ selector, x, y, quietMs, timeoutMs }) => {
+    const isScrollable = (el) => {
+        const style = getComputedStyle(el);
+        return /(auto|scroll|overlay)/.test(style.overflowY + style.overflowX)
+            && (el.scrollHeight > el.clientHeight || el.scrollWidth > el.clientWidth);
+    };
+    let target = selector ? document.querySelector(selector) : null;
+    if (!target && x !== null && y !== null) {
+        let el = document.elementFromPoint(x, y);
+        while (el && el !== document.body && !isScrollable(el)) el = el.parentElement;
+        target = el && el !== document.body ? el : null;
+    }
+    const describe = (el) => el ? (el.tagName.toLowerCase()
+        + (el.id ? '#' + el.id : '')
+        + (el.getAttribute('role') ? '[role=' + el.getAttribute('role') + ']' : '')) : 'document';
+    const root = target || document.documentElement;
+
+    const start = performance.now();
+    let mutations = 0;
+    let resizes = 0;
+    return await new Promise((resolve) => {
+        let quietTimer = null;
+        let mutationObserver = null;
+        let resizeObserver = null;
+        const finish = (settled) => {
+            clearTimeout(quietTimer);
+            clearTimeout(deadline);
+            if (mutationObserver) mutationObserver.disconnect();
+            if (resizeObserver) resizeObserver.disconnect();
+            resolve({
+                settled,
+                duration_ms: Math.round(performance.now() - start),
+                mutations,
+                resizes,
+                target: describe(target),
+            });
+        };
+        const restartQuietWindow = () => {
+            clearTimeout(quietTimer);
+            quietTimer = setTimeout(() => finish(true), quietMs);
+        };
+        const deadline = setTimeout(() => finish(false), timeoutMs);
+
+        mutationObserver = new MutationObserver((records) => {
+            mutations += records.length;
+            restartQuietWindow();
+        });
+        mutationObserver.observe(root, { childList: true, subtree: true, attributes: true, characterData: true });
+
+        if (typeof ResizeObserver !== 'undefined') {
+            let initial = true;
+            resizeObserver = new ResizeObserver(() => {
+                // The first callback only reports the current size
+                if (initial) { initial = false; return; }
+                resizes += 1;
+                restartQuietWindow();
+            });
+            resizeObserver.observe(root);
+        }
+        restartQuietWindow();
+    });
+}"""
+
+async def wait_for_settle(page, selector: Optional[str] = None, origin: Optional[Tuple[float, float]] = None,
+                          quiet_ms: int = DEFAULT_QUIET_MS, timeout_ms: int = DEFAULT_SETTLE_TIMEOUT_MS,
+                          logger: Optional[logging.Logger] = None) -> dict:
+    """
+    Wait until the scrolled container stops changing.
+
+    Args:
+        page: Playwright page
+        selector: Optional CSS selector of the container to observe (e.g. '[role="grid"]')
+        origin: Optional pointer position used to find the scrolled container when no selector is given
+        quiet_ms: How long the container must stay unchanged to count as settled
+        timeout_ms: Maximum time to wait
+        logger: Optional logger
+
+    Returns:
+        Dictionary with settled (bool), duration_ms, mutations, resizes and the observed target
+    """
+    x, y = origin if origin is not None else (None, None)
+    try:
+        result = await page.evaluate(_SETTLE_SCRIPT, {
+            "selector": selector,
+            "x": x,
+            "y": y,
+            "quietMs": quiet_ms,
+            "timeoutMs": max(0, timeout_ms),
+        })
+    except Exception as e:
+        # Navigation during the wait destroys the execution context - report it as not settled
+        if logger:
+            logger.warning(f"Settle detection failed (continuing): {str(e)}")
+        return {"settled": False, "duration_ms": None, "mutations": None, "resizes": None, "target": None,
+                "error": str(e)}
+
+    if logger:
+        state = "settled" if result.get("settled") else "did not settle"
+        logger.info(f"Container {result.get('target')} {state} after {result.get('duration_ms')}ms "
+                    f"({result.get('mutations')} mutations, {result.get('resizes')} resizes, quiet window {quiet_ms}ms)")
+    return result
@@ -0,0 +1,172 @@
+"""
+Row-boundary segmentation of audience-table screenshots.
+
+The stop-check prompt and the vision extraction both leave it to the model to count rows (the
+prompt assumes a 50px row height). segment_table() measures the table instead, from two
+vectorized projection profiles of the brightness steps between pixel rows, taken over the table's
+columns:
+- separators: pixel rows where the steps span a large share of the width (the thin row borders);
+- ink: pixel rows with some steps (row text) - rows always carry text, the space below the table does not.
+The evenly spaced separators give the row height, the line just above them the column header,
+and the first line with no ink below it the bottom border of the table. The result lists one box
+per visible row, marking the rows cut off under the header or at the bottom border as partial.
+This is the only separator detector: table_region.detect_table_region() and the scroll bar thumb
+detector build on it, so tiles, delta snapshots and the stop check see the same rows.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Minimum brightness step of a separator or text edge
+LINE_MIN_STEP = 10
+# Share of the search window width a separator spans (low enough for a whole screenshot with side panels)
+LINE_MIN_SHARE = 0.35
+# Pixel rows of one (anti-aliased, 2px) line are merged when closer than this
+LINE_MERGE_PX = 3
+MIN_SEPARATORS = 3
+# Separators whose spacing differs from the typical row height by more than this share are not row borders
+ROW_SPACING_TOLERANCE = 0.15
+# A pixel row with a smaller share of steps is blank (no text)
+BLANK_INK_SHARE = 0.002
+# A row at least this share of the row height tall is complete; thinner slivers are dropped
+COMPLETE_ROW_SHARE = 0.85
+MIN_ROW_SHARE = 0.15
+
+@dataclass(frozen=True)
+class RowBox:
+    """ One visible table row in screenshot pixels. """
+    top: int
+    bottom: int
+    complete: bool  # False for a row cut off under the header or at the bottom border
+
+    @property
+    def height(self) -> int:
+        return self.bottom - self.top
+
+@dataclass(frozen=True)
+class TableGeometry:
+    """ Header, rows and bottom border of a table in screenshot pixels. """
+    left: int
+    right: int
+    header_top: int
+    header_bottom: int  # Line under the column header (top of the table body)
+    bottom: int  # Bottom border of the table (end of the visible body)
+    row_height: float
+    separators: Tuple[int, ...]  # Row borders between the header bottom and the bottom border
+    rows: Tuple[RowBox, ...]
+
+    @property
+    def complete_rows(self) -> Tuple[RowBox, ...]:
+        return tuple(row for row in self.rows if row.complete)
+
+    def row_boxes(self) -> List[Tuple[int, int, int, int]]:
+        """ (left, top, right, bottom) of every visible row, e.g. for per-row crops. """
+        return [(self.left, row.top, self.right, row.bottom) for row in self.rows]
+
+    def rows_below(self, y: float) -> float:
+        """ Table rows between y and the bottom border. """
+        return max(0.0, self.bottom - y) / self.row_height
+
+def to_gray(image) -> np.ndarray:
+    """ Grayscale float array of a PIL image or HxW(xC) array. """
+    if isinstance(image, Image.Image):
+        image = np.asarray(image.convert("L"))
+    gray = image.astype(np.float32)
+    if gray.ndim == 3:
+        gray = gray[..., :3].mean(axis=2)
+    return gray
+
+def _merge_lines(rows: np.ndarray) -> np.ndarray:
+    """ First index of every run of adjacent line rows. """
+    if rows.size == 0:
+        return rows
+    return rows[np.concatenate(([True], np.diff(rows) > LINE_MERGE_PX))]
+
+def _regular_run(lines: np.ndarray) -> Tuple[int, int, float]:
+    """ Start index, length and spacing of the longest run of evenly spaced lines. """
+    spacing = np.diff(lines)
+    typical = float(np.median(spacing))
+    regular = np.abs(spacing - typical) <= max(3.0, ROW_SPACING_TOLERANCE * typical)
+    best_start, best_len, start = 0, 0, 0
+    for i, ok in enumerate(np.append(regular, False)):
+        if not ok:
+            if i - start > best_len:
+                best_start, best_len = start, i - start
+            start = i + 1
+    run = lines[best_start:best_start + best_len + 1]
+    row_height = float(np.median(np.diff(run))) if run.size > 1 else typical
+    return best_start, best_len + 1, row_height
+
+def segment_table(image, left: int = 0, right: Optional[int] = None, top: int = 0,
+                  bottom: Optional[int] = None) -> Optional[TableGeometry]:
+    """
+    Segment a table screenshot into header, rows and bottom border.
+
+    Args:
+        image: PIL image or HxW(xC) array of the screenshot
+        left: Left edge of the table (default: the image edge)
+        right: Right edge of the table (default: the image edge)
+        top: y to search from
+        bottom: y to search to (default: the image bottom)
+
+    Returns:
+        TableGeometry in image pixels, or None when no evenly spaced row separators are found
+    """
+    gray = to_gray(image)
+    height, width = gray.shape
+    right = width if right is None else min(width, right)
+    bottom = height if bottom is None else min(height, bottom)
+    if right - left < 20 or bottom - top < 20:
+        return None
+
+    # Projection profiles over the table columns: share of brightness steps per pixel row
+    step = np.abs(np.diff(gray[top:bottom, left:right], axis=0)) >= LINE_MIN_STEP
+    profile = step.mean(axis=1)
+    lines = _merge_lines(np.flatnonzero(profile >= LINE_MIN_SHARE))
+    if lines.size < MIN_SEPARATORS:
+        return None
+    start, count, row_height = _regular_run(lines)
+    if count < MIN_SEPARATORS:
+        return None
+    body_lines = lines[start:start + count]
+
+    # Header: a line less than a row above the first regular separator (sticky header over a
+    # partially scrolled row), otherwise the first separator itself
+    header_bottom = int(body_lines[0])
+    if start > 0 and body_lines[0] - lines[start - 1] < row_height:
+        header_bottom = int(lines[start - 1])
+    above = lines[lines < header_bottom]
+    header_top = int(max(above[-1] if above.size else 0, header_bottom - row_height))
+
+    # Horizontal extent: where the row separators actually run; the ink profile is taken over it only
+    columns = np.flatnonzero(step[body_lines].mean(axis=0) >= 0.5)
+    if columns.size == 0:
+        return None
+    ink = step[:, columns[0]:columns[-1] + 1].mean(axis=1) >= BLANK_INK_SHARE
+
+    # Bottom border: the first line with a blank band below it (the band may run into the search
+    # window's end, e.g. a DOM table box that ends a few pixels under the border)
+    band_px = max(4, int(row_height * 0.6))
+    candidates = lines[lines >= body_lines[0]]
+    blank_below = [y for y in candidates if not ink[y + LINE_MERGE_PX:y + band_px].any()]
+    if blank_below:
+        table_bottom = int(blank_below[0])
+    else:
+        # Cut off by the search window: the body ends at the last text
+        inked = np.flatnonzero(ink[body_lines[-1]:])
+        table_bottom = int(body_lines[-1] + (inked[-1] + 1 if inked.size else 0))
+
+    boundaries = [header_bottom] + [int(y) for y in lines if header_bottom < y < table_bottom] + [table_bottom]
+    separators = boundaries[1:-1]
+    rows = []
+    for row_top, row_bottom in zip(boundaries[:-1], boundaries[1:]):
+        if row_bottom - row_top < MIN_ROW_SHARE * row_height or not ink[row_top + LINE_MERGE_PX:row_bottom].any():
+            continue
+        rows.append(RowBox(top + row_top, top + row_bottom, row_bottom - row_top >= COMPLETE_ROW_SHARE * row_height))
+    return TableGeometry(left=left + int(columns[0]), right=left + int(columns[-1]) + 1,
+                         header_top=top + header_top, header_bottom=top + header_bottom,
+                         bottom=top + table_bottom, row_height=row_height,
+                         separators=tuple(top + y for y in separators), rows=tuple(rows))
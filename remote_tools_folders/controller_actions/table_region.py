@@ -0,0 +1,417 @@
+"""
+Audience-table region detection and screenshot cropping for the vision calls.
+
+A full-page Ads Manager screenshot is mostly navigation chrome, side panels and empty space.
+locate_table_region() finds the bounding box of the audience table - from the DOM when the
+grid is recognised, otherwise from the table's row separators (table_geometry.segment_table()) -
+and crop_and_encode() crops the screenshot to it and re-encodes it at the smallest resolution
+and format that keep the row text legible. Fewer image tokens mean faster, cheaper vision calls.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import asyncio
+import base64
+import io
+import logging
+
+import numpy as np
+from PIL import Image
+
+from .table_geometry import segment_table
+
+# Longest image edge the vision model uses without downscaling it itself
+MAX_LONG_EDGE_PX = 1568
+# Minimum height of a table row in the encoded image for the text to stay legible
+LEGIBLE_ROW_HEIGHT_PX = 34
+# Margin kept around the detected table (screenshot pixels)
+CROP_MARGIN_PX = 8
+# Colors kept in the palette PNG candidate
+PNG_PALETTE_COLORS = 64
+JPEG_QUALITY = 80
+
+# Tiled extraction: table rows per tile and rows repeated between neighbouring tiles
+DEFAULT_ROWS_PER_TILE = 6
+TILE_OVERLAP_ROWS = 1
+
+# Delta extraction: column bins of the table body signature, maximum mean gray difference of an
+# accepted alignment, and how much worse the best clearly different shift must score (ambiguity guard).
+# On the training screenshots real scrolls align below 1.6 with a 1.5x+ margin; unrelated pages stay above 2.4.
+SIGNATURE_BINS = 32
+ALIGN_MAX_ERROR = 2.0
+ALIGN_MIN_MARGIN = 1.4
+
+@dataclass(frozen=True)
+class TableRegion:
+    """ Table bounding box in screenshot pixels. """
+    left: int
+    top: int
+    right: int
+    bottom: int
+    source: str  # "dom" or "pixels"
+    row_height: Optional[float] = None  # Typical row height in screenshot pixels, if known
+    row_lines: Tuple[int, ...] = ()  # Row separator y positions in screenshot pixels, if known
+    header_bottom: Optional[int] = None  # y of the line under the column header row, if known
+    body_bottom: Optional[int] = None  # y of the table's bottom border, if known
+
+    @property
+    def width(self) -> int:
+        return self.right - self.left
+
+    @property
+    def height(self) -> int:
+        return self.bottom - self.top
+
+    def as_box(self) -> Tuple[int, int, int, int]:
+        return self.left, self.top, self.right, self.bottom
+
+# Runs in the page: bounding box of the audience grid in document CSS pixels, plus the device pixel ratio
+_TABLE_BOX_SCRIPT = """() => {
+    const clean = (text) => (text || '').replace(/\\s+/g, ' ').trim();
+    for (const table of document.querySelectorAll('[role="grid"], [role="table"], table')) {
+        const headers = Array.from(table.querySelectorAll('[role="columnheader"], th')).map(h => clean(h.innerText));
+        if (!headers.some(h => /^name$/i.test(h) || /audience name/i.test(h))) continue;
+        const r = table.getBoundingClientRect();
+        if (r.width <= 0 || r.height <= 0) continue;
+        const rows = Array.from(table.querySelectorAll('[role="row"], tr')).map(row => row.getBoundingClientRect().height).filter(h => h > 0).sort((a, b) => a - b);
+        return {
+            left: r.left + window.scrollX, top: r.top + window.scrollY,
+            right: r.right + window.scrollX, bottom: r.bottom + window.scrollY,
+            dpr: window.devicePixelRatio || 1,
+            row_height: rows.length ? rows[Math.floor(rows.length / 2)] : null,
+        };
+    }
+    return null;
+}"""
+
+def decode_screenshot(screenshot_data: str) -> Image.Image:
+    """ Decode a base64 screenshot (with or without a data: prefix) into an RGB image. """
+    if "," in screenshot_data[:64]:
+        screenshot_data = screenshot_data.split(",", 1)[1]
+    return Image.open(io.BytesIO(base64.b64decode(screenshot_data))).convert("RGB")
+
+async def locate_table_region_dom(page, image_size: Tuple[int, int], logger: Optional[logging.Logger] = None) -> Optional[TableRegion]:
+    """
+    Bounding box of the audience grid from the DOM, scaled to screenshot pixels.
+
+    Args:
+        page: Playwright page (may be None)
+        image_size: (width, height) of the full-page screenshot
+        logger: Optional logger
+
+    Returns:
+        TableRegion or None when the grid is not found
+    """
+    if page is None:
+        return None
+    try:
+        box = await page.evaluate(_TABLE_BOX_SCRIPT)
+    except Exception as e:
+        if logger:
+            logger.warning(f"DOM table region lookup failed: {str(e)}")
+        return None
+    if not box:
+        return None
+    scale = float(box.get("dpr") or 1)
+    width, height = image_size
+    left = max(0, int(box["left"] * scale) - CROP_MARGIN_PX)
+    top = max(0, int(box["top"] * scale) - CROP_MARGIN_PX)
+    right = min(width, int(box["right"] * scale) + CROP_MARGIN_PX)
+    bottom = min(height, int(box["bottom"] * scale) + CROP_MARGIN_PX)
+    if right - left < 50 or bottom - top < 50:
+        return None
+    row_height = box["row_height"] * scale if box.get("row_height") else None
+    return TableRegion(left, top, right, bottom, source="dom", row_height=row_height)
+
+def detect_table_region(image: np.ndarray) -> Optional[TableRegion]:
+    """
+    Pixel-based table detector: segments the screenshot with table_geometry.segment_table()
+    and returns the box around the header, the rows and the bottom border.
+
+    Args:
+        image: HxW (grayscale) or HxWxC image array
+
+    Returns:
+        TableRegion in image pixels, or None when no table-like grid is found
+    """
+    geometry = segment_table(image)
+    if geometry is None:
+        return None
+    height, width = image.shape[:2]
+    return TableRegion(max(0, geometry.left - CROP_MARGIN_PX), max(0, geometry.header_top - CROP_MARGIN_PX),
+                       min(width, geometry.right + CROP_MARGIN_PX), min(height, geometry.bottom + CROP_MARGIN_PX),
+                       source="pixels", row_height=geometry.row_height, row_lines=geometry.separators,
+                       header_bottom=geometry.header_bottom, body_bottom=geometry.bottom)
+
+async def locate_table_region(page, image: Image.Image, logger: Optional[logging.Logger] = None) -> Optional[TableRegion]:
+    """
+    Find the audience table in a screenshot: DOM first, pixel detector (in a worker thread) otherwise.
+
+    Args:
+        page: Playwright page (may be None)
+        image: Decoded full-page screenshot
+        logger: Optional logger
+
+    Returns:
+        TableRegion or None
+    """
+    region = await locate_table_region_dom(page, image.size, logger)
+    if region is None:
+        region = await asyncio.to_thread(detect_table_region, np.asarray(image))
+    if logger:
+        if region:
+            logger.info(f"Table region ({region.source}): {region.as_box()} of {image.size}, row height {region.row_height}")
+        else:
+            logger.info("No table region found, using the full screenshot")
+    return region
+
+def crop_and_encode(image: Image.Image, region: Optional[TableRegion] = None) -> Tuple[str, str, dict]:
+    """
+    Crop a screenshot to the table region and encode it as small as legibility allows.
+    The image is downscaled to the model's native size, but never so far that a table row gets
+    shorter than LEGIBLE_ROW_HEIGHT_PX; the smaller of a palette PNG and a JPEG is returned.
+
+    Args:
+        image: Decoded screenshot
+        region: Optional table region to crop to
+
+    Returns:
+        Tuple of (base64 data, media type, info dict with sizes and scale)
+    """
+    cropped = image.crop(region.as_box()) if region else image
+    data, media_type, info = encode_image(cropped, region.row_height if region else None)
+    info.update({
+        "original_size": list(image.size),
+        "region": list(region.as_box()) if region else None,
+        "region_source": region.source if region else None,
+    })
+    return data, media_type, info
+
+def encode_image(image: Image.Image, row_height: Optional[float] = None) -> Tuple[str, str, dict]:
+    """
+    Downscale and encode an image for a vision call (see crop_and_encode).
+
+    Args:
+        image: Image to encode
+        row_height: Optional table row height in image pixels, bounds the downscaling
+
+    Returns:
+        Tuple of (base64 data, media type, info dict with the encoded size and scale)
+    """
+    scale = min(1.0, MAX_LONG_EDGE_PX / max(image.size))
+    if row_height:
+        scale = min(1.0, max(scale, LEGIBLE_ROW_HEIGHT_PX / row_height))
+    if scale < 1.0:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
+
+    png_buffer = io.BytesIO()
+    image.quantize(colors=PNG_PALETTE_COLORS, method=Image.Quantize.MEDIANCUT).save(png_buffer, format="PNG", optimize=True)
+    jpeg_buffer = io.BytesIO()
+    image.save(jpeg_buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    if png_buffer.tell() <= jpeg_buffer.tell():
+        data, media_type = png_buffer.getvalue(), "image/png"
+    else:
+        data, media_type = jpeg_buffer.getvalue(), "image/jpeg"
+
+    info = {
+        "encoded_size": list(image.size),
+        "scale": round(scale, 3),
+        "bytes": len(data),
+        "media_type": media_type,
+    }
+    return base64.b64encode(data).decode("ascii"), media_type, info
+
+async def prepare_table_image(page, screenshot_data: str, logger: Optional[logging.Logger] = None) -> Optional[Tuple[str, str, dict]]:
+    """
+    Crop a base64 screenshot to the audience table and re-encode it for a vision call.
+    Decoding, pixel detection and encoding run in a worker thread to keep the event loop free.
+
+    Args:
+        page: Playwright page used for the DOM lookup (may be None)
+        screenshot_data: Base64 screenshot, optionally with a data: prefix
+        logger: Optional logger
+
+    Returns:
+        Tuple of (base64 data, media type, info dict), or None if the screenshot cannot be decoded
+    """
+    try:
+        image = await asyncio.to_thread(decode_screenshot, screenshot_data)
+    except Exception as e:
+        if logger:
+            logger.warning(f"Could not decode screenshot for cropping: {str(e)}")
+        return None
+    region = await locate_table_region(page, image, logger)
+    return await asyncio.to_thread(crop_and_encode, image, region)
+
+def split_row_bands(row_lines, start: int, end: int, rows_per_band: int = DEFAULT_ROWS_PER_TILE,
+                    overlap_rows: int = TILE_OVERLAP_ROWS) -> List[Tuple[int, int]]:
+    """
+    Split a table body into horizontal bands cut at row separators.
+    Neighbouring bands share `overlap_rows` rows, so a row is always complete in at least one band.
+
+    Args:
+        row_lines: Row separator y positions
+        start: y where the body starts (below the header)
+        end: y where the body ends
+        rows_per_band: Rows per band
+        overlap_rows: Rows repeated at the start of the next band
+
+    Returns:
+        List of (top, bottom) y ranges covering start..end
+    """
+    boundaries = [start] + sorted(int(y) for y in row_lines if start < y < end) + [end]
+    rows_per_band = max(1, rows_per_band)
+    stride = max(1, rows_per_band - max(0, overlap_rows))
+    bands = []
+    i = 0
+    while True:
+        last = min(i + rows_per_band, len(boundaries) - 1)
+        bands.append((boundaries[i], boundaries[last]))
+        if last == len(boundaries) - 1:
+            return bands
+        i += stride
+
+def resolve_rows(image: Image.Image, region: TableRegion) -> Tuple[List[int], int, int]:
+    """
+    Row separators, header bottom and bottom border of a table region, segmented inside the box for DOM regions.
+
+    Returns:
+        Tuple of (row separator y positions, header bottom y, body bottom y) in image pixels
+    """
+    if region.row_lines:
+        header_bottom = region.header_bottom if region.header_bottom is not None else region.row_lines[0]
+        return list(region.row_lines), header_bottom, region.body_bottom or region.bottom
+    # DOM regions carry no separators: segment the table inside the box
+    geometry = segment_table(image, region.left, region.right, region.top, region.bottom)
+    if geometry is not None:
+        return list(geometry.separators), geometry.header_bottom, geometry.bottom
+    row_lines = []
+    if region.row_height:
+        row_lines = list(np.arange(region.top + region.row_height, region.bottom, region.row_height).astype(int))
+    return row_lines, row_lines[0] if row_lines else region.top, region.bottom
+
+def encode_table_rows(image: Image.Image, region: TableRegion, top: int, bottom: Optional[int] = None,
+                      header_bottom: Optional[int] = None) -> Tuple[str, str, dict]:
+    """
+    Encode the table rows between top and bottom with the column header strip on top.
+
+    Args:
+        image: Decoded screenshot
+        region: Table region
+        top: First y of the rows
+        bottom: Last y of the rows (default: bottom of the table)
+        header_bottom: y of the header bottom (default: resolved from the region)
+
+    Returns:
+        Tuple of (base64 data, media type, info dict with the row band)
+    """
+    bottom = region.bottom if bottom is None else bottom
+    if header_bottom is None:
+        header_bottom = resolve_rows(image, region)[1]
+    band = image.crop((region.left, top, region.right, bottom))
+    if header_bottom > region.top and top > region.top:
+        header = image.crop((region.left, region.top, region.right, min(header_bottom, top)))
+        combined = Image.new("RGB", (band.width, header.height + band.height), "white")
+        combined.paste(header, (0, 0))
+        combined.paste(band, (0, header.height))
+        band = combined
+    data, media_type, info = encode_image(band, region.row_height)
+    info["band"] = [top, bottom]
+    return data, media_type, info
+
+def table_tiles(image: Image.Image, region: TableRegion, rows_per_tile: int = DEFAULT_ROWS_PER_TILE,
+                overlap_rows: int = TILE_OVERLAP_ROWS, body_top: Optional[int] = None) -> List[Tuple[str, str, dict]]:
+    """
+    Cut the table into overlapping row bands with the header strip on top of each and encode them.
+
+    Args:
+        image: Decoded screenshot
+        region: Table region
+        rows_per_tile: Table rows per tile
+        overlap_rows: Rows shared by neighbouring tiles
+        body_top: Optional y to start from instead of the header bottom (delta extraction)
+
+    Returns:
+        List of (base64 data, media type, info dict) tiles from top to bottom
+    """
+    row_lines, header_bottom, end = resolve_rows(image, region)
+    start = header_bottom if body_top is None else max(header_bottom, body_top)
+    if end <= start:
+        end = region.bottom
+    return [encode_table_rows(image, region, top, bottom, header_bottom)
+            for top, bottom in split_row_bands(row_lines, start, end, rows_per_tile, overlap_rows)]
+
+@dataclass(frozen=True)
+class TableSnapshot:
+    """ Signature of the table body an extraction saw, to find the rows a later scroll revealed. """
+    signature: np.ndarray  # Mean gray per body pixel row and column bin
+    width: int
+    seen_height: int  # Body height down to the last row separator: rows below it were cut off or not loaded yet
+
+def table_snapshot(image: Image.Image, region: TableRegion) -> TableSnapshot:
+    """ Signature of the table body (below the header) of a screenshot. """
+    row_lines, header_bottom, _ = resolve_rows(image, region)
+    body = image.convert("L").crop((region.left, header_bottom, region.right, region.bottom))
+    signature = np.asarray(body.resize((SIGNATURE_BINS, max(1, body.height)), Image.BOX), dtype=np.float32)
+    seen_height = max([y - header_bottom for y in row_lines if y > header_bottom], default=0)
+    return TableSnapshot(signature, region.width, seen_height)
+
+def align_snapshots(previous: TableSnapshot, current: TableSnapshot, min_overlap: int) -> Optional[int]:
+    """
+    Vertical scroll of the table body between two snapshots, found by aligning their signatures.
+
+    Args:
+        previous: Snapshot of the earlier screenshot
+        current: Snapshot of the later screenshot
+        min_overlap: Minimum overlapping body height (pixels) for a valid alignment
+
+    Returns:
+        Scroll distance in pixels (0 = unchanged), or None if the bodies cannot be aligned
+        unambiguously (different page or table, scrolled up, scrolled past the previous view)
+    """
+    if abs(previous.width - current.width) > 0.02 * max(previous.width, current.width):
+        return None
+    p, c = previous.signature, current.signature
+    shifts = range(0, len(p) - min_overlap + 1)
+    if not shifts:
+        return None
+    scores = np.array([np.abs(p[shift:shift + min(len(p) - shift, len(c))] - c[:min(len(p) - shift, len(c))]).mean()
+                       for shift in shifts])
+    best = int(np.argmin(scores))
+    if scores[best] > ALIGN_MAX_ERROR:
+        return None
+    # Rows look alike: a clearly different shift that scores almost as well makes the alignment ambiguous
+    far = np.abs(np.arange(len(scores)) - best) > min_overlap / 8
+    if far.any() and scores[far].min() < ALIGN_MIN_MARGIN * max(scores[best], 0.1):
+        return None
+    return best
+
+def revealed_rows_top(previous: TableSnapshot, image: Image.Image, region: TableRegion) -> Optional[int]:
+    """
+    y from which the current table shows rows the previous extraction did not see.
+    The row that straddles the old bottom edge is included, so a row cut there is transcribed whole.
+
+    Args:
+        previous: Snapshot of the previous extraction
+        image: Current screenshot
+        region: Current table region
+
+    Returns:
+        y in image pixels (region.bottom when nothing new is visible), or None if the scroll
+        cannot be determined and the whole table must be transcribed
+    """
+    row_lines, header_bottom, _ = resolve_rows(image, region)
+    row_height = region.row_height or (float(np.median(np.diff(row_lines))) if len(row_lines) > 1 else 0)
+    if not row_height:
+        return None
+    current = table_snapshot(image, region)
+    shift = align_snapshots(previous, current, min_overlap=int(2 * row_height))
+    if shift is None:
+        return None
+    # Everything below the last row the previous extraction saw whole (after the shift) is new
+    unseen_from = header_bottom + previous.seen_height - shift
+    # Nothing new unless a complete row (one ending at a separator) lies below what was seen
+    if shift == 0 or not any(y > unseen_from + row_height / 2 for y in row_lines):
+        return region.bottom
+    boundaries = [header_bottom] + [y for y in row_lines if header_bottom < y <= unseen_from]
+    return boundaries[-1]
@@ -0,0 +1,188 @@
+"""
+Perceptual-hash cache in front of the screenshot-driven LLM actions.
+
+The agent often repeats extract_audience_data, check_condition_stop_page_wheel or think on a
+screenshot that has not visibly changed (e.g. after a scroll that hit the bottom). Each result is
+cached under (action, prompt hash) with the dHash of its screenshot; a later call whose screenshot
+hash is within MAX_DISTANCE bits returns the cached result instead of calling the model again.
+
+The hash is a 16x16 difference hash (256 bits): on the Ads Manager training screenshots a scroll
+of a single row changes 12+ bits while an unchanged page changes none, so the default threshold
+of 4 bits absorbs rendering noise (caret, hover highlight) without confusing scroll states. (An
+8x8 hash is too coarse there: different scroll positions differ by as few as 1-5 of 64 bits.)
+The perceptual match suits check_condition_stop_page_wheel and think, whose answers depend on the
+page layout. It cannot tell which text a table holds (changing only the Audience ID column leaves
+the dHash unchanged), so extract_audience_data keys its results on content_hash() of the cropped
+table instead and looks them up with max_distance=0: only pixel-identical tables match.
+
+Entries expire after TTL_S seconds (measured on the injected clock) and the least recently used
+entry is evicted beyond MAX_ENTRIES. Override with VISION_CACHE_TTL_S, VISION_CACHE_MAX_ENTRIES,
+VISION_CACHE_MAX_DISTANCE; VISION_CACHE_DISABLED=1 turns the cache off.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple, Union
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+import os
+
+import numpy as np
+from PIL import Image
+
+from .clock import get_clock
+
+HASH_SIZE = 16
+DEFAULT_TTL_S = 600.0
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_DISTANCE = 4
+
+def _env_number(name: str, default, cast):
+    try:
+        return cast(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+def dhash(image: Union[Image.Image, bytes, str], hash_size: int = HASH_SIZE) -> int:
+    """
+    Difference hash of an image: sign of the horizontal gradient of a (hash_size+1)xhash_size thumbnail.
+
+    Args:
+        image: PIL image, encoded image bytes, or base64 (optionally with a data: prefix)
+        hash_size: Hash side length (the hash has hash_size**2 bits)
+
+    Returns:
+        Hash as an integer
+    """
+    if isinstance(image, str):
+        if "," in image[:64]:
+            image = image.split(",", 1)[1]
+        image = base64.b64decode(image)
+    if isinstance(image, bytes):
+        image = Image.open(io.BytesIO(image))
+    thumbnail = np.asarray(image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR), dtype=np.int16)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def content_hash(image: Image.Image) -> int:
+    """
+    Exact digest of an image's pixels: any changed pixel (e.g. one digit of a table cell) changes it.
+
+    Args:
+        image: PIL image (e.g. the table crop of a screenshot)
+
+    Returns:
+        SHA-256 of the mode, size and pixel data as an integer
+    """
+    digest = hashlib.sha256(f"{image.mode}:{image.size}".encode("ascii"))
+    digest.update(image.tobytes())
+    return int.from_bytes(digest.digest(), "big")
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def prompt_hash(*parts: Any) -> str:
+    """ Stable hash of everything besides the image that determines an LLM result (prompt, model, options). """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+@dataclass
+class _Entry:
+    image_hash: int
+    value: Any
+    created: float
+
+class VisionResultCache:
+    """ TTL + LRU cache of LLM results keyed by (action, prompt hash) and matched by image hash distance. """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_s: Optional[float] = None, max_distance: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else _env_number("VISION_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES, int)
+        self.ttl_s = ttl_s if ttl_s is not None else _env_number("VISION_CACHE_TTL_S", DEFAULT_TTL_S, float)
+        self.max_distance = max_distance if max_distance is not None else _env_number("VISION_CACHE_MAX_DISTANCE", DEFAULT_MAX_DISTANCE, int)
+        self.entries: "OrderedDict[Tuple[str, str, int], _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _expire(self, now: float):
+        for key in [key for key, entry in self.entries.items() if now - entry.created > self.ttl_s]:
+            del self.entries[key]
+
+    def get(self, action: str, prompt_key: str, image_hash: int,
+            max_distance: Optional[int] = None) -> Optional[Tuple[Any, int]]:
+        """
+        Look up the closest cached result for an action, prompt and screenshot.
+
+        Args:
+            action: Action name
+            prompt_key: prompt_hash() of the call
+            image_hash: dHash (or content_hash) of the screenshot
+            max_distance: Match threshold in bits for this lookup (default: the cache's; 0 = exact)
+
+        Returns:
+            Tuple of (cached value, Hamming distance) or None on a miss
+        """
+        self._expire(get_clock().now())
+        max_distance = self.max_distance if max_distance is None else max_distance
+        best_key, best_distance = None, None
+        for key, entry in self.entries.items():
+            if key[0] == action and key[1] == prompt_key:
+                distance = hamming_distance(entry.image_hash, image_hash)
+                if distance <= max_distance and (best_distance is None or distance < best_distance):
+                    best_key, best_distance = key, distance
+        if best_key is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(best_key)
+        self.hits += 1
+        return self.entries[best_key].value, best_distance
+
+    def put(self, action: str, prompt_key: str, image_hash: int, value: Any):
+        """ Store a result, evicting the least recently used entries beyond max_entries. """
+        key = (action, prompt_key, image_hash)
+        self.entries[key] = _Entry(image_hash, value, get_clock().now())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+_cache: Optional[VisionResultCache] = None
+
+def get_vision_cache() -> Optional[VisionResultCache]:
+    """ The process-wide vision result cache, or None when VISION_CACHE_DISABLED is set. """
+    global _cache
+    if os.environ.get("VISION_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    if _cache is None:
+        _cache = VisionResultCache()
+    return _cache
+
+async def hash_screenshot(screenshot: Union[bytes, str], logger: Optional[logging.Logger] = None) -> Optional[int]:
+    """
+    dHash of a screenshot for cache lookups, computed in a worker thread.
+
+    Args:
+        screenshot: Encoded image bytes or base64 data
+        logger: Optional logger
+
+    Returns:
+        Image hash, or None when the cache is disabled or the screenshot cannot be decoded
+    """
+    if get_vision_cache() is None:
+        return None
+    try:
+        return await asyncio.to_thread(dhash, screenshot)
+    except Exception as e:
+        if logger:
+            logger.warning(f"Could not hash screenshot for the vision cache: {str(e)}")
+        return None
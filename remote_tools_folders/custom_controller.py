@@ -42,10 +42,15 @@ except Exception as import_error:
 from .controller_actions.action_move_mouse import perform_move_mouse, MouseMoveAction
 from .controller_actions.action_mouse_click import perform_mouse_click
 from .controller_actions.action_mouse_hover import perform_mouse_hover
+from .controller_actions.action_pointer_sequence import perform_pointer_sequence, PointerSequenceAction
 from .controller_actions.action_mouse_wheel import perform_mouse_wheel, MouseWheelAction
-from .controller_actions.action_extract_audience_data import perform_extract_audience_data, ExtractAudienceDataAction
+from .controller_actions.action_extract_audience_data import perform_extract_audience_data, ExtractAudienceDataAction, ExtractionMode
+from .controller_actions.action_collect_captured_audiences import perform_collect_captured_audiences, CollectCapturedAudiencesAction
 from .controller_actions.action_generate_custom_prompt import perform_generate_custom_prompt
 from .controller_actions.action_check_condition_stop_page_wheel import perform_check_condition_stop_page_wheel
+from .controller_actions.llm_clients import provider_slot
+from .controller_actions.mouse_trajectory import TrajectoryModel
+from .controller_actions.vision_cache import get_vision_cache, hash_screenshot, prompt_hash
 
 # Note: All helper functions have been moved to their respective implementation files
 
@@ -53,17 +58,30 @@ from .controller_actions.action_check_condition_stop_page_wheel import perform_c
 class MouseMoveAction(BaseModel):
     x: float = Field(..., description="X coordinate relative to the viewport in CSS pixels")
     y: float = Field(..., description="Y coordinate relative to the viewport in CSS pixels")
-    steps: Optional[int] = Field(1, description="Number of intermediate steps for the movement (default: 1)")
+    steps: Optional[int] = Field(1, description="Number of intermediate steps for the movement (default: 1 = direct jump). Values above 1 move along a human-like trajectory with at least this many points.")
+    trajectory: TrajectoryModel = Field("minimum_jerk", description="Trajectory model used when steps > 1: minimum_jerk, bezier or arc. 'bezier' overshoots the target slightly and corrects.")
+    target_width: float = Field(20.0, gt=0, description="Approximate size of the target in pixels. Smaller targets make the movement slower (Fitts' law).")
 
 # Create a model for the mouse wheel parameters
 class MouseWheelAction(BaseModel):
     delta_x: float = Field(0, description="Pixels to scroll horizontally (positive for right, negative for left). For most websites, use 0 for vertical-only scrolling.")
     delta_y: float = Field(..., description="Pixels to scroll vertically (positive for down, negative for up). Typical values: 100-300 for small scrolls, 500-800 for larger scrolls.")
+    max_duration_ms: Optional[int] = Field(None, gt=0, description="Optional time budget for the whole scroll in milliseconds. Pauses, rhythm and segment count are compressed so the scroll finishes within it. Leave empty for unhurried human timing.")
+    container_selector: Optional[str] = Field(None, description="Optional CSS selector of the scrolled container (e.g. '[role=\"grid\"]' for the audience table). Used to measure the scroll and to wait for it to settle. Defaults to the scrollable container under the mouse.")
+    settle_quiet_ms: int = Field(300, ge=0, description="Milliseconds without DOM changes in the scrolled container after which the scroll counts as settled.")
+    correct_undershoot: bool = Field(True, description="Whether to scroll again when the container moved less than requested and has not reached its end.")
 
 # Create a model for the Facebook audience extraction parameters
 class ExtractAudienceDataAction(BaseModel):
     is_first_run: bool = Field(True, description="Whether this is the first run (create new file) or not (append to existing)")
     file_path: Optional[str] = Field(None, description="Path to the existing JSON file (only used if is_first_run=False)")
+    mode: ExtractionMode = Field("auto", description="Extraction source: 'auto' (read the table from the page DOM, fall back to a screenshot + vision model), 'dom' or 'vision'")
+    tiled: bool = Field(False, description="Vision extraction only: split a tall table into overlapping row tiles transcribed in parallel (faster for many rows)")
+    rows_per_tile: int = Field(6, ge=2, description="Table rows per tile in tiled mode")
+    max_parallel_tiles: int = Field(4, ge=1, description="Maximum concurrent vision calls in tiled mode")
+    export_json: bool = Field(True, description="Rewrite the JSON file after saving the page. Set False while paging through a long table and True on the last call; every row is kept in the store next to the file either way")
+    delta: bool = Field(True, description="Vision extraction on subsequent runs: only transcribe the rows revealed since the previous extraction (falls back to the whole table when the scroll cannot be determined)")
+    stream: bool = Field(False, description="Vision extraction: stream the response and save each row as soon as it is transcribed (rows completed before a cut-off response are kept)")
 
 # Create a model for the 'think' action parameters
 class ThinkActionParams(BaseModel):
@@ -101,6 +119,17 @@ async def mouse_hover(x: float, y: float, browser: BrowserContext) -> ActionResu
     """
     return await perform_mouse_hover(x, y, browser)
 
+@controller.action(
+    'Move, hover and click in one step: move the mouse to coordinates or an element index, optionally hover, wait for an element revealed by the hover (e.g. a row button), click it and wait for the expected page change',
+    param_model=PointerSequenceAction
+)
+async def pointer_sequence(params: PointerSequenceAction, browser: BrowserContext) -> ActionResult:
+    """
+    Action definition: Compound pointer action (move, hover-reveal, click).
+    Calls the helper function perform_pointer_sequence for implementation.
+    """
+    return await perform_pointer_sequence(params, browser)
+
 @controller.action(
     'Scroll page using mouse wheel',
     param_model=MouseWheelAction
@@ -115,13 +144,14 @@ async def mouse_wheel(params: MouseWheelAction, browser: BrowserContext) -> Acti
 )
 async def extract_audience_data(params: ExtractAudienceDataAction, browser: BrowserContext) -> ActionResult:
     """
-    Extracts audience data from a Facebook dashboard table screenshot using Claude's Vision API.
+    Extracts audience data from the Facebook dashboard audience table.
     
     This function:
-    1. Takes a screenshot of the current page
-    2. Sends the screenshot to Claude for analysis via Vision API
-    3. Creates a new JSON file or appends to an existing one based on is_first_run parameter
-    4. Ensures no duplicate audience_id entries when appending
+    1. Reads the rendered table rows from the page DOM (one page.evaluate)
+    2. Falls back to a screenshot analysed by Claude's Vision API when the table is not recognised or a row is incomplete
+       (with stream=True each row is stored as soon as the response completes it)
+    3. Creates a new JSON file or adds to an existing one based on is_first_run parameter
+    4. Upserts the rows into the indexed store next to the file (unique Audience ID) and exports the JSON
     
     Args:
         params: ExtractAudienceDataAction with file options
@@ -132,6 +162,17 @@ async def extract_audience_data(params: ExtractAudienceDataAction, browser: Brow
     """
     return await perform_extract_audience_data(params, browser)
 
+@controller.action(
+    'Collect the Facebook audience rows captured from the Ads Manager network responses (no screenshot or LLM call). Call once to start capturing, scroll the audience table, then call again to collect',
+    param_model=CollectCapturedAudiencesAction
+)
+async def collect_captured_audiences(params: CollectCapturedAudiencesAction, browser: BrowserContext) -> ActionResult:
+    """
+    Returns the audience records parsed from the XHR/GraphQL responses that populate the
+    audience table, optionally merging them into a JSON file.
+    """
+    return await perform_collect_captured_audiences(params, browser)
+
 @controller.action('Generate custom prompt for agent')
 async def generate_custom_prompt(browser: BrowserContext) -> ActionResult:
     """
@@ -158,9 +199,11 @@ async def check_condition_stop_page_wheel(browser: BrowserContext) -> ActionResu
     or stop based on the condition of the scroll bar and visible content.
     
     This function:
-    1. Takes a screenshot of the current page
-    2. Loads training images for Claude Vision API context
-    3. Sends the screenshot and training images to Claude for analysis
+    1. Reads the audience grid's scroll metrics and row height from the DOM and, when available,
+       decides from the exact rows left below the scroll bar (no screenshot or LLM call)
+    2. Otherwise takes a screenshot of the current page and measures the rows below the scroll bar
+       thumb in it locally (NumPy)
+    3. Only when no thumb is found, sends the screenshot and the cached training examples to Claude
     4. Parses the response to determine if scrolling should continue or stop
     5. Returns the decision and appropriate scroll parameters if needed
     
@@ -218,7 +261,20 @@ async def think(params: ThinkActionParams, browser: BrowserContext) -> ActionRes
         prompt_text = params.task_description if params.task_description else "Analyze the provided screenshot of the webpage. Based on the visual context, describe the current state and suggest the most logical next step or action to take to accomplish standard web automation goals."
         logging.info(f"Prepared prompt for LLM (truncated): {prompt_text[:100]}...")
 
-        # 6. Call LLM function (run synchronous function in thread)
+        # 6. A near-identical screenshot was already analysed with the same prompt: reuse the answer
+        cache = get_vision_cache()
+        cache_key = prompt_hash("gemini-generate", prompt_text)
+        image_hash = await hash_screenshot(screenshot_bytes)
+        if image_hash is not None:
+            cached = cache.get("think", cache_key, image_hash)
+            if cached:
+                llm_response, distance = cached
+                logging.info(f"Vision cache hit for think (screenshot hash distance {distance} bits), skipping the LLM call.")
+                result_message = (f"LLM thought process complete using screenshot '{os.path.basename(file_path)}' "
+                                  f"(cached analysis, screenshot hash distance {distance} bits).\nLLM Response:\n{llm_response}")
+                return ActionResult(extracted_content=result_message, include_in_memory=True)
+
+        # 7. Call LLM function (run synchronous function in thread)
         logging.info(f"Calling LLM function 'generate' with image: {file_path}")
 
         # Create a wrapper function that can be executed in a thread
@@ -227,7 +283,9 @@ async def think(params: ThinkActionParams, browser: BrowserContext) -> ActionRes
             
         # Use asyncio.to_thread to run the synchronous 'generate' function
         # without blocking the main async event loop.
-        llm_response = await asyncio.to_thread(run_generate)
+        # The Gemini concurrency limit is shared with the other sessions in this process
+        async with provider_slot("gemini"):
+            llm_response = await asyncio.to_thread(run_generate)
         logging.info("LLM function 'generate' completed.")
 
         # Check if llm_response is None (indicating an error in 'generate') or empty
@@ -239,10 +297,13 @@ async def think(params: ThinkActionParams, browser: BrowserContext) -> ActionRes
              llm_response = "[LLM provided an empty response]"
         else:
             logging.info(f"LLM Response received (truncated): {llm_response[:100]}...")
+            # Only real answers are cached
+            if image_hash is not None:
+                cache.put("think", cache_key, image_hash, llm_response)
 
-        # 7. Return result in ActionResult
+        # 8. Return result in ActionResult
         result_message = f"LLM thought process complete using screenshot '{os.path.basename(file_path)}'.\nLLM Response:\n{llm_response}"
-        return ActionResult(result=result_message)
+        return ActionResult(extracted_content=result_message, include_in_memory=True)
 
     except FileNotFoundError as e:
          logging.error(f"Error saving or accessing screenshot file: {e}\n{traceback.format_exc()}")
@@ -1,5 +1,7 @@
 """
 Test the human-like scrolling functionality in the custom_controller.
+Pass --virtual-time to run the scroll timing on a VirtualClock (the wheel events are
+sent back to back and the intended duration is printed instead of waited for).
 """
 
 import asyncio
@@ -13,16 +15,24 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from remote_tools_folders.custom_controller import mouse_wheel, MouseWheelAction
+from remote_tools_folders.controller_actions.clock import RealClock, VirtualClock, use_clock
 from browser_use.browser.context import BrowserContext
 from playwright.async_api import async_playwright
 
 # A simpler approach that doesn't rely on BrowserContext
-async def test_human_like_scrolling():
+async def test_human_like_scrolling(virtual_time: bool = False):
     """
     Test the human-like scrolling by opening a test site and performing scrolls.
     """
     print("Starting human-like scrolling test...")
+    clock = VirtualClock() if virtual_time else RealClock()
     
+    with use_clock(clock):
+        await _run_scrolls()
+    if virtual_time:
+        print(f"Simulated scrolling time: {clock.elapsed:.2f} seconds")
+
+async def _run_scrolls():
     async with async_playwright() as p:
         # Launch browser
         browser = await p.chromium.launch(headless=False)  # Use headless=False to see the scrolling visually
@@ -81,4 +91,4 @@ async def test_human_like_scrolling():
     print("Test completed!")
 
 if __name__ == "__main__":
-    asyncio.run(test_human_like_scrolling()) 
\ No newline at end of file
+    asyncio.run(test_human_like_scrolling(virtual_time="--virtual-time" in sys.argv)) 
\ No newline at end of file